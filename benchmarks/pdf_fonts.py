@@ -0,0 +1,52 @@
+"""Скорость формирования документов: разбор TTF в каждом PDFService (как было)
+против FontRegistry (разбор один раз на процесс).
+
+Запуск (нужна заполненная БД):
+    python -m benchmarks.pdf_fonts [число документов, по умолчанию 50]
+"""
+import os
+import sys
+import tempfile
+import time
+from controllers.orders_controller import OrdersController
+from services.font_registry import FontRegistry, FAMILY
+from services.pdf_service import PDFService
+
+
+class PerDocumentFonts(PDFService):
+    """Прежнее поведение: add_font (полный разбор файлов) для каждого документа"""
+
+    def __init__(self):
+        super(PDFService, self).__init__()
+        _, regular, bold = FontRegistry.discover()
+        self.add_font(FAMILY, '', regular)
+        self.add_font(FAMILY, 'B', bold)
+        self.set_font(FAMILY, size=14)
+
+
+def run(pdf_class, order, count, folder):
+    sizes = 0
+    started = time.perf_counter()
+    for i in range(count):
+        path = os.path.join(folder, f"{pdf_class.__name__}_{i}.pdf")
+        # Как в OrdersTab.generate_doc: по одному документу на экземпляр
+        if i % 2:
+            pdf_class().generate_receipt(order, path)
+        else:
+            pdf_class().generate_waybill(order, path)
+        sizes += os.path.getsize(path)
+    elapsed = time.perf_counter() - started
+    return count / elapsed, sizes / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    order = OrdersController().get_many([OrdersController().get_page(limit=1)[0][0].id])[0]
+    FontRegistry.faces()  # разбор один раз при первом документе, как в приложении
+    print(f"Шрифт: {FontRegistry.name}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for title, pdf_class in (("add_font в каждом документе", PerDocumentFonts),
+                                 ("FontRegistry", PDFService)):
+            rate, size = run(pdf_class, order, count, folder)
+            print(f"{title:30} {rate:7.1f} док/с   {size / 1024:6.1f} КБ на документ")
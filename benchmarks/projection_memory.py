@@ -0,0 +1,62 @@
+"""Память на строку реестра: ORM-объекты Order со связями против OrderRow.
+
+Запуск (нужна заполненная БД):
+    python -m benchmarks.projection_memory [число строк, по умолчанию 100000]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from sqlalchemy.orm import joinedload
+from database.connection import get_db
+from database.models import Order, Vehicle
+from database.projections import OrderRow
+
+
+def load_orm(limit):
+    db = get_db()
+    try:
+        return db.query(Order).options(
+            joinedload(Order.client),
+            joinedload(Order.vehicle).joinedload(Vehicle.driver),
+            joinedload(Order.warehouse_zone)
+        ).order_by(Order.id.desc()).limit(limit).all()
+    finally:
+        db.close()
+
+
+def load_projection(limit):
+    db = get_db()
+    try:
+        q = db.query(*OrderRow.columns).outerjoin(Order.client).outerjoin(Order.vehicle)
+        return OrderRow.from_rows(q.order_by(Order.id.desc()).limit(limit))
+    finally:
+        db.close()
+
+
+def measure(loader, limit):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = loader(limit)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(rows)
+    del rows
+    return count, retained, peak, elapsed
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    load_projection(10)  # прогрев соединения и кэша компиляции запросов
+    print(f"{'Вариант':<22}{'Строк':>8}{'Байт/строку':>14}{'Пик, МБ':>10}{'Время, с':>10}")
+    for name, loader in (("ORM Order + связи", load_orm), ("OrderRow (__slots__)", load_projection)):
+        count, retained, peak, elapsed = measure(loader, limit)
+        per_row = retained / count if count else 0
+        print(f"{name:<22}{count:>8}{per_row:>14.0f}{peak / 2**20:>10.1f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Скорость и память выгрузки отчета в XLSX и CSV на синтетических строках
+(БД не нужна, проверяется только запись файла).
+
+Запуск:
+    python -m benchmarks.report_export [число строк, по умолчанию 1000000]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from database.projections import IncomeRow
+from services.export_service import REPORT_COLUMNS, write_xlsx, write_csv
+
+
+def income_rows(count):
+    base = datetime(2025, 1, 1)
+    for i in range(count):
+        yield IncomeRow(i + 1, base + timedelta(minutes=i), f"ООО Клиент {i % 300}",
+                        "Москва", "Казань", float(1000 + i % 5000))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    with tempfile.TemporaryDirectory() as folder:
+        for fmt, writer in (("xlsx", write_xlsx), ("csv", write_csv)):
+            path = os.path.join(folder, f"report.{fmt}")
+            started = time.perf_counter()
+            writer(path, REPORT_COLUMNS["income"], income_rows(count))
+            elapsed = time.perf_counter() - started
+            size = os.path.getsize(path)
+
+            # tracemalloc замедляет запись в разы, поэтому память меряется отдельным
+            # проходом на меньшем числе строк: пик от числа строк не зависит
+            peaks = []
+            for rows in (count // 100, count // 10):
+                tracemalloc.start()
+                writer(path, REPORT_COLUMNS["income"], income_rows(rows))
+                peaks.append(tracemalloc.get_traced_memory()[1] / 2**20)
+                tracemalloc.stop()
+            print(f"{fmt:5} {count} строк: {elapsed:6.1f} с   {size / 2**20:6.1f} МБ файл   "
+                  f"пик памяти на {count // 100} / {count // 10} строк: {peaks[0]:.1f} / {peaks[1]:.1f} МБ")
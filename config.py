@@ -11,12 +11,67 @@ encoded_pass = urllib.parse.quote_plus(DB_PASS)
 
 DATABASE_URL = f"postgresql://{DB_USER}:{encoded_pass}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Пул соединений. Любое значение можно переопределить переменной окружения.
+DB_POOL_SIZE = int(os.environ.get("LOGIST_DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("LOGIST_DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.environ.get("LOGIST_DB_POOL_TIMEOUT", 30))          # сек. ожидания свободного соединения
+DB_POOL_RECYCLE = int(os.environ.get("LOGIST_DB_POOL_RECYCLE", 1800))        # сек. жизни соединения
+DB_POOL_PRE_PING = os.environ.get("LOGIST_DB_POOL_PRE_PING", "1") == "1"
+DB_CONNECT_TIMEOUT = int(os.environ.get("LOGIST_DB_CONNECT_TIMEOUT", 5))      # сек. на установку соединения
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("LOGIST_DB_STATEMENT_TIMEOUT_MS", 30000))  # 0 - без ограничения
+
+# Реплика только для чтения (отчеты, панель, история клиента). Пусто - все запросы к основной БД.
+# Для проверки подойдет локальная резервная копия (pg_basebackup -R, запуск на другом порту)
+# или тот же DATABASE_URL - обычный сервер считается репликой без отставания
+# Пользователю реплики нужна роль pg_read_all_stats: без нее не виден статус приема WAL
+DB_REPLICA_URL = os.environ.get("LOGIST_DB_REPLICA_URL") or None
+DB_REPLICA_MAX_LAG = float(os.environ.get("LOGIST_DB_REPLICA_MAX_LAG", 30))            # сек. допустимого отставания
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get("LOGIST_DB_REPLICA_CHECK_INTERVAL", 5))  # сек. между проверками
+DB_REPLICA_RETRY_AFTER = float(os.environ.get("LOGIST_DB_REPLICA_RETRY_AFTER", 60))      # сек. на основной после сбоя
+
+# Печать замеров запуска в консоль (services/startup_timing.py)
+STARTUP_TIMING = os.environ.get("LOGIST_STARTUP_TIMING", "0") == "1"
+
+# Журнал операций: записи копятся в памяти и пишутся пачками (services/log_writer.py)
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOGIST_LOG_FLUSH_INTERVAL", 1.0))  # сек.
+LOG_BATCH_SIZE = int(os.environ.get("LOGIST_LOG_BATCH_SIZE", 200))
+LOG_BUFFER_LIMIT = int(os.environ.get("LOGIST_LOG_BUFFER_LIMIT", 10000))      # записей, пока БД недоступна (0 - без ограничения)
+LOG_RETENTION_DAYS = int(os.environ.get("LOGIST_LOG_RETENTION_DAYS", 365))    # 0 - хранить бессрочно
+LOG_PURGE_INTERVAL = float(os.environ.get("LOGIST_LOG_PURGE_INTERVAL", 86400))  # сек. между очистками
+
+# Архив заказов: закрытые заказы старше этого срока переносятся в orders_archive
+# (python -m database.archive). Год на панели должен оставаться в оперативной таблице
+ORDER_ARCHIVE_DAYS = int(os.environ.get("LOGIST_ORDER_ARCHIVE_DAYS", 730))
+ORDER_ARCHIVE_BATCH = int(os.environ.get("LOGIST_ORDER_ARCHIVE_BATCH", 5000))
+
+# Пакетное формирование документов (services/batch_docs.py)
+BATCH_DOCS_WORKERS = int(os.environ.get("LOGIST_BATCH_DOCS_WORKERS", 0))    # процессов; 0 - по числу ядер
+BATCH_DOCS_CHUNK = int(os.environ.get("LOGIST_BATCH_DOCS_CHUNK", 20))       # документов в одной задаче процесса
+BATCH_DOCS_LIMIT = int(os.environ.get("LOGIST_BATCH_DOCS_LIMIT", 5000))     # заказов в одном пакете
+# Заказов в одном общем PDF: pypdf держит все страницы в памяти до записи файла (~50 МБ на 1000 заказов)
+BATCH_DOCS_PDF_LIMIT = int(os.environ.get("LOGIST_BATCH_DOCS_PDF_LIMIT", 1000))
+
+# Отчеты: предпросмотр показывает первые строки и итоги из SQL, PDF и выгрузка
+# читают строки с серверного курсора порциями
+REPORT_PREVIEW_ROWS = int(os.environ.get("LOGIST_REPORT_PREVIEW_ROWS", 500))
+REPORT_STREAM_CHUNK = int(os.environ.get("LOGIST_REPORT_STREAM_CHUNK", 2000))
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 REPORTS_DIR = os.path.join(BASE_DIR, "reports")
 
 if not os.path.exists(REPORTS_DIR):
     os.makedirs(REPORTS_DIR)
 
+# Локальный кэш справочников и последнего снимка панели (SQLite)
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+LOCAL_CACHE_PATH = os.path.join(CACHE_DIR, "local_cache.sqlite3")
+# Запас при дозагрузке измененных строк: транзакция, начатая до прошлой
+# синхронизации и зафиксированная после нее, все равно будет учтена
+CACHE_SYNC_OVERLAP = int(os.environ.get("LOGIST_CACHE_SYNC_OVERLAP", 300))  # сек.
+
+if not os.path.exists(CACHE_DIR):
+    os.makedirs(CACHE_DIR)
+
 import os
 import sys
 
@@ -31,3 +86,6 @@ def get_resource_path(relative_path):
 
 STYLES_PATH = get_resource_path("styles.qss") 
 
+
+# Шрифты для PDF, поставляемые с программой (services/font_registry.py)
+BUNDLED_FONTS_DIR = get_resource_path("fonts") if getattr(sys, "frozen", False) else os.path.join(BASE_DIR, "resources", "fonts")
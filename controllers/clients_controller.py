@@ -1,7 +1,13 @@
-from database.connection import get_db
-from database.models import Client, Order
-from sqlalchemy.orm import joinedload
+from database.connection import get_db, read_only
+from database.models import Client
+from database.projections import ClientRow, ClientOrderRow
+from database.archive import orders_source
+from database.notifications import emit
+from sqlalchemy import or_
 from services.business_service import BusinessService
+from services.cache_service import CacheService, IdentityMap
+
+_identity_map = IdentityMap("clients")
 
 class ClientsController:
     def get_all(self):
@@ -9,11 +15,36 @@ class ClientsController:
         try: return db.query(Client).all()
         finally: db.close()
 
-    def get_client_orders(self, client_id):
+    def get_by_id(self, client_id):
+        found = self.get_many([client_id])
+        return found[0] if found else None
+
+    def get_many(self, ids):
+        """Записи по списку id в том же порядке. Уже загруженные берутся из кэша"""
+        return _identity_map.get_many(ids, lambda db, missing: db.query(Client).filter(Client.id.in_(missing)).all())
+
+    def search(self, text=None):
+        """Клиенты (ClientRow), у которых название или Email содержит text (без учета регистра)"""
+        db = get_db()
+        try:
+            q = db.query(*ClientRow.columns)
+            if text:
+                q = q.filter(or_(
+                    Client.name.icontains(text, autoescape=True),
+                    Client.email.icontains(text, autoescape=True)
+                ))
+            return ClientRow.from_rows(q.order_by(Client.id))
+        finally:
+            db.close()
+
+    @read_only
+    def get_client_orders(self, client_id, include_archive=False):
+        """История заказов клиента (ClientOrderRow), новые сверху; с include_archive - и архивные"""
+        orders = orders_source(include_archive)
         db = get_db()
         try:
-            # Подгружаем историю заказов клиента
-            return db.query(Order).options(joinedload(Order.vehicle)).filter(Order.client_id == client_id).all()
+            q = db.query(*ClientOrderRow.columns_for(orders)).filter(orders.client_id == client_id)
+            return ClientOrderRow.from_rows(q.order_by(orders.created_at.desc(), orders.id.desc()))
         finally:
             db.close()
 
@@ -25,8 +56,12 @@ class ClientsController:
 
         db = get_db()
         try:
-            db.add(Client(name=name, phone=phone, email=email, address=address))
+            client = Client(name=name, phone=phone, email=email, address=address)
+            db.add(client)
+            db.flush()
+            emit(db, "clients", "insert", [client.id])
             db.commit()
+            CacheService.invalidate("clients")
             return True, "Клиент добавлен."
         except:
             db.rollback()
@@ -44,7 +79,9 @@ class ClientsController:
             c = db.query(Client).get(client_id)
             if c:
                 c.name = name; c.phone = phone; c.email = email; c.address = address
+                emit(db, "clients", "update", [client_id])
                 db.commit()
+                CacheService.invalidate("clients")
                 return True, "Обновлено."
             return False, "Клиент не найден."
         finally: db.close()
@@ -53,8 +90,15 @@ class ClientsController:
         db = get_db()
         try:
             c = db.query(Client).filter(Client.id == client_id).first()
-            if c:
-                db.delete(c)
-                db.commit()
+            if not c:
+                return False, "Клиент не найден."
+            db.delete(c)
+            emit(db, "clients", "delete", [client_id])
+            db.commit()
+            CacheService.invalidate("clients")
+            return True, "Клиент удален."
+        except Exception as e:
+            db.rollback()
+            return False, f"Ошибка базы данных: {e}"
         finally:
             db.close()
\ No newline at end of file
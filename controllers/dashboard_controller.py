@@ -1,49 +1,126 @@
-from database.connection import get_db
+from database.connection import get_db, read_only
 from database.models import Order, Vehicle, WarehouseZone, User, SystemLog
-from sqlalchemy import desc
+from datetime import datetime, time, timedelta
+from sqlalchemy import desc, func, select, true
+from services.cache_service import CacheService, TTLCache
+
+SNAPSHOT_TTL = 30  # секунд
+SNAPSHOT_TABLES = ("orders", "vehicles", "warehouse_zones")
+
+_snapshot_cache = TTLCache(SNAPSHOT_TTL)
+# (роль, водитель) -> версия таблиц, под которой последний раз читался снимок
+_snapshot_versions = {}
+
+WEEKDAYS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+MONTHS = ["Янв", "Фев", "Мар", "Апр", "Май", "Июн", "Июл", "Авг", "Сен", "Окт", "Ноя", "Дек"]
 
 class DashboardController:
     def get_stats(self, user_id, role):
+        # Водителю показываются только его заказы, остальным ролям - общий снимок
+        who = (role, user_id if role == 'driver' else None)
+        version = CacheService.version(*SNAPSHOT_TABLES)
+        stats = _snapshot_cache.get((who, version))
+        if stats is None:
+            # Сразу после изменения реплика может его еще не получить, а снимок под
+            # новой версией остался бы в кэше на весь TTL: он читается с основной БД
+            if _snapshot_versions.get(who) == version:
+                stats = self._query_stats_read_only(user_id, role)
+            else:
+                stats = self._query_stats(user_id, role)
+            _snapshot_versions[who] = version
+            _snapshot_cache.set((who, version), stats)
+        return stats
+
+    def _query_stats(self, user_id, role):
+        """Все KPI панели одним запросом: условные счетчики и суммы"""
+        orders_q = select(
+            func.count().filter(Order.status == "В пути").label("active"),
+            func.count().filter(Order.status == "Новый").label("new"),
+            func.count().filter(Order.status == "Доставлен").label("done")
+        ).where(Order.status.in_(["В пути", "Новый", "Доставлен"]))
+        if role == 'driver':
+            orders_q = orders_q.join(Vehicle, Order.vehicle_id == Vehicle.id).where(Vehicle.driver_id == user_id)
+        orders_q = orders_q.subquery()
+
+        zones_q = select(
+            func.coalesce(func.sum(WarehouseZone.capacity), 0).label("capacity"),
+            func.coalesce(func.sum(WarehouseZone.occupied), 0).label("occupied")
+        ).subquery()
+
+        free_q = select(func.count()).select_from(Vehicle).where(Vehicle.status == "Свободен").scalar_subquery()
+
+        stmt = select(
+            orders_q.c.active, orders_q.c.new, orders_q.c.done,
+            free_q.label("free"), zones_q.c.capacity, zones_q.c.occupied
+        ).select_from(orders_q.join(zones_q, true()))
+
         db = get_db()
         try:
-            q_active = db.query(Order).filter(Order.status == "В пути")
-            q_new = db.query(Order).filter(Order.status == "Новый")
-            q_done = db.query(Order).filter(Order.status == "Доставлен")
-
-            if role == 'driver':
-                q_active = q_active.join(Vehicle).filter(Vehicle.driver_id == user_id)
-                q_new = q_new.join(Vehicle).filter(Vehicle.driver_id == user_id)
-                q_done = q_done.join(Vehicle).filter(Vehicle.driver_id == user_id)
-
-            active_orders = q_active.count()
-            new_orders = q_new.count()
-            done_orders = q_done.count()
-            
-            free_vehicles = db.query(Vehicle).filter(Vehicle.status == "Свободен").count()
-            
-            zones = db.query(WarehouseZone).all()
-            total_cap = sum(z.capacity for z in zones)
-            total_occ = sum(z.occupied for z in zones)
-            wh_percent = int((total_occ / total_cap * 100)) if total_cap > 0 else 0
-            
-            return active_orders, new_orders, done_orders, free_vehicles, wh_percent
+            r = db.execute(stmt).one()
+            wh_percent = int((r.occupied / r.capacity * 100)) if r.capacity > 0 else 0
+            return r.active, r.new, r.done, r.free, wh_percent
         finally:
             db.close()
 
-    def get_income_by_days(self):
+    _query_stats_read_only = read_only(_query_stats)
+
+    @read_only
+    def get_income(self, date_from, date_to, granularity="day"):
+        """Доходы (тыс. руб) за период [date_from, date_to], сгруппированные в БД.
+
+        granularity: 'day', 'week', 'month' или 'weekday' (Пн..Вс за весь период).
+        Возвращает список (подпись, сумма) без пропусков - пустые интервалы равны 0.
+        """
+        if granularity == "weekday":
+            bucket = func.extract("isodow", Order.created_at)
+        else:
+            bucket = func.date_trunc(granularity, Order.created_at)
+
+        # Полуинтервал по created_at, чтобы работал индекс ix_orders_created_at
+        stmt = select(bucket.label("bucket"), func.sum(Order.cost).label("total")).where(
+            Order.created_at >= datetime.combine(date_from, time.min),
+            Order.created_at < datetime.combine(date_to + timedelta(days=1), time.min),
+            Order.cost.isnot(None)
+        ).group_by(bucket)
+
         db = get_db()
         try:
-            income = [0.0, 0.0, 0.0, 0.0, 0.0]
-            orders = db.query(Order).all()
-            for o in orders:
-                if o.cost and o.created_at:
-                    weekday = o.created_at.weekday()
-                    if weekday < 5:
-                        income[weekday] += (o.cost / 1000.0) 
-            return income
+            rows = db.execute(stmt).all()
         finally:
             db.close()
 
+        if granularity == "weekday":
+            totals = {int(r.bucket): r.total for r in rows}
+            return [(WEEKDAYS[i], (totals.get(i + 1) or 0) / 1000.0) for i in range(7)]
+
+        totals = {r.bucket.date(): r.total for r in rows}
+        return [(self._bucket_label(d, granularity), (totals.get(d) or 0) / 1000.0)
+                for d in self._buckets(date_from, date_to, granularity)]
+
+    @staticmethod
+    def _buckets(date_from, date_to, granularity):
+        if granularity == "week":
+            d = date_from - timedelta(days=date_from.weekday())
+        elif granularity == "month":
+            d = date_from.replace(day=1)
+        else:
+            d = date_from
+        while d <= date_to:
+            yield d
+            if granularity == "week":
+                d += timedelta(days=7)
+            elif granularity == "month":
+                d = (d + timedelta(days=32)).replace(day=1)
+            else:
+                d += timedelta(days=1)
+
+    @staticmethod
+    def _bucket_label(d, granularity):
+        if granularity == "month":
+            return f"{MONTHS[d.month - 1]} {d:%y}"
+        return d.strftime("%d.%m")
+
+    @read_only
     def get_important_events(self):
         db = get_db()
         events = []
@@ -68,7 +145,7 @@ class DashboardController:
         db = get_db()
         logs = []
         try:
-            sys_logs = db.query(SystemLog).order_by(desc(SystemLog.id)).limit(6).all()
+            sys_logs = db.query(SystemLog).order_by(desc(SystemLog.created_at), desc(SystemLog.id)).limit(6).all()
             
             for l in sys_logs:
                 time_str = l.created_at.strftime("%H:%M")
@@ -0,0 +1,47 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import tuple_
+from database.connection import get_db
+from database.models import SystemLog
+from database.projections import LogRow
+from services.log_writer import LogWriter
+
+PAGE_SIZE = 100
+
+# Тип события -> название в фильтре журнала
+EVENT_TYPES = {
+    "Order": "Заказы",
+    "Notification": "Уведомления",
+    "Maintenance": "Обслуживание",
+}
+
+class LogsController:
+    def get_page(self, event_type=None, date_from=None, date_to=None, cursor=None, limit=PAGE_SIZE):
+        """Одна страница журнала, новые записи сверху.
+
+        date_from/date_to - даты включительно. cursor - (created_at, id) последней
+        строки предыдущей страницы. Возвращает (строки LogRow, курсор или None).
+        """
+        # Свои записи, еще не ушедшие в БД, дописываются перед чтением
+        LogWriter.flush()
+        db = get_db()
+        try:
+            q = db.query(*LogRow.columns)
+            if event_type:
+                q = q.filter(SystemLog.event_type == event_type)
+            if date_from:
+                q = q.filter(SystemLog.created_at >= datetime.combine(date_from, time.min))
+            if date_to:
+                q = q.filter(SystemLog.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+            if cursor is not None:
+                q = q.filter(tuple_(SystemLog.created_at, SystemLog.id) < tuple_(*cursor))
+
+            # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+            rows = q.order_by(SystemLog.created_at.desc(), SystemLog.id.desc()).limit(limit + 1).all()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = (rows[-1].created_at, rows[-1].id)
+            return LogRow.from_rows(rows), next_cursor
+        finally:
+            db.close()
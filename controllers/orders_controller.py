@@ -1,7 +1,77 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import func, literal, or_, tuple_, text as sql_text
 from sqlalchemy.orm import joinedload
-from database.connection import get_db
-from database.models import Order, Client, Vehicle, SystemLog, WarehouseZone
+from database.connection import get_db, read_only
+from database.models import Order, Client, Vehicle, WarehouseZone
+from database.projections import OrderRow, IncomeRow, DeliveredRow
+from database.notifications import emit
+from database.archive import orders_source
 from services.business_service import BusinessService
+from services.cache_service import CacheService, IdentityMap
+from services.log_writer import LogWriter
+from config import REPORT_STREAM_CHUNK
+
+PAGE_SIZE = 100
+
+# Колонки, по которым реестр можно сортировать. NULL заменяется на нейтральное
+# значение, иначе сравнение кортежей в keyset-условии теряет строки.
+SORT_COLUMNS = {
+    "id": Order.id,
+    "client": func.coalesce(Client.name, ""),
+    "status": func.coalesce(Order.status, ""),
+    "cost": func.coalesce(Order.cost, 0.0),
+    "created_at": func.coalesce(Order.created_at, datetime.min),
+}
+
+# Установлено ли pg_trgm (миграция 3 пропускает его, если на сервере нет contrib);
+# проверяется при первом поиске
+_trigram = None
+
+
+def _has_trigram(db):
+    global _trigram
+    if _trigram is None:
+        _trigram = db.execute(sql_text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")).scalar()
+    return _trigram
+
+
+# Заказ загружается вместе с клиентом, машиной и зоной склада
+_identity_map = IdentityMap("orders", "clients", "vehicles", "warehouse_zones")
+
+
+def _stream(row_class, build_query, chunk):
+    """Строки row_class с серверного курсора: в памяти одновременно не больше chunk строк.
+    build_query(db) строит запрос. Сессия и курсор открываются сразу при вызове -
+    в методе с @read_only это реплика, а ее отказ здесь же повторяется на основной БД.
+    Сессия открыта, пока строки читаются"""
+    db = get_db()
+    try:
+        result = db.execute(build_query(db).statement, execution_options={"yield_per": chunk})
+    except Exception:
+        db.close()
+        raise
+    return _read_stream(db, result, row_class)
+
+
+def _read_stream(db, result, row_class):
+    try:
+        for part in result.partitions():
+            yield from row_class.from_rows(part)
+    finally:
+        db.close()
+
+
+def _filter(q, status=None, driver_id=None, text=None):
+    """Фильтры реестра; в запросе q должен быть join на машину"""
+    if status:
+        q = q.filter(Order.status == status)
+    if driver_id is not None:
+        q = q.filter(Vehicle.driver_id == driver_id)
+    if text:
+        # search_doc - номер, клиент, груз и маршрут; ILIKE идет по триграммному индексу
+        q = q.filter(Order.search_doc.icontains(text, autoescape=True))
+    return q
+
 
 class OrdersController:
     def get_all(self):
@@ -15,6 +85,167 @@ class OrdersController:
         finally:
             db.close()
 
+    def get_by_id(self, order_id):
+        found = self.get_many([order_id])
+        return found[0] if found else None
+
+    def get_many(self, ids):
+        """Записи по списку id в том же порядке. Уже загруженные берутся из кэша"""
+        return _identity_map.get_many(ids, lambda db, missing: db.query(Order).options(
+            joinedload(Order.client),
+            joinedload(Order.vehicle).joinedload(Vehicle.driver),
+            joinedload(Order.warehouse_zone)
+        ).filter(Order.id.in_(missing)).all())
+
+    def get_page(self, status=None, driver_id=None, text=None, sort="id", descending=True, cursor=None, limit=PAGE_SIZE):
+        """Одна страница реестра. Фильтры, сортировка и пагинация выполняются в SQL.
+
+        cursor - значение (ключ сортировки, id) последней строки предыдущей страницы.
+        Возвращает (строки OrderRow, курсор следующей страницы или None).
+        """
+        sort_key = SORT_COLUMNS.get(sort, Order.id)
+        db = get_db()
+        try:
+            q = db.query(*OrderRow.columns).outerjoin(Order.client).outerjoin(Order.vehicle)
+
+            q = _filter(q, status, driver_id, text)
+
+            if cursor is not None:
+                row_key = tuple_(sort_key, Order.id)
+                q = q.filter(row_key < tuple_(*cursor) if descending else row_key > tuple_(*cursor))
+
+            if descending:
+                q = q.order_by(sort_key.desc(), Order.id.desc())
+            else:
+                q = q.order_by(sort_key.asc(), Order.id.asc())
+
+            # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+            q = q.add_columns(sort_key).limit(limit + 1)
+            rows = q.all()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = (rows[-1][-1], rows[-1][0])
+            return OrderRow.from_rows(row[:-1] for row in rows), next_cursor
+        finally:
+            db.close()
+
+    def get_rows(self, ids, status=None, driver_id=None, text=None):
+        """Строки реестра (OrderRow) с указанными id, которые проходят фильтры реестра"""
+        db = get_db()
+        try:
+            q = db.query(*OrderRow.columns).outerjoin(Order.client).outerjoin(Order.vehicle).filter(Order.id.in_(ids))
+            return OrderRow.from_rows(_filter(q, status, driver_id, text))
+        finally:
+            db.close()
+
+    def get_ids(self, status=None, driver_id=None, text=None, limit=None):
+        """Номера заказов, которые проходят фильтры реестра (по убыванию номера)"""
+        db = get_db()
+        try:
+            q = db.query(Order.id).outerjoin(Order.vehicle)
+            q = _filter(q, status, driver_id, text).order_by(Order.id.desc())
+            if limit:
+                q = q.limit(limit)
+            return [row.id for row in q]
+        finally:
+            db.close()
+
+    def search(self, query, limit=50, status=None, driver_id=None):
+        """Ранжированный поиск по номеру, клиенту, грузу и маршруту.
+
+        Совпадения ищутся по словам (tsvector, с учетом словоформ), по подстроке
+        и по похожести слов (pg_trgm, если установлено), поэтому опечатки тоже находят заказ.
+        """
+        ts_query = func.websearch_to_tsquery("russian", query)
+        rank = func.ts_rank(Order.search_tsv, ts_query)
+        matches = [Order.search_tsv.op("@@")(ts_query), Order.search_doc.icontains(query, autoescape=True)]
+
+        db = get_db()
+        try:
+            if _has_trigram(db):
+                rank = rank + func.word_similarity(query, Order.search_doc)
+                matches.append(literal(query).op("<%")(Order.search_doc))
+            q = db.query(*OrderRow.columns).outerjoin(Order.client).outerjoin(Order.vehicle).filter(or_(*matches))
+            if status:
+                q = q.filter(Order.status == status)
+            if driver_id is not None:
+                q = q.filter(Vehicle.driver_id == driver_id)
+            return OrderRow.from_rows(q.order_by(rank.desc(), Order.id.desc()).limit(limit))
+        finally:
+            db.close()
+
+    @read_only
+    def get_income_report(self, date_from, date_to, include_archive=False, limit=None):
+        """Заказы за период (даты включительно) для отчета о доходах (IncomeRow).
+        С include_archive - вместе с архивными, limit - только первые строки"""
+        db = get_db()
+        try:
+            return IncomeRow.from_rows(self._income_query(db, date_from, date_to, include_archive).limit(limit))
+        finally:
+            db.close()
+
+    @read_only
+    def iter_income_report(self, date_from, date_to, include_archive=False, chunk=REPORT_STREAM_CHUNK):
+        """Те же строки потоком (для PDF и выгрузки отчета за большой период)"""
+        return _stream(IncomeRow, lambda db: self._income_query(db, date_from, date_to, include_archive), chunk)
+
+    @read_only
+    def get_income_summary(self, date_from, date_to, include_archive=False):
+        """Итоги отчета о доходах, посчитанные в SQL: {"count", "cost"}"""
+        orders = orders_source(include_archive, "id", "cost", "created_at")
+        db = get_db()
+        try:
+            count, cost = db.query(func.count(orders.id), func.coalesce(func.sum(orders.cost), 0.0)
+                                   ).filter(*self._period(orders, date_from, date_to)).one()
+            return {"count": count, "cost": cost}
+        finally:
+            db.close()
+
+    @read_only
+    def get_delivered_report(self, date_from, date_to, include_archive=False, limit=None):
+        """Доставленные за период заказы (DeliveredRow)"""
+        db = get_db()
+        try:
+            return DeliveredRow.from_rows(self._delivered_query(db, date_from, date_to, include_archive).limit(limit))
+        finally:
+            db.close()
+
+    @read_only
+    def iter_delivered_report(self, date_from, date_to, include_archive=False, chunk=REPORT_STREAM_CHUNK):
+        return _stream(DeliveredRow, lambda db: self._delivered_query(db, date_from, date_to, include_archive), chunk)
+
+    @read_only
+    def get_delivered_summary(self, date_from, date_to, include_archive=False):
+        """Итоги отчета о доставленных грузах: {"count", "weight", "volume"}"""
+        orders = orders_source(include_archive, "id", "status", "weight", "volume", "created_at")
+        db = get_db()
+        try:
+            count, weight, volume = db.query(
+                func.count(orders.id), func.coalesce(func.sum(orders.weight), 0.0),
+                func.coalesce(func.sum(orders.volume), 0.0)
+            ).filter(orders.status == "Доставлен", *self._period(orders, date_from, date_to)).one()
+            return {"count": count, "weight": weight, "volume": volume}
+        finally:
+            db.close()
+
+    def _income_query(self, db, date_from, date_to, include_archive):
+        orders = orders_source(include_archive)
+        q = db.query(*IncomeRow.columns_for(orders)).outerjoin(orders.client)
+        return q.filter(*self._period(orders, date_from, date_to)).order_by(orders.id)
+
+    def _delivered_query(self, db, date_from, date_to, include_archive):
+        orders = orders_source(include_archive)
+        q = db.query(*DeliveredRow.columns_for(orders)).filter(orders.status == "Доставлен")
+        return q.filter(*self._period(orders, date_from, date_to)).order_by(orders.id)
+
+    @staticmethod
+    def _period(orders, date_from, date_to):
+        """Условия на created_at для периода с date_from по date_to включительно"""
+        return (orders.created_at >= datetime.combine(date_from, time.min),
+                orders.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+
     def add(self, zone_id, client_id, weight, volume, start, end, vehicle_id):
         db = get_db()
         if float(weight) <= 0: return False, "Вес груза должен быть больше 0."
@@ -47,13 +278,13 @@ class OrdersController:
                 vehicle_id=v_id
             )
             db.add(new_order)
+            db.flush()
+            emit(db, "orders", "insert", [new_order.id])
+            emit(db, "warehouse_zones", "update", [zone_id])
 
-            db.add(SystemLog(
-                event_type="Order", 
-                description=f"Создан заказ на {weight}кг ({desc_text}). Со склада списано."
-            ))
-            
             db.commit()
+            CacheService.invalidate("orders", "warehouse_zones")
+            LogWriter.write("Order", f"Создан заказ на {weight}кг ({desc_text}). Со склада списано.")
             return True, "Заказ создан, груз списан со склада!"
         except Exception as e:
             db.rollback()
@@ -74,14 +305,17 @@ class OrdersController:
                 order.route_end = end
                 
                 if old_status != status:
-                    db.add(SystemLog(event_type="Order", description=f"Заказ #{order_id}: Статус {status}"))
-                    
                     if status == "Доставлен" and order.vehicle_id:
                         v = db.query(Vehicle).get(order.vehicle_id)
                         v.total_mileage += order.distance
                         v.trips_since_service += 1
+                        emit(db, "vehicles", "update", [v.id])
 
+                emit(db, "orders", "update", [order_id])
                 db.commit()
+                CacheService.invalidate("orders", "vehicles")
+                if old_status != status:
+                    LogWriter.write("Order", f"Заказ #{order_id}: Статус {status}")
                 return True, "Обновлено"
             return False, "Не найдено"
         finally:
@@ -91,9 +325,16 @@ class OrdersController:
         db = get_db()
         try:
             order = db.query(Order).get(order_id)
-            if order:
-                db.delete(order)
-                db.commit()
+            if not order:
+                return False, "Заказ не найден."
+            db.delete(order)
+            emit(db, "orders", "delete", [order_id])
+            db.commit()
+            CacheService.invalidate("orders")
+            return True, "Заказ удален."
+        except Exception as e:
+            db.rollback()
+            return False, f"Ошибка базы данных: {e}"
         finally:
             db.close()
             
@@ -0,0 +1,47 @@
+from datetime import timedelta
+from sqlalchemy import func
+from database.connection import get_db, SessionLocal
+from database.models import Client, Vehicle, WarehouseZone, TableWatermark
+from database.projections import ClientRow, VehicleRefRow, ZoneRow
+
+# Справочник -> (модель, строка для списков)
+REFERENCE_TABLES = {
+    "clients": (Client, ClientRow),
+    "vehicles": (Vehicle, VehicleRefRow),
+    "warehouse_zones": (WarehouseZone, ZoneRow),
+}
+
+class ReferenceController:
+    """Запросы для синхронизации локального кэша справочников"""
+
+    def get_watermark(self, table):
+        db = get_db()
+        try:
+            return db.query(TableWatermark.version).filter(TableWatermark.table_name == table).scalar() or 0
+        finally:
+            db.close()
+
+    def get_changes(self, table, since=None, overlap=0):
+        """Изменения справочника после since (все строки, если since=None).
+
+        Все читается из одного снимка БД (REPEATABLE READ), поэтому отметка
+        согласована со строками. Возвращает (отметка, время сервера,
+        измененные строки, id всех строк) - по списку id находятся удаленные.
+        """
+        model, row_cls = REFERENCE_TABLES[table]
+        # Своя сессия и внутри unit_of_work: уровень изоляции задается до начала транзакции
+        db = SessionLocal()
+        try:
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            watermark = db.query(TableWatermark.version).filter(TableWatermark.table_name == table).scalar() or 0
+            server_time = db.query(func.clock_timestamp()).scalar()
+
+            q = db.query(*row_cls.columns)
+            if since is not None:
+                q = q.filter(model.updated_at >= since - timedelta(seconds=overlap))
+            rows = row_cls.from_rows(q.order_by(model.id))
+            ids = [i for i, in db.query(model.id)] if since is not None else [r.id for r in rows]
+            db.commit()
+            return watermark, server_time, rows, ids
+        finally:
+            db.close()
@@ -0,0 +1,73 @@
+from database.connection import get_db, read_only
+from database.models import TableWatermark
+from controllers.orders_controller import OrdersController
+from controllers.transport_controller import TransportController
+from services.cache_service import TTLCache
+from config import REPORT_PREVIEW_ROWS
+
+# Отчет -> таблицы, от которых зависят его данные (счетчики из table_watermarks).
+# Архив меняется только вместе с orders, поэтому отдельного счетчика у него нет
+REPORT_TABLES = {
+    "income": ("orders", "clients"),
+    "delivered": ("orders",),
+    "transport": ("orders", "vehicles"),
+}
+
+# Результаты живут, пока не изменились данные; TTL лишь ограничивает память
+_report_cache = TTLCache(3600, max_size=8)
+
+class ReportsController:
+    """Данные отчетов с кэшем результатов.
+
+    Ключ кэша - (отчет, период, архив, счетчики изменений таблиц), поэтому
+    повторное открытие того же периода не идет в БД, пока данные не менялись
+    ни в этом, ни в другом клиенте. Кэшируется только предпросмотр: первые
+    REPORT_PREVIEW_ROWS строк и итоги. Полный отчет (PDF, выгрузка) читается
+    потоком через iter_rows.
+    """
+
+    @read_only
+    def get_report(self, r_type, date_from, date_to, include_archive=False):
+        """(первые строки отчета, итоги из SQL или None для отчета по транспорту)"""
+        # Счетчики читаются до данных и из того же источника: @read_only выбирает основную
+        # БД или реплику один раз на вызов. Если данные изменятся во время чтения,
+        # запись просто не совпадет со следующим ключом
+        key = (r_type, date_from, date_to, include_archive, self.get_watermarks(*REPORT_TABLES[r_type]))
+        data = _report_cache.get(key)
+        if data is None:
+            data = self._query(r_type, date_from, date_to, include_archive)
+            _report_cache.set(key, data)
+        return data
+
+    def iter_rows(self, r_type, date_from, date_to, include_archive=False):
+        """Все строки отчета. Заказы идут с серверного курсора порциями,
+        поэтому память не зависит от длины периода"""
+        if r_type == "income":
+            return OrdersController().iter_income_report(date_from, date_to, include_archive)
+        if r_type == "delivered":
+            return OrdersController().iter_delivered_report(date_from, date_to, include_archive)
+        if r_type == "transport":
+            # Машин немного, список целиком
+            return iter(TransportController().get_fleet(date_from, date_to, include_archive))
+        raise ValueError(f"Неизвестный отчет: {r_type}")
+
+    def _query(self, r_type, date_from, date_to, include_archive):
+        orders = OrdersController()
+        if r_type == "income":
+            return (orders.get_income_report(date_from, date_to, include_archive, limit=REPORT_PREVIEW_ROWS),
+                    orders.get_income_summary(date_from, date_to, include_archive))
+        if r_type == "delivered":
+            return (orders.get_delivered_report(date_from, date_to, include_archive, limit=REPORT_PREVIEW_ROWS),
+                    orders.get_delivered_summary(date_from, date_to, include_archive))
+        if r_type == "transport":
+            return TransportController().get_fleet(date_from, date_to, include_archive), None
+        raise ValueError(f"Неизвестный отчет: {r_type}")
+
+    def get_watermarks(self, *tables):
+        db = get_db()
+        try:
+            rows = dict(db.query(TableWatermark.table_name, TableWatermark.version)
+                        .filter(TableWatermark.table_name.in_(tables)))
+            return tuple(rows.get(t, 0) for t in tables)
+        finally:
+            db.close()
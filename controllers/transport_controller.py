@@ -1,19 +1,59 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import and_
 from sqlalchemy.orm import joinedload
-from database.connection import get_db
+from database.connection import get_db, read_only
 from database.models import Vehicle, User
+from database.projections import VehicleRow
+from database.notifications import emit
+from database.archive import orders_source
 from services.business_service import BusinessService
+from services.cache_service import CacheService, IdentityMap
+
+_identity_map = IdentityMap("vehicles")
 
 class TransportController:
     def get_all(self):
         db = get_db()
         try:
-            return db.query(Vehicle).options(
-                joinedload(Vehicle.driver), 
-                joinedload(Vehicle.orders)
-            ).all()
+            return db.query(Vehicle).options(joinedload(Vehicle.driver)).all()
+        finally:
+            db.close()
+
+    @read_only
+    def get_fleet(self, date_from=None, date_to=None, include_archive=False):
+        """Список машин с водителем и показателями рейсов за период (даты включительно).
+
+        Рейсы, пробег и дата последнего рейса считаются агрегатами в SQL,
+        заказы в память не загружаются. С include_archive учитываются и архивные
+        заказы. Возвращает строки VehicleRow.
+        """
+        orders = orders_source(include_archive, "id", "vehicle_id", "distance", "created_at")
+        join_on = [orders.vehicle_id == Vehicle.id]
+        if date_from:
+            join_on.append(orders.created_at >= datetime.combine(date_from, time.min))
+        if date_to:
+            join_on.append(orders.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+
+        db = get_db()
+        try:
+            q = db.query(*VehicleRow.columns_for(orders)
+            ).outerjoin(User, Vehicle.driver_id == User.id
+            ).outerjoin(orders, and_(*join_on)
+            ).group_by(Vehicle.id, User.id
+            ).order_by(Vehicle.id)
+            return VehicleRow.from_rows(q)
         finally:
             db.close()
-            
+
+    def get_by_id(self, v_id):
+        found = self.get_many([v_id])
+        return found[0] if found else None
+
+    def get_many(self, ids):
+        """Записи по списку id в том же порядке. Уже загруженные берутся из кэша"""
+        return _identity_map.get_many(ids, lambda db, missing: db.query(Vehicle).options(
+            joinedload(Vehicle.driver)).filter(Vehicle.id.in_(missing)).all())
+
     def get_drivers(self):
         db = get_db()
         try:
@@ -37,7 +77,10 @@ class TransportController:
                 driver_id=d_id
             )
             db.add(new_v)
+            db.flush()
+            emit(db, "vehicles", "insert", [new_v.id])
             db.commit()
+            CacheService.invalidate("vehicles")
             return True, "Транспорт добавлен."
         except:
             db.rollback()
@@ -57,7 +100,9 @@ class TransportController:
                 v.capacity = float(capacity)
                 v.status = status
                 v.driver_id = driver_id if driver_id != -1 else None
+                emit(db, "vehicles", "update", [v_id])
                 db.commit()
+                CacheService.invalidate("vehicles")
                 return True, "Транспорт обновлен."
             return False, "ТС не найдено."
         finally: db.close()
@@ -66,8 +111,15 @@ class TransportController:
         db = get_db()
         try:
             v = db.query(Vehicle).filter(Vehicle.id == v_id).first()
-            if v:
-                db.delete(v)
-                db.commit()
+            if not v:
+                return False, "Транспорт не найден."
+            db.delete(v)
+            emit(db, "vehicles", "delete", [v_id])
+            db.commit()
+            CacheService.invalidate("vehicles")
+            return True, "Транспорт удален."
+        except Exception as e:
+            db.rollback()
+            return False, f"Ошибка базы данных: {e}"
         finally:
             db.close()
\ No newline at end of file
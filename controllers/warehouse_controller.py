@@ -1,5 +1,10 @@
 from database.connection import get_db
 from database.models import WarehouseZone
+from database.projections import ZoneRow
+from database.notifications import emit
+from services.cache_service import CacheService, IdentityMap
+
+_identity_map = IdentityMap("warehouse_zones")
 
 class WarehouseController:
     def get_all(self):
@@ -9,6 +14,23 @@ class WarehouseController:
         finally:
             db.close()
 
+    def get_rows(self):
+        """Зоны для списка склада (ZoneRow)"""
+        db = get_db()
+        try:
+            return ZoneRow.from_rows(db.query(*ZoneRow.columns).order_by(WarehouseZone.id))
+        finally:
+            db.close()
+
+    def get_by_id(self, z_id):
+        found = self.get_many([z_id])
+        return found[0] if found else None
+
+    def get_many(self, ids):
+        """Записи по списку id в том же порядке. Уже загруженные берутся из кэша"""
+        return _identity_map.get_many(ids, lambda db, missing: db.query(WarehouseZone).filter(
+            WarehouseZone.id.in_(missing)).all())
+
     def add(self, name, capacity, type):
         if not name or len(name) > 50: return False, "Название зоны до 50 символов."
         if float(capacity) <= 0: return False, "Вместимость должна быть больше 0."
@@ -17,7 +39,10 @@ class WarehouseController:
         try:
             z = WarehouseZone(name=name, capacity=float(capacity), occupied=0, cargo_type=type)
             db.add(z)
+            db.flush()
+            emit(db, "warehouse_zones", "insert", [z.id])
             db.commit()
+            CacheService.invalidate("warehouse_zones")
             return True, "Зона создана."
         except:
             return False, "Ошибка базы данных."
@@ -31,7 +56,9 @@ class WarehouseController:
             if z:
                 if new_load > z.capacity: return False, "Загрузка не может превышать вместимость."
                 z.occupied = float(new_load)
+                emit(db, "warehouse_zones", "update", [zone_id])
                 db.commit()
+                CacheService.invalidate("warehouse_zones")
                 return True, "Остатки обновлены."
             return False, "Зона не найдена."
         finally: db.close()
@@ -40,8 +67,15 @@ class WarehouseController:
         db = get_db()
         try:
             z = db.query(WarehouseZone).filter(WarehouseZone.id == z_id).first()
-            if z:
-                db.delete(z)
-                db.commit()
+            if not z:
+                return False, "Зона не найдена."
+            db.delete(z)
+            emit(db, "warehouse_zones", "delete", [z_id])
+            db.commit()
+            CacheService.invalidate("warehouse_zones")
+            return True, "Зона удалена."
+        except Exception as e:
+            db.rollback()
+            return False, f"Ошибка базы данных: {e}"
         finally:
             db.close()
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""Архив закрытых заказов.
+
+Оперативная таблица orders содержит только действующие и недавние заказы -
+все экраны и панель работают с ней. Доставленные и отмененные заказы старше
+ORDER_ARCHIVE_DAYS переносятся в orders_archive с тем же номером. Архив
+читается явно: отчеты и история клиента с флагом include_archive.
+
+Запуск вручную (или по расписанию):
+    python -m database.archive                - перенести заказы старше ORDER_ARCHIVE_DAYS
+    python -m database.archive --days 365     - другой срок
+    python -m database.archive --dry-run      - только посчитать кандидатов
+"""
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import select, union_all, text, func, bindparam
+from sqlalchemy.orm import aliased
+from config import ORDER_ARCHIVE_DAYS, ORDER_ARCHIVE_BATCH
+from database.connection import get_db
+from database.models import Order, OrderArchive
+from database.notifications import emit
+
+ARCHIVE_STATUSES = ("Доставлен", "Отменен")
+
+# Колонки, общие для orders и orders_archive
+ARCHIVE_COLUMNS = ("id", "description", "status", "weight", "volume", "route_start", "route_end",
+                   "distance", "cost", "created_at", "client_id", "vehicle_id", "warehouse_zone_id")
+
+
+def orders_source(include_archive, *names):
+    """Сущность для запросов к заказам: Order или, с архивом, объединение
+    orders и orders_archive с колонками names (имена атрибутов Order).
+    С ней работают как с Order: source.created_at, outerjoin(source.client)"""
+    if not include_archive:
+        return Order
+    names = names or ARCHIVE_COLUMNS
+    combined = union_all(
+        select(*(getattr(Order, name) for name in names)),
+        select(*(getattr(OrderArchive, name) for name in names)),
+    ).subquery("orders_all")
+    return aliased(Order, combined, adapt_on_names=True)
+
+
+def count_candidates(days=ORDER_ARCHIVE_DAYS):
+    cutoff = datetime.now() - timedelta(days=days)
+    db = get_db()
+    try:
+        return db.query(func.count(Order.id)).filter(
+            Order.status.in_(ARCHIVE_STATUSES), Order.created_at < cutoff).scalar()
+    finally:
+        db.close()
+
+
+def archive_orders(days=ORDER_ARCHIVE_DAYS, batch_size=ORDER_ARCHIVE_BATCH, progress=None):
+    """Переносит закрытые заказы старше days дней в архив порциями по batch_size.
+
+    Каждая порция - отдельная короткая транзакция: удаление из orders и вставка
+    в архив одной командой. Возвращает число перенесенных заказов.
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    statement = text(f"""
+        WITH moved AS (
+            DELETE FROM orders WHERE id IN (
+                SELECT id FROM orders
+                WHERE status IN :statuses AND created_at < :cutoff
+                ORDER BY created_at LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED)
+            RETURNING {columns})
+        INSERT INTO orders_archive ({columns})
+        SELECT {columns} FROM moved
+        RETURNING id
+    """).bindparams(bindparam("statuses", ARCHIVE_STATUSES, expanding=True),
+                    cutoff=cutoff, batch_size=batch_size)
+
+    moved = 0
+    while True:
+        db = get_db()
+        try:
+            ids = db.execute(statement).scalars().all()
+            if ids:
+                # Открытые клиенты уберут эти заказы из реестра
+                emit(db, "orders", "delete", ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        moved += len(ids)
+        if progress and ids:
+            progress(moved)
+        if len(ids) < batch_size:
+            return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос закрытых заказов в архив")
+    parser.add_argument("--days", type=int, default=ORDER_ARCHIVE_DAYS,
+                        help=f"возраст заказа в днях (по умолчанию {ORDER_ARCHIVE_DAYS})")
+    parser.add_argument("--batch", type=int, default=ORDER_ARCHIVE_BATCH, help="заказов в одной транзакции")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать заказы для переноса")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        print(f"К переносу: {count_candidates(args.days)} заказов старше {args.days} дн.")
+    else:
+        total = archive_orders(args.days, args.batch, progress=lambda n: print(f"Перенесено: {n}"))
+        print(f"Готово, перенесено заказов: {total}")
+        # Обслуживание заодно удаляет записи журнала старше LOG_RETENTION_DAYS
+        from services.log_writer import LogWriter
+        print(f"Удалено записей журнала: {LogWriter.purge()}")
@@ -1,16 +1,299 @@
-from sqlalchemy import create_engine
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from sqlalchemy.pool import QueuePool
+from config import (DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_CONNECT_TIMEOUT, DB_STATEMENT_TIMEOUT_MS,
+                    DB_REPLICA_URL, DB_REPLICA_MAX_LAG, DB_REPLICA_CHECK_INTERVAL, DB_REPLICA_RETRY_AFTER)
 from database.models import Base, User, Client, Vehicle, WarehouseZone, Order, SystemLog
 import hashlib
 import random
 
-engine = create_engine(DATABASE_URL, echo=False)
+
+class PoolMetrics:
+    """Счетчики выдачи соединений из пула и времени ожидания"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self):
+        with self._lock:
+            return self.checkouts, self.wait_total, self.wait_max
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool, который замеряет время получения соединения
+    (ожидание свободного или открытие нового)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record(time.perf_counter() - start)
+
+
+connect_args = {"connect_timeout": DB_CONNECT_TIMEOUT}
+if DB_STATEMENT_TIMEOUT_MS:
+    connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    poolclass=MeteredQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=connect_args
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Реплика: транзакции только на чтение, пул как у основной БД (метрики - только основной)
+replica_engine = None
+ReplicaSessionLocal = None
+if DB_REPLICA_URL:
+    replica_connect_args = dict(connect_args)
+    replica_connect_args["options"] = (connect_args.get("options", "") + " -c default_transaction_read_only=on").strip()
+    replica_engine = create_engine(
+        DB_REPLICA_URL,
+        echo=False,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=replica_connect_args
+    )
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+# Сессия текущего unit_of_work (своя для каждого потока/контекста)
+_current_uow = contextvars.ContextVar("unit_of_work", default=None)
+
+
+class UnitOfWorkSession:
+    """Обертка над сессией внутри unit_of_work.
+
+    Контроллеры работают с ней как с обычной сессией из get_db(), но commit()
+    только отправляет изменения в БД (flush), а close() ничего не делает:
+    транзакцию фиксирует и сессию закрывает сам unit_of_work.
+    """
+
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def commit(self):
+        self._session.flush()
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def unit_of_work():
+    """Одна сессия и одна транзакция на все вызовы контроллеров внутри блока.
+
+    Полученные объекты остаются привязанными к сессии до конца блока, поэтому
+    ленивые связи догружаются без ошибок. Вложенный блок присоединяется к внешнему.
+    """
+    current = _current_uow.get()
+    if current is not None:
+        yield current
+        return
+
+    # expire_on_commit=False: после выхода из блока объекты сохраняют загруженные значения
+    session = SessionLocal(expire_on_commit=False)
+    uow = UnitOfWorkSession(session)
+    token = _current_uow.set(uow)
+    try:
+        yield uow
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        _current_uow.reset(token)
+        session.close()
+
+
+def in_unit_of_work():
+    return _current_uow.get() is not None
+
+
+# --- Маршрутизация чтения на реплику ---
+
+# Внутри методов с @read_only - откуда читается весь вызов: "replica" или "primary"
+_read_source = contextvars.ContextVar("read_source", default=None)
+
+# Отставание реплики в секундах. Если реплика догнала основную БД (весь
+# полученный WAL применен), отставание 0, даже если изменений давно не было.
+# Резервный сервер без потоковой репликации (приемник WAL отключен) получает
+# NULL - "весь полученный WAL применен" для него ничего не значит. Статус
+# приемника виден только ролям с pg_read_all_stats, иначе реплика тоже не используется.
+# Обычный (не резервный) сервер в роли реплики всегда считается актуальным.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaState:
+    """Можно ли сейчас читать с реплики. Отставание проверяется не чаще раза
+    в DB_REPLICA_CHECK_INTERVAL; после сбоя реплика не используется
+    DB_REPLICA_RETRY_AFTER секунд"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_at = None
+        self.lag = None
+        self.down_until = 0.0
+
+    def usable(self):
+        if replica_engine is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now < self.down_until:
+                return False
+            if self.checked_at is not None and now - self.checked_at < DB_REPLICA_CHECK_INTERVAL:
+                return self.lag is not None and self.lag <= DB_REPLICA_MAX_LAG
+            self.checked_at = now
+        try:
+            with replica_engine.connect() as conn:
+                lag = conn.execute(REPLICA_LAG_SQL).scalar()
+        except OperationalError as e:
+            self.mark_down(e)
+            return False
+        # Реплика, не получающая WAL, считается сколь угодно отставшей
+        lag = float("inf") if lag is None else float(lag)
+        with self._lock:
+            self.lag = lag
+        if lag == float("inf"):
+            print("Реплика не получает WAL от основной БД, чтение идет с основной БД")
+            return False
+        if lag > DB_REPLICA_MAX_LAG:
+            print(f"Реплика отстает на {lag:.0f} с, чтение идет с основной БД")
+            return False
+        return True
+
+    def mark_down(self, error):
+        print(f"Реплика недоступна, чтение идет с основной БД: {error}")
+        with self._lock:
+            self.down_until = time.monotonic() + DB_REPLICA_RETRY_AFTER
+            self.lag = None
+
+
+replica_state = ReplicaState()
+
+
+def read_only(method):
+    """Метод контроллера только читает данные и может выполняться на реплике.
+
+    Источник выбирается один раз на вызов: все сессии из get_db() внутри метода
+    (и вложенных методов с @read_only) берутся с реплики, если она настроена,
+    доступна и отстает не больше DB_REPLICA_MAX_LAG, иначе - с основной БД.
+    Если реплика отказала во время запроса, метод выполняется повторно на
+    основной БД. Внутри unit_of_work чтение всегда идет в его транзакции.
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if _read_source.get() is not None:
+            return method(*args, **kwargs)
+        source = "replica" if not in_unit_of_work() and replica_state.usable() else "primary"
+        token = _read_source.set(source)
+        try:
+            return method(*args, **kwargs)
+        except OperationalError as e:
+            if source != "replica":
+                raise
+            replica_state.mark_down(e)
+        finally:
+            _read_source.reset(token)
+        token = _read_source.set("primary")
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _read_source.reset(token)
+    return wrapper
+
+
 def get_db():
+    uow = _current_uow.get()
+    if uow is not None:
+        return uow
+    if _read_source.get() == "replica":
+        return ReplicaSessionLocal()
     return SessionLocal()
 
+
+def get_pool_stats():
+    """Текущее состояние пула и накопленные метрики ожидания"""
+    pool = engine.pool
+    checkouts, wait_total, wait_max = pool_metrics.snapshot()
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkouts,
+        "wait_avg_ms": wait_total / checkouts * 1000 if checkouts else 0.0,
+        "wait_max_ms": wait_max * 1000,
+    }
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # Изменения существующих таблиц (индексы и т.п.) - через версионные миграции
+    from database.migrations import migrate
+    migrate(engine)
+
+
+def ensure_schema():
+    """Быстрая проверка схемы при запуске: create_all и миграции выполняются,
+    только если версия схемы в БД отстает от последней миграции.
+    Возвращает True, если схема обновлялась."""
+    from database.migrations import current_version, latest_version
+    with engine.begin() as conn:
+        version = current_version(conn)
+    if version >= latest_version():
+        return False
+    init_db()
+    return True
+
 
+def warm_pool(count=DB_POOL_SIZE):
+    """Заранее открывает count соединений пула, чтобы первые запросы не ждали подключения"""
+    connections = []
+    try:
+        for _ in range(count):
+            conn = engine.connect()
+            connections.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            conn.close()
@@ -0,0 +1,326 @@
+"""Версионные миграции схемы.
+
+create_all создает только отсутствующие таблицы и не меняет существующие,
+поэтому все изменения уже развернутой схемы (индексы, новые колонки) идут
+через список MIGRATIONS. Примененные версии хранятся в таблице schema_version.
+
+Запуск вручную:
+    python -m database.migrations          - применить новые миграции
+    python -m database.migrations --check  - показать запросы контроллеров с Seq Scan
+"""
+import sys
+from sqlalchemy import event, text
+from database.connection import engine, _read_source
+
+# (версия, описание, SQL-команды). Уже примененные миграции не меняются -
+# любое исправление оформляется новой версией.
+MIGRATIONS = [
+    (1, "Индексы заказов под фильтры реестра, панели и отчетов", [
+        # Период на панели и в отчетах
+        "CREATE INDEX IF NOT EXISTS ix_orders_created_at ON orders (created_at)",
+        # Фильтр по статусу в реестре с сортировкой по умолчанию и счетчики панели
+        "CREATE INDEX IF NOT EXISTS ix_orders_status_id ON orders (status, id DESC)",
+        # История заказов клиента
+        "CREATE INDEX IF NOT EXISTS ix_orders_client_id ON orders (client_id, created_at DESC)",
+        # Заказы водителя (через машину) и рейсы машины
+        "CREATE INDEX IF NOT EXISTS ix_orders_vehicle_id ON orders (vehicle_id, id DESC) WHERE vehicle_id IS NOT NULL",
+        # Отчет о доставленных грузах за период
+        "CREATE INDEX IF NOT EXISTS ix_orders_delivered_created_at ON orders (created_at) WHERE status = 'Доставлен'",
+        "ANALYZE orders",
+    ]),
+    (2, "Индексы транспорта, пользователей и журнала", [
+        "CREATE INDEX IF NOT EXISTS ix_vehicles_driver_id ON vehicles (driver_id) WHERE driver_id IS NOT NULL",
+        # Счетчик свободных машин и список машин на ремонте
+        "CREATE INDEX IF NOT EXISTS ix_vehicles_status ON vehicles (status)",
+        "CREATE INDEX IF NOT EXISTS ix_users_role ON users (role)",
+        "CREATE INDEX IF NOT EXISTS ix_system_logs_event_type ON system_logs (event_type, id DESC)",
+        "ANALYZE vehicles",
+        "ANALYZE users",
+        "ANALYZE system_logs",
+    ]),
+    (3, "Полнотекстовый и триграммный поиск по заказам", [
+        # pg_trgm (contrib) есть не на каждом сервере: без него остаются tsvector и ILIKE,
+        # а OrdersController.search не использует похожесть слов
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            END IF;
+        EXCEPTION WHEN OTHERS THEN
+            RAISE NOTICE 'pg_trgm не установлен: %', SQLERRM;
+        END
+        $$
+        """,
+        # Текст для поиска: номер, клиент, груз и маршрут. Заполняется триггером,
+        # tsvector вычисляется из него самой БД (generated column)
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS search_doc TEXT",
+        "ALTER TABLE orders ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR "
+        "GENERATED ALWAYS AS (to_tsvector('russian', coalesce(search_doc, ''))) STORED",
+        """
+        CREATE OR REPLACE FUNCTION orders_search_doc_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_doc := concat_ws(' ', NEW.id::text,
+                (SELECT name FROM clients WHERE id = NEW.client_id),
+                NEW.description, NEW.route_start, NEW.route_end);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS orders_search_doc_update ON orders",
+        "CREATE TRIGGER orders_search_doc_update "
+        "BEFORE INSERT OR UPDATE OF client_id, description, route_start, route_end ON orders "
+        "FOR EACH ROW EXECUTE FUNCTION orders_search_doc_update()",
+        # Переименование клиента обновляет поисковый текст его заказов
+        """
+        CREATE OR REPLACE FUNCTION clients_search_doc_refresh() RETURNS trigger AS $$
+        BEGIN
+            UPDATE orders SET client_id = client_id WHERE client_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS clients_search_doc_refresh ON clients",
+        "CREATE TRIGGER clients_search_doc_refresh "
+        "AFTER UPDATE OF name ON clients "
+        "FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name) "
+        "EXECUTE FUNCTION clients_search_doc_refresh()",
+        # Заполнение для уже существующих заказов
+        """
+        UPDATE orders o SET search_doc = concat_ws(' ', o.id::text,
+            (SELECT name FROM clients c WHERE c.id = o.client_id),
+            o.description, o.route_start, o.route_end)
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_orders_search_tsv ON orders USING gin (search_tsv)",
+        # Индекс - только если расширение дает класс операторов для GIN
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_opclass WHERE opcname = 'gin_trgm_ops') THEN
+                CREATE INDEX IF NOT EXISTS ix_orders_search_trgm ON orders USING gin (search_doc gin_trgm_ops);
+            END IF;
+        END
+        $$
+        """,
+        "ANALYZE orders",
+    ]),
+    (4, "Отметки изменений для локального кэша справочников", [
+        # Время последнего изменения строки - для дозагрузки только измененных строк
+        "ALTER TABLE clients ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now()",
+        "ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now()",
+        "ALTER TABLE warehouse_zones ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now()",
+        """
+        CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := clock_timestamp();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS clients_touch_updated_at ON clients",
+        "CREATE TRIGGER clients_touch_updated_at BEFORE INSERT OR UPDATE ON clients "
+        "FOR EACH ROW EXECUTE FUNCTION touch_updated_at()",
+        "DROP TRIGGER IF EXISTS vehicles_touch_updated_at ON vehicles",
+        "CREATE TRIGGER vehicles_touch_updated_at BEFORE INSERT OR UPDATE ON vehicles "
+        "FOR EACH ROW EXECUTE FUNCTION touch_updated_at()",
+        "DROP TRIGGER IF EXISTS warehouse_zones_touch_updated_at ON warehouse_zones",
+        "CREATE TRIGGER warehouse_zones_touch_updated_at BEFORE INSERT OR UPDATE ON warehouse_zones "
+        "FOR EACH ROW EXECUTE FUNCTION touch_updated_at()",
+        # Счетчик изменений таблицы: одна строка на таблицу, увеличивается
+        # один раз на каждую изменяющую команду (триггер уровня команды)
+        "CREATE TABLE IF NOT EXISTS table_watermarks ("
+        "table_name TEXT PRIMARY KEY, "
+        "version BIGINT NOT NULL DEFAULT 0, "
+        "changed_at TIMESTAMP NOT NULL DEFAULT now())",
+        # Версия задается явно: на новой базе таблицу уже создал create_all по модели
+        "INSERT INTO table_watermarks (table_name, version) VALUES "
+        "('clients', 0), ('vehicles', 0), ('warehouse_zones', 0), ('orders', 0) ON CONFLICT DO NOTHING",
+        """
+        CREATE OR REPLACE FUNCTION bump_table_watermark() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_watermarks SET version = version + 1, changed_at = now()
+            WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS clients_bump_watermark ON clients",
+        "CREATE TRIGGER clients_bump_watermark AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON clients "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_watermark()",
+        "DROP TRIGGER IF EXISTS vehicles_bump_watermark ON vehicles",
+        "CREATE TRIGGER vehicles_bump_watermark AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vehicles "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_watermark()",
+        "DROP TRIGGER IF EXISTS warehouse_zones_bump_watermark ON warehouse_zones",
+        "CREATE TRIGGER warehouse_zones_bump_watermark AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON warehouse_zones "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_watermark()",
+        "DROP TRIGGER IF EXISTS orders_bump_watermark ON orders",
+        "CREATE TRIGGER orders_bump_watermark AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON orders "
+        "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_watermark()",
+    ]),
+    (5, "Индексы журнала операций под просмотр по периоду и очистку", [
+        # Лента журнала (новые сверху) с фильтром по периоду и удаление старых записей
+        "CREATE INDEX IF NOT EXISTS ix_system_logs_created_at ON system_logs (created_at DESC, id DESC)",
+        # То же с фильтром по типу события; заменяет индекс (event_type, id)
+        "CREATE INDEX IF NOT EXISTS ix_system_logs_type_created_at ON system_logs (event_type, created_at DESC, id DESC)",
+        "DROP INDEX IF EXISTS ix_system_logs_event_type",
+        "ANALYZE system_logs",
+    ]),
+    (6, "Архив закрытых заказов", [
+        "CREATE TABLE IF NOT EXISTS orders_archive ("
+        "id INTEGER PRIMARY KEY, "
+        "description VARCHAR, status VARCHAR, weight FLOAT, volume FLOAT, "
+        "route_start VARCHAR, route_end VARCHAR, distance FLOAT, cost FLOAT, "
+        "created_at TIMESTAMP, "
+        "client_id INTEGER REFERENCES clients (id), "
+        "vehicle_id INTEGER REFERENCES vehicles (id), "
+        "warehouse_zone_id INTEGER REFERENCES warehouse_zones (id), "
+        "archived_at TIMESTAMP DEFAULT now())",
+        # История клиента и отчеты за период с архивом
+        "CREATE INDEX IF NOT EXISTS ix_orders_archive_client_id ON orders_archive (client_id, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_archive_created_at ON orders_archive (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_archive_vehicle_id ON orders_archive (vehicle_id) WHERE vehicle_id IS NOT NULL",
+        # Выбор кандидатов на перенос: закрытые заказы по дате
+        "CREATE INDEX IF NOT EXISTS ix_orders_closed_created_at ON orders (created_at) "
+        "WHERE status IN ('Доставлен', 'Отменен')",
+    ]),
+    (7, "Ссылки архива заказов обнуляются при удалении клиента, машины или зоны", [
+        # Контроллеры удаляют клиентов и машины, не зная об архиве: как и у orders
+        # (ORM обнуляет client_id/vehicle_id), ссылка просто становится пустой
+        *(f"ALTER TABLE orders_archive DROP CONSTRAINT IF EXISTS orders_archive_{column}_fkey, "
+          f"ADD CONSTRAINT orders_archive_{column}_fkey FOREIGN KEY ({column}) "
+          f"REFERENCES {table} (id) ON DELETE SET NULL"
+          for column, table in (("client_id", "clients"), ("vehicle_id", "vehicles"),
+                                ("warehouse_zone_id", "warehouse_zones"))),
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, "
+        "description TEXT, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+    ))
+
+
+def current_version(conn):
+    _ensure_version_table(conn)
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def migrate(bind=None):
+    """Применяет все новые миграции, каждую в своей транзакции. Возвращает список версий"""
+    bind = bind or engine
+    applied = []
+    with bind.begin() as conn:
+        version = current_version(conn)
+
+    for number, description, statements in MIGRATIONS:
+        if number <= version:
+            continue
+        with bind.begin() as conn:
+            for sql in statements:
+                conn.execute(text(sql))
+            conn.execute(
+                text("INSERT INTO schema_version (version, description) VALUES (:v, :d)"),
+                {"v": number, "d": description}
+            )
+        applied.append(number)
+    return applied
+
+
+# --- Проверка планов запросов ---
+
+def _read_paths():
+    """Пути чтения контроллеров, чьи запросы проверяются на последовательное сканирование"""
+    from controllers.orders_controller import OrdersController
+    from controllers.dashboard_controller import DashboardController
+    from controllers.clients_controller import ClientsController
+    from controllers.transport_controller import TransportController
+    from controllers.logs_controller import LogsController
+    from datetime import date, timedelta
+
+    today = date.today()
+    orders = OrdersController()
+    dashboard = DashboardController()
+    return [
+        ("OrdersController.get_page()", lambda: orders.get_page()),
+        ("OrdersController.get_page(status)", lambda: orders.get_page(status="Новый")),
+        ("OrdersController.get_page(driver)", lambda: orders.get_page(driver_id=0)),
+        ("OrdersController.get_page(text)", lambda: orders.get_page(text="Москва")),
+        ("OrdersController.search()", lambda: orders.search("Москва")),
+        ("DashboardController.get_stats(logist)", lambda: dashboard._query_stats(0, 'logist')),
+        ("DashboardController.get_stats(driver)", lambda: dashboard._query_stats(0, 'driver')),
+        ("DashboardController.get_income(month)",
+         lambda: dashboard.get_income(today - timedelta(days=30), today, "day")),
+        ("DashboardController.get_important_events()", lambda: dashboard.get_important_events()),
+        ("DashboardController.get_operations_log()", lambda: dashboard.get_operations_log()),
+        ("LogsController.get_page()", lambda: LogsController().get_page()),
+        ("LogsController.get_page(event_type, period)",
+         lambda: LogsController().get_page(event_type="Order", date_from=today - timedelta(days=7), date_to=today)),
+        ("ClientsController.get_client_orders()", lambda: ClientsController().get_client_orders(0)),
+        ("TransportController.get_drivers()", lambda: TransportController().get_drivers()),
+    ]
+
+
+def _seq_scans(plan, found):
+    if plan.get("Node Type") == "Seq Scan":
+        found.append((plan.get("Relation Name"), int(plan.get("Plan Rows", 0))))
+    for child in plan.get("Plans", []):
+        _seq_scans(child, found)
+    return found
+
+
+def check_query_plans():
+    """Выполняет пути чтения, перехватывает их SQL и прогоняет через EXPLAIN.
+
+    Возвращает список (путь, таблица, оценка строк) для каждого Seq Scan.
+    На маленьких таблицах Seq Scan - нормальный выбор планировщика,
+    поэтому в отчете указывается оценка числа строк.
+    """
+    report = []
+    for name, call in _read_paths():
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        # Пути с @read_only читаются с основной БД: слушатель и EXPLAIN - на ней же
+        event.listen(engine, "before_cursor_execute", capture)
+        token = _read_source.set("primary")
+        try:
+            call()
+        finally:
+            _read_source.reset(token)
+            event.remove(engine, "before_cursor_execute", capture)
+
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            for statement, parameters in captured:
+                cur.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                plan = cur.fetchone()[0][0]["Plan"]
+                for table, rows in _seq_scans(plan, []):
+                    report.append((name, table, rows))
+            cur.close()
+        finally:
+            raw.close()
+    return report
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        scans = check_query_plans()
+        if not scans:
+            print("Последовательных сканирований не найдено.")
+        for name, table, rows in scans:
+            print(f"[Seq Scan] {name}: {table} (~{rows} строк)")
+    else:
+        applied = migrate()
+        print(f"Применены миграции: {applied}" if applied else "Схема в актуальном состоянии.")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Text, Computed, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, declarative_base, deferred
 from datetime import datetime
 
 Base = declarative_base()
@@ -20,6 +21,7 @@ class Client(Base):
     phone = Column(String)
     email = Column(String)
     address = Column(String)
+    updated_at = Column(DateTime, server_default=func.now())  # ведет триггер БД, см. миграцию 4
     orders = relationship("Order", back_populates="client")
 
 class Vehicle(Base):
@@ -36,6 +38,7 @@ class Vehicle(Base):
     trips_since_service = Column(Integer, default=0) 
     
     driver_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    updated_at = Column(DateTime, server_default=func.now())  # ведет триггер БД, см. миграцию 4
     driver = relationship("User") 
     orders = relationship("Order", back_populates="vehicle")
 
@@ -46,6 +49,7 @@ class WarehouseZone(Base):
     capacity = Column(Float)
     occupied = Column(Float, default=0.0)
     cargo_type = Column(String, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now())  # ведет триггер БД, см. миграцию 4
 
 class Order(Base):
     __tablename__ = 'orders'
@@ -58,17 +62,47 @@ class Order(Base):
     route_end = Column(String)
     distance = Column(Float, default=0.0)
     cost = Column(Float)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=datetime.now, index=True)
     client_id = Column(Integer, ForeignKey('clients.id'))
     vehicle_id = Column(Integer, ForeignKey('vehicles.id'), nullable=True)
     warehouse_zone_id = Column(Integer, ForeignKey('warehouse_zones.id'), nullable=True)
+    # Поисковый текст (номер, клиент, груз, маршрут) ведет триггер БД, см. миграцию 3
+    search_doc = deferred(Column(Text))
+    search_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('russian', coalesce(search_doc, ''))", persisted=True)))
     client = relationship("Client", back_populates="orders")
     vehicle = relationship("Vehicle", back_populates="orders")
     warehouse_zone = relationship("WarehouseZone")
 
+class OrderArchive(Base):
+    """Закрытые заказы старше ORDER_ARCHIVE_DAYS. Переносятся из orders
+    командой python -m database.archive, номер заказа сохраняется"""
+    __tablename__ = 'orders_archive'
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String)
+    status = Column(String)
+    weight = Column(Float)
+    volume = Column(Float)
+    route_start = Column(String)
+    route_end = Column(String)
+    distance = Column(Float)
+    cost = Column(Float)
+    created_at = Column(DateTime)
+    # Удаление клиента, машины или зоны обнуляет ссылку, как у оперативных заказов
+    client_id = Column(Integer, ForeignKey('clients.id', ondelete='SET NULL'))
+    vehicle_id = Column(Integer, ForeignKey('vehicles.id', ondelete='SET NULL'), nullable=True)
+    warehouse_zone_id = Column(Integer, ForeignKey('warehouse_zones.id', ondelete='SET NULL'), nullable=True)
+    archived_at = Column(DateTime, server_default=func.now())
+
 class SystemLog(Base):
     __tablename__ = 'system_logs'
     id = Column(Integer, primary_key=True, index=True)
     event_type = Column(String) 
     description = Column(Text)
-    created_at = Column(DateTime, default=datetime.now)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.now)
+class TableWatermark(Base):
+    """Счетчик изменений таблицы, увеличивается триггером на каждую изменяющую команду"""
+    __tablename__ = 'table_watermarks'
+    table_name = Column(String, primary_key=True)
+    # Значения по умолчанию - на стороне сервера: строки вставляет миграция 4 обычным SQL
+    version = Column(BigInteger, nullable=False, server_default=text("0"))
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
@@ -0,0 +1,68 @@
+"""Канал изменений через LISTEN/NOTIFY.
+
+Контроллеры после записи вызывают emit() в той же транзакции: PostgreSQL
+доставляет уведомление слушателям только после фиксации, а при откате
+не доставляет вовсе. ChangeFeed - соединение, которое слушает канал.
+"""
+import json
+import select
+import uuid
+from sqlalchemy import text
+from database.connection import engine
+
+CHANNEL = "logist_changes"
+
+# Отличает изменения этого процесса от изменений других клиентов
+SOURCE_ID = uuid.uuid4().hex
+
+# Ограничение PostgreSQL на размер уведомления - 8000 байт
+MAX_IDS = 500
+
+
+def emit(db, table, op, ids):
+    """Сообщает об изменении строк ids таблицы table. op - insert, update или delete.
+    Если строк слишком много, id не передаются (ids=None - перечитать таблицу)."""
+    ids = list(ids)
+    payload = {"table": table, "op": op, "ids": ids if len(ids) <= MAX_IDS else None, "source": SOURCE_ID}
+    db.execute(text("SELECT pg_notify(:channel, :payload)"),
+               {"channel": CHANNEL, "payload": json.dumps(payload)})
+
+
+class ChangeFeed:
+    """Отдельное соединение (вне пула) в режиме autocommit, подписанное на CHANNEL"""
+
+    def __init__(self):
+        self.conn = None
+
+    def open(self):
+        raw = engine.raw_connection()
+        raw.detach()  # соединение живет все время работы и в пул не возвращается
+        self.conn = raw.dbapi_connection
+        self.conn.autocommit = True
+        with self.conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+
+    def wait(self, timeout):
+        """Ждет уведомлений до timeout секунд. Возвращает список событий
+        других клиентов: словари с ключами table, op, ids"""
+        if select.select([self.conn], [], [], timeout) == ([], [], []):
+            return []
+        self.conn.poll()
+        events = []
+        while self.conn.notifies:
+            notify = self.conn.notifies.pop(0)
+            try:
+                event = json.loads(notify.payload)
+            except ValueError:
+                continue
+            if event.get("source") != SOURCE_ID:
+                events.append(event)
+        return events
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
@@ -0,0 +1,119 @@
+"""Облегченные строки для списков и отчетов.
+
+Вместо ORM-объектов со связями и состоянием сессии экраны получают записи
+с __slots__, в которых только отображаемые поля. Порядок полей в __slots__
+совпадает с порядком выражений в columns, поэтому запрос строится как
+db.query(*Row.columns), а результат превращается в записи через Row.from_rows.
+"""
+from sqlalchemy import func
+from database.models import Order, Client, Vehicle, WarehouseZone, User, SystemLog
+
+
+class Projection:
+    """Базовая запись только для чтения: значения задаются при создании.
+
+    shared - поля с часто повторяющимися значениями (статус, город, клиент).
+    Одинаковые строки в них хранятся в одном экземпляре на весь результат.
+    """
+    __slots__ = ()
+    columns = ()
+    shared = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_rows(cls, rows):
+        if not cls.shared:
+            return [cls(*row) for row in rows]
+        positions = [cls.__slots__.index(name) for name in cls.shared]
+        pool = {}
+        result = []
+        for row in rows:
+            values = list(row)
+            for i in positions:
+                values[i] = pool.setdefault(values[i], values[i])
+            result.append(cls(*values))
+        return result
+
+    @classmethod
+    def columns_for(cls, orders):
+        """columns, в которых колонки Order взяты из orders - например,
+        из объединения с архивом (database.archive.orders_source)"""
+        return tuple(getattr(orders, c.key) if getattr(c, "class_", None) is Order else c for c in cls.columns)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class OrderRow(Projection):
+    """Строка реестра заказов (нужны join на клиента и машину)"""
+    __slots__ = ("id", "client_name", "route_start", "route_end", "vehicle_model", "status", "cost", "description")
+    columns = (Order.id, Client.name, Order.route_start, Order.route_end, Vehicle.model,
+               Order.status, Order.cost, Order.description)
+    shared = ("client_name", "route_start", "route_end", "vehicle_model", "status", "description")
+
+
+class IncomeRow(Projection):
+    """Строка отчета о доходах (нужен join на клиента)"""
+    __slots__ = ("id", "created_at", "client_name", "route_start", "route_end", "cost")
+    columns = (Order.id, Order.created_at, Client.name, Order.route_start, Order.route_end, Order.cost)
+    shared = ("client_name", "route_start", "route_end")
+
+
+class DeliveredRow(Projection):
+    """Строка отчета о доставленных грузах"""
+    __slots__ = ("id", "description", "weight", "volume", "status")
+    columns = (Order.id, Order.description, Order.weight, Order.volume, Order.status)
+    shared = ("description", "status")
+
+
+class ClientOrderRow(Projection):
+    """Заказ в истории клиента"""
+    __slots__ = ("id", "created_at", "route_start", "route_end", "cost", "status")
+    columns = (Order.id, Order.created_at, Order.route_start, Order.route_end, Order.cost, Order.status)
+    shared = ("route_start", "route_end", "status")
+
+
+def _trip_totals(orders):
+    """Рейсы, пробег и дата последнего рейса машины по заказам orders"""
+    return func.count(orders.id), func.coalesce(func.sum(orders.distance), 0.0), func.max(orders.created_at)
+
+
+class VehicleRow(Projection):
+    """Машина с водителем и агрегатами рейсов (join на водителя и заказы, группировка по машине)"""
+    __slots__ = ("id", "plate_number", "model", "vehicle_type", "capacity", "status",
+                 "driver_surname", "driver_name", "trips", "distance", "last_trip")
+    fields = (Vehicle.id, Vehicle.plate_number, Vehicle.model, Vehicle.vehicle_type, Vehicle.capacity, Vehicle.status,
+              User.surname, User.name)
+    columns = fields + _trip_totals(Order)
+
+    @classmethod
+    def columns_for(cls, orders):
+        return cls.fields + _trip_totals(orders)
+
+
+class VehicleRefRow(Projection):
+    """Машина в выпадающих списках (справочник без показателей рейсов)"""
+    __slots__ = ("id", "plate_number", "model", "status", "driver_id")
+    columns = (Vehicle.id, Vehicle.plate_number, Vehicle.model, Vehicle.status, Vehicle.driver_id)
+
+
+class ClientRow(Projection):
+    __slots__ = ("id", "name", "phone", "email", "address")
+    columns = (Client.id, Client.name, Client.phone, Client.email, Client.address)
+
+
+class LogRow(Projection):
+    """Запись журнала операций"""
+    __slots__ = ("id", "created_at", "event_type", "description")
+    columns = (SystemLog.id, SystemLog.created_at, SystemLog.event_type, SystemLog.description)
+    shared = ("event_type",)
+
+
+class ZoneRow(Projection):
+    __slots__ = ("id", "name", "cargo_type", "capacity", "occupied")
+    columns = (WarehouseZone.id, WarehouseZone.name, WarehouseZone.cargo_type, WarehouseZone.capacity,
+               WarehouseZone.occupied)
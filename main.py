@@ -1,17 +1,19 @@
 import sys
 import os
+import multiprocessing
+from services.startup_timing import StartupTiming
 
 os.environ['LC_ALL'] = 'en_US.UTF-8' 
 
 from PyQt6.QtWidgets import QApplication
-from database.connection import init_db
 from ui.login_window import LoginWindow
+StartupTiming.mark("imports")
 
 if __name__ == "__main__":
+    # Процессы пакетного формирования документов в собранном exe (services/batch_docs.py)
+    multiprocessing.freeze_support()
 
-    print("Инициализация базы данных...")
-    init_db()
-    
+    # Окно входа появляется сразу, проверка схемы и подключение к БД идут в фоне
     app = QApplication(sys.argv)
     
     window = LoginWindow()
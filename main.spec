@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('resources/styles.qss', '.')],
+    datas=[('resources/styles.qss', '.'), ('resources/fonts/*.ttf', 'fonts')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
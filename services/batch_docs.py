@@ -0,0 +1,214 @@
+"""Пакетное формирование документов по заказам (маршрутные листы, квитанции).
+
+Заказы читаются из БД в основном процессе порциями, а документы рисуются
+в пуле процессов: fpdf2 написан на чистом Python, и потоки упирались бы
+в GIL. Каждый процесс разбирает шрифт один раз при старте и получает
+задачи по BATCH_DOCS_CHUNK документов. Готовые документы собираются в
+REPORTS_DIR в один ZIP (по файлу на документ) или в один PDF. В общем PDF
+каждая задача возвращает многостраничный документ, поэтому шрифт
+встраивается один раз на задачу, а не на каждую страницу.
+
+ZIP пишется по мере готовности документов, и память от размера пакета
+не зависит. Общий PDF собирает pypdf, который держит все страницы до
+записи файла, поэтому в нем не больше BATCH_DOCS_PDF_LIMIT заказов.
+
+Запуск из консоли:
+    python -m services.batch_docs 101 102 103            - ZIP с документами трех заказов
+    python -m services.batch_docs --status Новый --pdf   - один PDF по всем новым заказам
+"""
+import argparse
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from types import SimpleNamespace
+from config import REPORTS_DIR, BATCH_DOCS_WORKERS, BATCH_DOCS_CHUNK, BATCH_DOCS_LIMIT, BATCH_DOCS_PDF_LIMIT
+from services.font_registry import FontRegistry
+from services.pdf_service import PDFService
+
+# Тип документа -> (название, метод PDFService, рисующий его на новой странице)
+DOC_TYPES = {
+    "waybill": ("Маршрутный лист", "add_waybill"),
+    "receipt": ("Квитанция", "add_receipt"),
+}
+
+# Заказов в одном запросе к БД
+LOAD_PAGE = 500
+
+
+class BatchCancelled(Exception):
+    pass
+
+
+def _snapshot(order):
+    """Поля заказа, нужные документам, без объектов SQLAlchemy - их можно передать в другой процесс"""
+    client = vehicle = None
+    if order.client:
+        client = SimpleNamespace(name=order.client.name, address=order.client.address)
+    if order.vehicle:
+        driver = order.vehicle.driver
+        vehicle = SimpleNamespace(
+            model=order.vehicle.model, plate_number=order.vehicle.plate_number,
+            driver=SimpleNamespace(surname=driver.surname, name=driver.name) if driver else None)
+    return SimpleNamespace(id=order.id, description=order.description, weight=order.weight, cost=order.cost,
+                           route_start=order.route_start, route_end=order.route_end,
+                           client=client, vehicle=vehicle)
+
+
+def _jobs(order_ids, doc_types, chunk):
+    """Задачи для процессов: списки (тип документа, заказ) по chunk документов"""
+    # Контроллер нужен только основному процессу: процессы пула не подключаются к БД
+    from controllers.orders_controller import OrdersController
+    controller = OrdersController()
+    per_job = max(1, chunk // len(doc_types))
+    for start in range(0, len(order_ids), LOAD_PAGE):
+        page = order_ids[start:start + LOAD_PAGE]
+        orders = [_snapshot(o) for o in controller.get_many(page)]  # удаленные заказы пропускаются
+        for i in range(0, len(orders), per_job):
+            yield [(t, o) for o in orders[i:i + per_job] for t in doc_types]
+
+
+def _init_worker():
+    FontRegistry.faces()
+
+
+def _render(jobs, merged):
+    """Выполняется в процессе пула. Возвращает [(имя файла, PDF)], для merged - один документ"""
+    if merged:
+        pdf = PDFService()
+        for doc_type, order in jobs:
+            getattr(pdf, DOC_TYPES[doc_type][1])(order)
+        return [(None, bytes(pdf.output()))]
+    docs = []
+    for doc_type, order in jobs:
+        pdf = PDFService()
+        getattr(pdf, DOC_TYPES[doc_type][1])(order)
+        docs.append((f"{doc_type}_{order.id}.pdf", bytes(pdf.output())))
+    return docs
+
+
+class _ZipSink:
+    def __init__(self, path):
+        # PDF от fpdf2 уже сжат, повторное сжатие только тратит время
+        self.archive = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED)
+
+    def add(self, name, data):
+        self.archive.writestr(name, data)
+
+    def close(self):
+        self.archive.close()
+
+    def discard(self):
+        self.archive.close()
+
+
+class _PdfSink:
+    # Страницы копятся в PdfWriter до close(): размер ограничен BATCH_DOCS_PDF_LIMIT
+    def __init__(self, path):
+        from pypdf import PdfWriter
+        self.path = path
+        self.writer = PdfWriter()
+
+    def add(self, name, data):
+        self.writer.append(io.BytesIO(data))
+
+    def close(self):
+        self.writer.write(self.path)
+        self.writer.close()
+
+    def discard(self):
+        self.writer.close()
+
+
+def generate_batch(order_ids, doc_types, merged=False, progress=None, cancel=None,
+                   workers=BATCH_DOCS_WORKERS, chunk=BATCH_DOCS_CHUNK):
+    """Документы doc_types (ключи DOC_TYPES) по заказам order_ids в один файл REPORTS_DIR.
+
+    merged - один PDF вместо ZIP, не больше BATCH_DOCS_PDF_LIMIT заказов.
+    progress(готово, всего) вызывается по мере
+    готовности (в документах); cancel - threading.Event, при установке
+    формирование прерывается с BatchCancelled. Возвращает путь к файлу.
+    Документы в файле идут в порядке order_ids.
+    """
+    doc_types = [t for t in DOC_TYPES if t in doc_types]
+    if not order_ids or not doc_types:
+        raise ValueError("Не выбраны заказы или типы документов")
+    if merged and len(order_ids) > BATCH_DOCS_PDF_LIMIT:
+        raise ValueError(f"В один PDF - не более {BATCH_DOCS_PDF_LIMIT} заказов, "
+                         f"выбрано {len(order_ids)}. Сформируйте ZIP-архив")
+
+    total = len(order_ids) * len(doc_types)
+    ext = "pdf" if merged else "zip"
+    path = os.path.join(REPORTS_DIR, f"documents_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}")
+    partial = path + ".part"
+    sink = _PdfSink(partial) if merged else _ZipSink(partial)
+
+    workers = workers or os.cpu_count() or 1
+    jobs = _jobs(list(order_ids), doc_types, chunk)
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker)
+    # В работе и в ожидании записи не больше двух задач на процесс - готовые документы
+    # не копятся в памяти, даже если процессы обгоняют запись
+    limit = workers * 2
+    pending = {}   # future -> (номер задачи, документов в ней)
+    ready = {}     # номер задачи -> (документов, результат), ждут записи предыдущих задач
+    submitted = written = done = 0
+    try:
+        while True:
+            while len(pending) + len(ready) < limit:
+                job = next(jobs, None)
+                if job is None:
+                    break
+                pending[pool.submit(_render, job, merged)] = (submitted, len(job))
+                submitted += 1
+            if not pending and not ready:
+                break
+
+            finished, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.is_set():
+                raise BatchCancelled()
+            for future in finished:
+                number, count = pending.pop(future)
+                ready[number] = (count, future.result())
+
+            while written in ready:
+                count, docs = ready.pop(written)
+                for name, data in docs:
+                    sink.add(name, data)
+                written += 1
+                done += count
+                if progress:
+                    progress(done, total)
+        sink.close()
+        os.replace(partial, path)
+        # Часть заказов могла быть удалена: прогресс доводится до конца
+        if progress and done < total:
+            progress(total, total)
+        return path
+    except BaseException:
+        sink.discard()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пакетное формирование документов по заказам")
+    parser.add_argument("ids", nargs="*", type=int, help="номера заказов (по умолчанию - все по фильтру --status)")
+    parser.add_argument("--status", help="статус заказов, например Новый")
+    parser.add_argument("--types", nargs="+", choices=list(DOC_TYPES), default=list(DOC_TYPES),
+                        help="типы документов")
+    parser.add_argument("--pdf", action="store_true", help="один PDF вместо ZIP")
+    parser.add_argument("--workers", type=int, default=BATCH_DOCS_WORKERS, help="число процессов")
+    args = parser.parse_args()
+
+    ids = args.ids
+    if not ids:
+        from controllers.orders_controller import OrdersController
+        ids = OrdersController().get_ids(status=args.status, limit=BATCH_DOCS_PDF_LIMIT if args.pdf else BATCH_DOCS_LIMIT)
+    print(f"Заказов: {len(ids)}")
+    result = generate_batch(ids, args.types, merged=args.pdf, workers=args.workers,
+                            progress=lambda done, total: print(f"\rДокументов: {done}/{total}", end=""))
+    print(f"\nГотово: {result}")
@@ -0,0 +1,125 @@
+import threading
+import time
+from database.connection import get_db, in_unit_of_work
+
+class CacheService:
+    """Счетчики версий таблиц. Контроллеры увеличивают версию после каждой
+    успешной записи, а кэши включают версию в ключ - устаревшие записи
+    перестают совпадать и вытесняются сами."""
+    _versions = {}
+    _writes = 0  # всего изменений по всем таблицам
+    _lock = threading.Lock()
+
+    @staticmethod
+    def invalidate(*tables):
+        with CacheService._lock:
+            CacheService._writes += 1
+            for t in tables:
+                CacheService._versions[t] = CacheService._versions.get(t, 0) + 1
+
+    @staticmethod
+    def write_count():
+        """Растет при каждом изменении данных: своем или пришедшем от других клиентов"""
+        with CacheService._lock:
+            return CacheService._writes
+
+    @staticmethod
+    def version(*tables):
+        with CacheService._lock:
+            return tuple(CacheService._versions.get(t, 0) for t in tables)
+
+
+class TTLCache:
+    """Простой потокобезопасный кэш со временем жизни записей"""
+
+    def __init__(self, ttl, max_size=256):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._data) >= self.max_size:
+                # Сначала выбрасываем просроченные, затем самую старую запись
+                now = time.monotonic()
+                for k in [k for k, (exp, _) in self._data.items() if exp < now]:
+                    del self._data[k]
+                if len(self._data) >= self.max_size:
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class IdentityMap:
+    """Кэш объектов по первичному ключу в пределах процесса.
+
+    Записи действительны, пока не изменилась версия таблиц, от которых
+    зависит объект (его собственной и таблиц загружаемых вместе с ним связей).
+    Объекты отсоединены от сессии и используются только для чтения.
+    """
+
+    def __init__(self, *tables, max_size=1024):
+        self.tables = tables
+        self.max_size = max_size
+        self._version = None
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, ids):
+        """Возвращает (найденные {id: объект}, список отсутствующих id)"""
+        with self._lock:
+            self._check_version()
+            found = {i: self._data[i] for i in ids if i in self._data}
+        return found, [i for i in ids if i not in found]
+
+    def get_many(self, ids, load):
+        """Объекты по списку id в том же порядке, уже загруженные - из кэша.
+        load(db, missing) читает недостающие объекты; удаленные пропускаются"""
+        found, missing = self.lookup(ids)
+        if missing:
+            version = self.version()
+            db = get_db()
+            try:
+                rows = load(db, missing)
+            finally:
+                db.close()
+            if not in_unit_of_work():
+                # Внутри unit_of_work данные еще не зафиксированы
+                self.store(rows, version)
+            found.update((r.id, r) for r in rows)
+        return [found[i] for i in ids if i in found]
+
+    def store(self, objects, version):
+        """version - версия таблиц, снятая до чтения объектов из БД"""
+        with self._lock:
+            self._check_version()
+            if version != self._version:
+                return  # пока шло чтение, таблицы изменились
+            for obj in objects:
+                if len(self._data) >= self.max_size:
+                    del self._data[next(iter(self._data))]
+                self._data[obj.id] = obj
+
+    def version(self):
+        return CacheService.version(*self.tables)
+
+    def _check_version(self):
+        current = CacheService.version(*self.tables)
+        if current != self._version:
+            self._data.clear()
+            self._version = current
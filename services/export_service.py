@@ -0,0 +1,267 @@
+"""Выгрузка отчетов в CSV и XLSX прямо из курсора БД.
+
+Строки отчета идут из ReportsController.iter_rows (серверный курсор) и сразу
+пишутся в файл - без таблицы на экране и без списка в памяти. XLSX
+собирается вручную: лист пишется потоком в zip-архив, строки вставляются
+в ячейки как есть (inlineStr, без общей таблицы строк), поэтому память не
+зависит от числа строк. Числа и даты сохраняются типизированными ячейками,
+в Excel по ним работают сортировка, фильтры и формулы.
+
+Запуск из консоли:
+    python -m services.export_service income --from 2025-01-01 --to 2025-12-31
+    python -m services.export_service delivered --from 2025-01-01 --to 2025-12-31 --csv --archive
+"""
+import argparse
+import csv
+import os
+import re
+import zipfile
+from datetime import date, datetime
+from config import REPORTS_DIR
+
+# Типы колонок
+TEXT, INT, NUMBER, DATE = "text", "int", "number", "date"
+
+def _driver(o):
+    """Водитель машины: "Фамилия И." или None"""
+    if o.driver_surname is None:
+        return None
+    return f"{o.driver_surname} {o.driver_name[0]}." if o.driver_name else o.driver_surname
+
+
+# Отчет -> колонки (заголовок, значение из строки отчета, тип, ширина в Excel).
+# По ним же строится таблица предпросмотра (ui/reports_tab.py)
+REPORT_COLUMNS = {
+    "income": [
+        ("Номер", lambda o: o.id, INT, 10),
+        ("Дата", lambda o: o.created_at, DATE, 12),
+        ("Клиент", lambda o: o.client_name, TEXT, 30),
+        ("Маршрут", lambda o: f"{o.route_start or ''}-{o.route_end or ''}", TEXT, 30),
+        ("Стоимость", lambda o: o.cost, NUMBER, 14),
+    ],
+    "delivered": [
+        ("Номер", lambda o: o.id, INT, 10),
+        ("Тип груза", lambda o: o.description, TEXT, 30),
+        ("Вес (кг)", lambda o: o.weight, NUMBER, 12),
+        ("Объем (м3)", lambda o: o.volume, NUMBER, 12),
+        ("Статус", lambda o: o.status, TEXT, 14),
+    ],
+    "transport": [
+        ("Номер машины", lambda o: o.plate_number, TEXT, 14),
+        ("Модель", lambda o: o.model, TEXT, 20),
+        ("Водитель", _driver, TEXT, 24),
+        ("Состояние", lambda o: o.status, TEXT, 14),
+        ("Рейсов", lambda o: o.trips, INT, 10),
+        ("Пробег (км)", lambda o: o.distance, NUMBER, 12),
+        ("Последний рейс", lambda o: o.last_trip, DATE, 14),
+        ("Загрузка", lambda o: "100%" if o.status != "Свободен" else "0%", TEXT, 10),
+    ],
+}
+
+FORMATS = ("xlsx", "csv")
+# Прогресс сообщается каждые PROGRESS_STEP строк
+PROGRESS_STEP = 10000
+
+
+def export_report(r_type, fmt, path, date_from, date_to, include_archive=False, progress=None, rows=None):
+    """Выгружает отчет r_type за период в файл path (fmt - "xlsx" или "csv").
+    rows - уже прочитанные строки отчета, иначе они читаются из БД потоком.
+    progress(строк) вызывается по ходу выгрузки. Возвращает число строк"""
+    if rows is None:
+        # Контроллер импортируется здесь: write_csv/write_xlsx работают и без БД
+        from controllers.reports_controller import ReportsController
+        rows = ReportsController().iter_rows(r_type, date_from, date_to, include_archive)
+    writer = write_xlsx if fmt == "xlsx" else write_csv
+    return writer(path, REPORT_COLUMNS[r_type], rows, progress)
+
+
+def _cell_values(columns):
+    getters = [getter for _, getter, _, _ in columns]
+    return lambda row: [getter(row) for getter in getters]
+
+
+# --- CSV ---
+
+def write_csv(path, columns, rows, progress=None):
+    """CSV для русской версии Excel: разделитель ";", десятичная запятая, UTF-8 с BOM"""
+    formatters = [_CSV_FORMAT[kind] for _, _, kind, _ in columns]
+    values = _cell_values(columns)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow([title for title, _, _, _ in columns])
+        for row in rows:
+            writer.writerow([fmt(v) if v is not None else "" for fmt, v in zip(formatters, values(row))])
+            count += 1
+            if progress and count % PROGRESS_STEP == 0:
+                progress(count)
+    return count
+
+
+def _csv_number(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".").replace(".", ",") if isinstance(value, float) else str(value)
+
+
+def _csv_date(value):
+    return value.strftime("%d.%m.%Y")
+
+
+_CSV_FORMAT = {TEXT: str, INT: str, NUMBER: _csv_number, DATE: _csv_date}
+
+
+# --- XLSX ---
+
+# Начало отсчета дат Excel (серийный номер 1 = 01.01.1900 с учетом ошибки 1900 года)
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+# Символы, недопустимые в XML 1.0
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# Индексы стилей из _STYLES (cellXfs)
+_STYLE_HEADER, _STYLE_DATE, _STYLE_NUMBER, _STYLE_INT = 1, 2, 3, 4
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Отчет" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+# Стили ячеек: 0 - обычный, 1 - заголовок, 2 - дата, 3 - число с копейками, 4 - целое
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="dd.mm.yyyy"/></numFmts>
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="5">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="1" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+
+def _escape(text):
+    text = str(text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return _ILLEGAL_XML.sub("", text)
+
+
+def _column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def _xlsx_text(ref, value):
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{_escape(value)}</t></is></c>'
+
+
+def _xlsx_int(ref, value):
+    return f'<c r="{ref}" s="{_STYLE_INT}"><v>{int(value)}</v></c>'
+
+
+def _xlsx_number(ref, value):
+    return f'<c r="{ref}" s="{_STYLE_NUMBER}"><v>{value!r}</v></c>'
+
+
+def _xlsx_date(ref, value):
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    serial = (value - _EXCEL_EPOCH).total_seconds() / 86400
+    return f'<c r="{ref}" s="{_STYLE_DATE}"><v>{serial!r}</v></c>'
+
+
+_XLSX_CELL = {TEXT: _xlsx_text, INT: _xlsx_int, NUMBER: _xlsx_number, DATE: _xlsx_date}
+
+
+def write_xlsx(path, columns, rows, progress=None):
+    """Лист Excel с заголовком (закреплен, с автофильтром) и типизированными ячейками"""
+    letters = [_column_letter(i) for i in range(len(columns))]
+    cells = list(zip(letters, [_XLSX_CELL[kind] for _, _, kind, _ in columns]))
+    values = _cell_values(columns)
+    count = 0
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        archive.writestr("xl/styles.xml", _STYLES)
+
+        # Лист пишется в архив потоком; force_zip64 - размер заранее неизвестен
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as raw:
+            buffer = []
+
+            def flush():
+                raw.write("".join(buffer).encode("utf-8"))
+                buffer.clear()
+
+            widths = "".join(f'<col min="{i + 1}" max="{i + 1}" width="{width}" customWidth="1"/>'
+                             for i, (_, _, _, width) in enumerate(columns))
+            buffer.append(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                f'</sheetView></sheetViews><cols>{widths}</cols><sheetData>'
+            )
+            header = "".join(f'<c r="{letter}1" t="inlineStr" s="{_STYLE_HEADER}"><is><t>{_escape(title)}</t></is></c>'
+                             for letter, (title, _, _, _) in zip(letters, columns))
+            buffer.append(f'<row r="1">{header}</row>')
+
+            row_number = 1
+            for row in rows:
+                row_number += 1
+                xml = "".join(cell(f"{letter}{row_number}", v)
+                              for (letter, cell), v in zip(cells, values(row)) if v is not None)
+                buffer.append(f'<row r="{row_number}">{xml}</row>')
+                count += 1
+                if count % PROGRESS_STEP == 0:
+                    flush()
+                    if progress:
+                        progress(count)
+
+            buffer.append(f'</sheetData><autoFilter ref="A1:{letters[-1]}{row_number}"/></worksheet>')
+            flush()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Выгрузка отчета в XLSX или CSV")
+    parser.add_argument("report", choices=list(REPORT_COLUMNS))
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, required=True, help="ГГГГ-ММ-ДД")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, required=True, help="ГГГГ-ММ-ДД")
+    parser.add_argument("--archive", action="store_true", help="включая архивные заказы")
+    parser.add_argument("--csv", action="store_true", help="CSV вместо XLSX")
+    parser.add_argument("-o", "--output", help=f"файл (по умолчанию в {REPORTS_DIR})")
+    args = parser.parse_args()
+
+    fmt = "csv" if args.csv else "xlsx"
+    path = args.output or os.path.join(REPORTS_DIR, f"report_{args.report}_{args.date_from}_{args.date_to}.{fmt}")
+    total = export_report(args.report, fmt, path, args.date_from, args.date_to, args.archive,
+                          progress=lambda n: print(f"\rСтрок: {n}", end=""))
+    print(f"\rСтрок: {total}\nГотово: {path}")
@@ -0,0 +1,168 @@
+"""Шрифты для PDF.
+
+Раньше каждый PDFService() заново разбирал TTF-файлы Times New Roman из
+%WINDIR%\\Fonts (и падал на Linux). Теперь шрифт ищется один раз на процесс
+в системных папках Windows, macOS и Linux, а если подходящего нет - берется
+DejaVu Serif из resources/fonts. Разобранные метрики (ширины символов,
+таблица cmap) переиспользуются всеми документами; каждому документу
+достаются только свой набор использованных символов и свежая копия файла
+шрифта, из которой fpdf2 при сохранении вырезает подмножество глифов
+(сам файл заранее урезан до нужных документам символов, см. REPERTOIRE).
+Текст с символами вне REPERTOIRE рисуется полным файлом того же шрифта
+(семейство FULL_FAMILY): он разбирается при первой такой строке и
+подключается только к документам, где она встретилась.
+
+attach() заполняет внутренние поля TTFFont, поэтому версии fpdf2 и
+fonttools закреплены в requirements.txt.
+"""
+import copy
+import io
+import os
+import sys
+import threading
+from fontTools import ttLib, subset
+from fpdf import FPDF
+from fpdf.enums import TextEmphasis
+from fpdf.fonts import TTFFont, SubsetMap
+from config import BUNDLED_FONTS_DIR
+
+# Имя семейства в документах не зависит от найденного шрифта
+FAMILY = "DocSerif"
+# Тот же шрифт без урезания - для текста с символами вне REPERTOIRE
+FULL_FAMILY = "DocSerifFull"
+
+# Символы, которые встречаются в документах: латиница, кириллица (в т.ч. языков
+# СНГ), знаки препинания, №, ₽. Шрифт один раз урезается до них - на порядок
+# меньше глифов, поэтому подмножество для каждого документа строится быстро
+REPERTOIRE = [*range(0x20, 0x7F), *range(0xA0, 0x180), *range(0x400, 0x530),
+              *range(0x2000, 0x2070), 0x20BD, 0x2116, 0x2122]
+_REPERTOIRE_SET = frozenset(REPERTOIRE)
+
+# Варианты по убыванию предпочтения: (название, обычный, жирный)
+CANDIDATES = [
+    ("Times New Roman", "times.ttf", "timesbd.ttf"),
+    ("Times New Roman", "Times New Roman.ttf", "Times New Roman Bold.ttf"),
+    # Метрически совместим с Times New Roman, есть в большинстве дистрибутивов Linux
+    ("Liberation Serif", "LiberationSerif-Regular.ttf", "LiberationSerif-Bold.ttf"),
+    ("DejaVu Serif", "DejaVuSerif.ttf", "DejaVuSerif-Bold.ttf"),
+]
+
+
+def font_dirs():
+    """Системные папки шрифтов текущей платформы и папка шрифтов программы (последней)"""
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        dirs = [os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+                os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts")]
+    elif sys.platform == "darwin":
+        dirs = ["/System/Library/Fonts/Supplemental", "/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+    else:
+        dirs = ["/usr/share/fonts", "/usr/local/share/fonts",
+                os.path.join(home, ".local", "share", "fonts"), os.path.join(home, ".fonts")]
+    return [d for d in dirs if os.path.isdir(d)] + [BUNDLED_FONTS_DIR]
+
+
+def _find_files(dirs, names):
+    """{имя файла: путь} для файлов из names; на Linux шрифты лежат во вложенных папках"""
+    wanted = {n.lower(): n for n in names}
+    found = {}
+    for root_dir in dirs:
+        for root, _, files in os.walk(root_dir):
+            for f in files:
+                name = wanted.get(f.lower())
+                if name and name not in found:
+                    found[name] = os.path.join(root, f)
+    return found
+
+
+class _Face:
+    """Начертание, разобранное один раз: шаблон TTFFont и байты файла.
+    full - весь файл шрифта, иначе урезанный до REPERTOIRE"""
+
+    def __init__(self, path, style, full=False):
+        self.path = path
+        self.style = style
+        self.family = FULL_FAMILY if full else FAMILY
+        if full:
+            with open(path, "rb") as f:
+                self.data = f.read()
+        else:
+            self.data = self._reduce(path)
+        self.template = TTFFont(FPDF(), io.BytesIO(self.data), self.family.lower() + style, style)
+
+    @staticmethod
+    def _reduce(path):
+        """Байты шрифта, урезанного до REPERTOIRE (метрики и кернинг сохраняются)"""
+        font = ttLib.TTFont(path, recalcTimestamp=False)
+        options = subset.Options(notdef_outline=True, recommended_glyphs=True,
+                                 name_IDs=["*"], name_languages=["*"], layout_features=["*"])
+        options.drop_tables += ["FFTM"]  # служебная таблица FontForge, в PDF не нужна
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=REPERTOIRE)
+        subsetter.subset(font)
+        output = io.BytesIO()
+        font.save(output)
+        return output.getvalue()
+
+    def attach(self, pdf):
+        """Регистрирует начертание в документе pdf без повторного разбора файла"""
+        fontkey = self.family.lower() + self.style
+        font = copy.copy(self.template)
+        font.i = len(pdf.fonts) + 1
+        font.fontkey = fontkey
+        # При сохранении документа fpdf2 вырезает подмножество прямо в ttfont,
+        # поэтому у каждого документа своя (ленивая, почти бесплатная) копия файла
+        font.ttfont = ttLib.TTFont(io.BytesIO(self.data), recalcTimestamp=False, lazy=True)
+        font.cw = self.template.cw.copy()
+        font.missing_glyphs = []
+        font.biggest_size_pt = 0
+        font._hbfont = None
+        font.emphasis = TextEmphasis.coerce(self.style)
+        font.subset = SubsetMap(font)
+        pdf.fonts[fontkey] = font
+
+
+class FontRegistry:
+    _lock = threading.Lock()
+    _faces = None
+    _full_faces = None
+    name = None  # название найденного шрифта
+
+    @staticmethod
+    def discover():
+        """(название, путь к обычному, путь к жирному) первого найденного варианта"""
+        dirs = font_dirs()
+        found = _find_files(dirs, [n for _, regular, bold in CANDIDATES for n in (regular, bold)])
+        for name, regular, bold in CANDIDATES:
+            if regular in found and bold in found:
+                return name, found[regular], found[bold]
+        raise FileNotFoundError(f"Не найден шрифт для PDF (искали в: {', '.join(dirs)})")
+
+    @staticmethod
+    def faces():
+        with FontRegistry._lock:
+            if FontRegistry._faces is None:
+                name, regular, bold = FontRegistry.discover()
+                FontRegistry._faces = [_Face(regular, ""), _Face(bold, "B")]
+                FontRegistry.name = name
+            return FontRegistry._faces
+
+    @staticmethod
+    def full_faces():
+        FontRegistry.faces()
+        with FontRegistry._lock:
+            if FontRegistry._full_faces is None:
+                FontRegistry._full_faces = [_Face(face.path, face.style, full=True)
+                                            for face in FontRegistry._faces]
+            return FontRegistry._full_faces
+
+    @staticmethod
+    def install(pdf, full=False):
+        """Подключает к документу семейство FAMILY (обычное и жирное), с full - FULL_FAMILY"""
+        for face in FontRegistry.full_faces() if full else FontRegistry.faces():
+            face.attach(pdf)
+
+    @staticmethod
+    def covers(text):
+        """True, если все символы text есть в урезанном шрифте"""
+        return text.isascii() or _REPERTOIRE_SET.issuperset(map(ord, text))
@@ -0,0 +1,163 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from config import LOCAL_CACHE_PATH, CACHE_SYNC_OVERLAP
+
+class LocalCache:
+    """Файл SQLite с последними известными данными: строки справочников
+    и снимки экранов. Данные хранятся отдельно для каждой роли.
+    Ошибки файла кэша не мешают работе - кэш просто считается пустым."""
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = LocalCache()
+            return cls._instance
+
+    def __init__(self, path=LOCAL_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS reference_rows (
+                        role TEXT, table_name TEXT, id INTEGER, data TEXT,
+                        PRIMARY KEY (role, table_name, id));
+                    CREATE TABLE IF NOT EXISTS reference_state (
+                        role TEXT, table_name TEXT, watermark INTEGER, synced_at TEXT,
+                        PRIMARY KEY (role, table_name));
+                    CREATE TABLE IF NOT EXISTS snapshots (
+                        role TEXT, key TEXT, data TEXT, saved_at TEXT,
+                        PRIMARY KEY (role, key));
+                """)
+        except sqlite3.Error as e:
+            print(f"Локальный кэш недоступен: {e}")
+
+    @contextmanager
+    def _connect(self):
+        """Соединение на один вызов: изменения фиксируются, соединение закрывается
+        (with sqlite3.connect() только завершает транзакцию)"""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_state(self, role, table):
+        """(отметка изменений, время синхронизации) или None"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT watermark, synced_at FROM reference_state WHERE role = ? AND table_name = ?",
+                    (role, table)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        return (row[0], datetime.fromisoformat(row[1])) if row else None
+
+    def get_rows(self, role, table):
+        """Значения строк справочника (списки) в порядке id или None, если кэша нет"""
+        if self.get_state(role, table) is None:
+            return None
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT data FROM reference_rows WHERE role = ? AND table_name = ? ORDER BY id",
+                    (role, table)
+                ).fetchall()
+        except sqlite3.Error:
+            return None
+        return [json.loads(data) for data, in rows]
+
+    def put_rows(self, role, table, rows, ids, watermark, synced_at, full):
+        """Записывает строки (id, значения). full - rows содержит весь справочник,
+        иначе это только измененные строки, а ids - id всех существующих строк"""
+        try:
+            with self._lock, self._connect() as conn:
+                if full:
+                    conn.execute("DELETE FROM reference_rows WHERE role = ? AND table_name = ?", (role, table))
+                else:
+                    existing = {i for i, in conn.execute(
+                        "SELECT id FROM reference_rows WHERE role = ? AND table_name = ?", (role, table))}
+                    conn.executemany(
+                        "DELETE FROM reference_rows WHERE role = ? AND table_name = ? AND id = ?",
+                        [(role, table, i) for i in existing - set(ids)]
+                    )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO reference_rows (role, table_name, id, data) VALUES (?, ?, ?, ?)",
+                    [(role, table, row_id, json.dumps(values, ensure_ascii=False)) for row_id, values in rows]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO reference_state (role, table_name, watermark, synced_at) VALUES (?, ?, ?, ?)",
+                    (role, table, watermark, synced_at.isoformat())
+                )
+        except sqlite3.Error as e:
+            print(f"Ошибка записи локального кэша: {e}")
+
+    def get_snapshot(self, role, key):
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT data FROM snapshots WHERE role = ? AND key = ?", (role, key)).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def put_snapshot(self, role, key, value):
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshots (role, key, data, saved_at) VALUES (?, ?, ?, ?)",
+                    (role, key, json.dumps(value, ensure_ascii=False, default=str), datetime.now().isoformat())
+                )
+        except sqlite3.Error as e:
+            print(f"Ошибка записи локального кэша: {e}")
+
+
+class ReferenceCache:
+    """Справочники (клиенты, машины, зоны склада) по схеме stale-while-revalidate:
+    cached() сразу отдает последнюю сохраненную версию с диска, sync() сверяет
+    отметку изменений таблицы и дозагружает только строки, измененные
+    с прошлой синхронизации."""
+
+    def __init__(self, role):
+        from controllers.reference_controller import ReferenceController, REFERENCE_TABLES
+        self.role = role
+        self.store = LocalCache.instance()
+        self.controller = ReferenceController()
+        self.tables = REFERENCE_TABLES
+
+    def cached(self, table):
+        """Строки с диска (без обращения к БД) или None"""
+        values = self.store.get_rows(self.role, table)
+        if values is None:
+            return None
+        row_cls = self.tables[table][1]
+        return [row_cls(*v) for v in values]
+
+    def sync(self, table):
+        """Актуальные строки справочника. Если таблица не менялась - один короткий запрос"""
+        state = self.store.get_state(self.role, table)
+        if state is not None and state[0] == self.controller.get_watermark(table):
+            rows = self.cached(table)
+            if rows is not None:
+                return rows
+            state = None
+
+        since = state[1] if state else None
+        watermark, server_time, rows, ids = self.controller.get_changes(table, since, CACHE_SYNC_OVERLAP)
+        self.store.put_rows(
+            self.role, table,
+            [(r.id, [getattr(r, name) for name in r.__slots__]) for r in rows],
+            ids, watermark, server_time, full=since is None
+        )
+        if since is None:
+            return rows
+        cached = self.cached(table)
+        return cached if cached is not None else self.controller.get_changes(table)[2]
@@ -0,0 +1,118 @@
+"""Буферизованная запись журнала операций (system_logs).
+
+Контроллеры не добавляют SystemLog в свою транзакцию: запись ставится
+в очередь вызовом LogWriter.write() после commit, а фоновый поток пишет
+накопленные записи одним INSERT на пачку в отдельной короткой транзакции.
+Там же раз в LOG_PURGE_INTERVAL удаляются записи старше LOG_RETENTION_DAYS.
+Поток запускается при входе в программу (LogWriter.start), поэтому очистка
+идет и в сеансах, которые ничего не пишут в журнал.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, delete, select
+from config import LOG_FLUSH_INTERVAL, LOG_BATCH_SIZE, LOG_BUFFER_LIMIT, LOG_RETENTION_DAYS, LOG_PURGE_INTERVAL
+from database.connection import engine
+from database.models import SystemLog
+
+# Удаление старых записей идет порциями, чтобы не держать долгих блокировок
+PURGE_BATCH_SIZE = 5000
+# После неудачной очистки следующая попытка - через час, а не через LOG_PURGE_INTERVAL
+PURGE_RETRY_AFTER = 3600
+
+
+class LogWriter:
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _buffer = []
+    _wakeup = threading.Event()
+    _thread = None
+    _error = None  # текст последней ошибки записи или очистки, None после успешной записи
+
+    @staticmethod
+    def start():
+        """Запускает фоновый поток записи и очистки, если он еще не запущен"""
+        with LogWriter._lock:
+            if LogWriter._thread is None:
+                LogWriter._thread = threading.Thread(target=LogWriter._run, name="log-writer", daemon=True)
+                LogWriter._thread.start()
+
+    @staticmethod
+    def last_error():
+        """(текст ошибки, записей в очереди) или None, если журнал пишется без ошибок"""
+        with LogWriter._lock:
+            return (LogWriter._error, len(LogWriter._buffer)) if LogWriter._error else None
+
+    @staticmethod
+    def write(event_type, description):
+        """Ставит запись в очередь. Время события фиксируется сейчас, а не при записи в БД"""
+        with LogWriter._lock:
+            LogWriter._buffer.append({"event_type": event_type, "description": description,
+                                      "created_at": datetime.now()})
+            full = len(LogWriter._buffer) >= LOG_BATCH_SIZE
+        LogWriter.start()
+        if full:
+            LogWriter._wakeup.set()
+
+    @staticmethod
+    def flush():
+        """Пишет все накопленные записи. Возвращает число записанных"""
+        with LogWriter._flush_lock:
+            with LogWriter._lock:
+                batch, LogWriter._buffer = LogWriter._buffer, []
+            if not batch:
+                return 0
+            try:
+                with engine.begin() as conn:
+                    for start in range(0, len(batch), LOG_BATCH_SIZE):
+                        conn.execute(insert(SystemLog), batch[start:start + LOG_BATCH_SIZE])
+                with LogWriter._lock:
+                    LogWriter._error = None
+                return len(batch)
+            except Exception as e:
+                print(f"Ошибка записи журнала: {e}")
+                with LogWriter._lock:
+                    LogWriter._error = f"Ошибка записи журнала: {e}"
+                    # Записи возвращаются в очередь; при долгой недоступности БД старые отбрасываются
+                    LogWriter._buffer[:0] = batch
+                    excess = len(LogWriter._buffer) - LOG_BUFFER_LIMIT
+                    if LOG_BUFFER_LIMIT and excess > 0:
+                        del LogWriter._buffer[:excess]
+                return 0
+
+    @staticmethod
+    def purge(days=LOG_RETENTION_DAYS):
+        """Удаляет записи старше days дней. Возвращает число удаленных"""
+        if days <= 0:
+            return 0
+        cutoff = datetime.now() - timedelta(days=days)
+        removed = 0
+        while True:
+            old_ids = select(SystemLog.id).where(SystemLog.created_at < cutoff).limit(PURGE_BATCH_SIZE)
+            with engine.begin() as conn:
+                count = conn.execute(delete(SystemLog).where(SystemLog.id.in_(old_ids.scalar_subquery()))).rowcount
+            removed += count
+            if count < PURGE_BATCH_SIZE:
+                return removed
+
+    @staticmethod
+    def _run():
+        next_purge = time.monotonic()
+        while True:
+            if time.monotonic() >= next_purge:
+                try:
+                    LogWriter.purge()
+                    next_purge = time.monotonic() + LOG_PURGE_INTERVAL
+                except Exception as e:
+                    print(f"Ошибка очистки журнала: {e}")
+                    with LogWriter._lock:
+                        LogWriter._error = f"Ошибка очистки журнала: {e}"
+                    next_purge = time.monotonic() + PURGE_RETRY_AFTER
+            LogWriter._wakeup.wait(LOG_FLUSH_INTERVAL)
+            LogWriter._wakeup.clear()
+            LogWriter.flush()
+
+
+# Записи, не успевшие уйти в БД, пишутся при выходе из приложения
+atexit.register(LogWriter.flush)
@@ -1,48 +1,111 @@
 from fpdf import FPDF
 from datetime import datetime
-import os
+from services.font_registry import FontRegistry, FAMILY as FONT, FULL_FAMILY
+
+# Ширины колонок таблиц отчетов, мм
+INCOME_WIDTHS = [30, 30, 50, 45, 35]
+DELIVERED_WIDTHS = [30, 50, 30, 30, 50]
+# Высота строки нарастающего итога внизу страницы
+CARRY_HEIGHT = 8
 
 class PDFService(FPDF):
     def __init__(self):
         super().__init__()
-        font_dir = os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts')
-        times_path = os.path.join(font_dir, 'times.ttf')
-        times_bd_path = os.path.join(font_dir, 'timesbd.ttf')
-        
-        if os.path.exists(times_path):
-            self.add_font('TimesNewRoman', '', times_path, uni=True)
-            self.add_font('TimesNewRoman', 'B', times_bd_path, uni=True)
-            self.set_font("TimesNewRoman", size=14)
-        else:
-            self.add_font('Arial', '', os.path.join(font_dir, 'arial.ttf'), uni=True)
-            self.add_font('Arial', 'B', os.path.join(font_dir, 'arialbd.ttf'), uni=True)
-            self.set_font("Arial", size=14)
+        # Шрифт разбирается один раз на процесс, см. services/font_registry.py
+        FontRegistry.install(self)
+        self.set_font(FONT, size=14)
+        # Полный шрифт выбран только для одной строки (normalize_text)
+        self.fallback = False
+
+    def normalize_text(self, text):
+        # fpdf2 вызывает его перед выводом и измерением любой строки: если в урезанном
+        # шрифте нет каких-то символов, строка рисуется полным файлом того же шрифта
+        self.restore_font()
+        if self.font_family == FONT.lower() and not FontRegistry.covers(text):
+            if FULL_FAMILY.lower() not in self.fonts:
+                FontRegistry.install(self, full=True)
+            self.set_font(FULL_FAMILY, self.font_style, self.font_size_pt)
+            self.fallback = True
+        return super().normalize_text(text)
+
+    def restore_font(self):
+        """Возвращает урезанный шрифт после строки, нарисованной полным"""
+        if self.fallback:
+            self.fallback = False
+            if self.font_family == FULL_FAMILY.lower():
+                self.set_font(FONT, self.font_style, self.font_size_pt)
+
+    def cell(self, *args, **kwargs):
+        try:
+            return super().cell(*args, **kwargs)
+        finally:
+            self.restore_font()
+
+    def multi_cell(self, *args, **kwargs):
+        try:
+            return super().multi_cell(*args, **kwargs)
+        finally:
+            self.restore_font()
 
     def draw_header_and_title(self, title):
         self.add_page()
-        self.set_font("TimesNewRoman", size=14)
+        self.set_font(FONT, size=14)
         self.cell(0, 8, "ООО «ЛогистТранс».", ln=True, align="L")
         date_str = datetime.now().strftime('%d.%m.%Y')
         self.cell(0, 8, f"{date_str} Тепловодская Вероника Антоновна", ln=True, align="L")
         self.ln(10)
         
-        self.set_font("TimesNewRoman", 'B', 14)
+        self.set_font(FONT, 'B', 14)
         self.cell(0, 10, title, ln=True, align="C")
         self.ln(5)
 
     def draw_signatures(self):
         self.ln(15)
-        self.set_font("TimesNewRoman", size=14)
+        self.set_font(FONT, size=14)
         self.cell(0, 8, "Подтверждено Генеральным директором", ln=True, align="R")
         self.cell(0, 8, "Тепловодская.В.А____________________________", ln=True, align="R")
         self.cell(0, 8, f"«____» ____________ 2026 года", ln=True, align="R")
 
+    def draw_rows(self, rows, draw_header, draw_row, row_height, carry=None):
+        """Строки таблицы из итератора rows (список не нужен, строки могут идти
+        с серверного курсора). Шапка draw_header повторяется на каждой странице
+        (и задает шрифт строк), перед переходом на новую страницу печатается
+        строка carry() - нарастающий итог.
+
+        fpdf2 держит содержимое страниц в памяти до output() (~11 КБ на страницу
+        отчета), поэтому память все же растет с числом страниц, но не со
+        списком строк."""
+        draw_header()
+        for row in rows:
+            if self.will_page_break(row_height + CARRY_HEIGHT):
+                if carry:
+                    self.set_font(FONT, size=10)
+                    self.cell(0, CARRY_HEIGHT, carry(), ln=True, align="R")
+                self.add_page()
+                draw_header()
+            draw_row(row)
+
+    @staticmethod
+    def money(value):
+        return f"{int(value):,}".replace(',', ' ')
+
     # --- Приложение А: Доходы за период ---
     def generate_income_report(self, orders, filepath, date_start=None, date_end=None):
+        """orders - любой итерируемый набор строк IncomeRow, итог считается по ходу"""
         self.draw_header_and_title("Отчёт «Доходы за период»")
+        self.running_cost = 0
+        self.draw_rows(orders, self._income_header, self._income_row, 10,
+                       carry=lambda: f"Итого с начала отчёта: {self.money(self.running_cost)} руб.")
+
+        self.ln(10)
+        self.set_font(FONT, size=14)
+        self.cell(0, 10, f"ОБЩАЯ СУММА: {self.money(self.running_cost)} руб.", ln=True, align="R")
+        self.draw_signatures()
+        self.output(filepath)
 
-        self.set_font("TimesNewRoman", size=12)
-        w = [30, 30, 50, 45, 35]
+    def _income_header(self):
+        self.set_font(FONT, size=12)
+        w = INCOME_WIDTHS
         self.cell(w[0], 8, "Номер заказа", "LTR", 0, 'C')
         self.cell(w[1], 8, "Дата", "LTR", 0, 'C')
         self.cell(w[2], 8, "Название", "LTR", 0, 'C')
@@ -55,69 +118,70 @@ class PDFService(FPDF):
         self.cell(w[3], 8, "", "LBR", 0, 'C')
         self.cell(w[4], 8, "услуги", "LBR", 1, 'C')
 
-        total = 0
-        for o in orders:
-            self.cell(w[0], 10, f"А{o.id:05d}", 1, 0, 'C')
-            
-            date_val = o.created_at.strftime('%d.%m.%Y') if o.created_at else "-"
-            self.cell(w[1], 10, date_val, 1, 0, 'C')
-            
-            client_name = o.client.name if o.client else "-"
-            if len(client_name) > 25: client_name = client_name[:22] + "..."
-            self.cell(w[2], 10, client_name, 1, 0, 'C')
-            
-            route = f"{o.route_start}-{o.route_end}" if o.route_start else "-"
-            if len(route) > 22: route = route[:19] + "..."
-            self.cell(w[3], 10, route, 1, 0, 'C')
-            
-            self.cell(w[4], 10, f"{int(o.cost or 0)}", 1, 1, 'C')
-            total += (o.cost or 0)
-
-        self.ln(10)
-        self.set_font("TimesNewRoman", size=14)
-        total_str = f"{int(total):,}".replace(',', ' ')
-        self.cell(0, 10, f"ОБЩАЯ СУММА: {total_str} руб.", ln=True, align="R")
-        self.draw_signatures()
-        self.output(filepath)
+    def _income_row(self, o):
+        w = INCOME_WIDTHS
+        self.cell(w[0], 10, f"А{o.id:05d}", 1, 0, 'C')
+        
+        date_val = o.created_at.strftime('%d.%m.%Y') if o.created_at else "-"
+        self.cell(w[1], 10, date_val, 1, 0, 'C')
+        
+        client_name = o.client_name or "-"
+        if len(client_name) > 25: client_name = client_name[:22] + "..."
+        self.cell(w[2], 10, client_name, 1, 0, 'C')
+        
+        route = f"{o.route_start}-{o.route_end}" if o.route_start else "-"
+        if len(route) > 22: route = route[:19] + "..."
+        self.cell(w[3], 10, route, 1, 0, 'C')
+        
+        self.cell(w[4], 10, f"{int(o.cost or 0)}", 1, 1, 'C')
+        self.running_cost += (o.cost or 0)
 
     # --- Приложение B: Количество доставленных грузов ---
     def generate_delivered_report(self, orders, filepath):
+        """orders - любой итерируемый набор строк DeliveredRow. Итоги считаются
+        по ходу и печатаются после таблицы, поэтому всегда совпадают с ней"""
         self.draw_header_and_title("Отчёт «Количество доставленных грузов»")
 
-        total_weight = sum(o.weight for o in orders if o.weight)
-        total_vol = sum(o.volume for o in orders if o.volume)
-
-        self.set_font("TimesNewRoman", size=14)
-        self.cell(0, 8, f"Выполнено заказов: {len(orders)}", ln=True)
-        self.cell(0, 8, f"Общий вес: {total_weight} кг", ln=True)
-        self.cell(0, 8, f"Общий объём: {total_vol} м3", ln=True)
-        self.ln(5)
+        self.running_count = self.running_weight = self.running_volume = 0
+        self.draw_rows(orders, self._delivered_header, self._delivered_row, 10,
+                       carry=lambda: f"С начала отчёта: {self.running_count} заказов, "
+                                     f"{round(self.running_weight, 2)} кг, {round(self.running_volume, 2)} м3")
 
-        self.set_font("TimesNewRoman", size=12)
-        w = [30, 50, 30, 30, 50]
+        self.ln(10)
+        self.set_font(FONT, size=14)
+        self.cell(0, 8, f"Выполнено заказов: {self.running_count}", ln=True)
+        self.cell(0, 8, f"Общий вес: {round(self.running_weight, 2)} кг", ln=True)
+        self.cell(0, 8, f"Общий объём: {round(self.running_volume, 2)} м3", ln=True)
         
+        self.draw_signatures()
+        self.output(filepath)
+
+    def _delivered_header(self):
+        self.set_font(FONT, size=12)
+        w = DELIVERED_WIDTHS
         self.cell(w[0], 10, "Номер заказа", 1, 0, 'C')
         self.cell(w[1], 10, "Тип груза", 1, 0, 'C')
         self.cell(w[2], 10, "Вес груза", 1, 0, 'C')
         self.cell(w[3], 10, "Объём груза", 1, 0, 'C')
         self.cell(w[4], 10, "Статус заказа", 1, 1, 'C')
 
-        for o in orders:
-             self.cell(w[0], 10, f"А{o.id:05d}", 1, 0, 'C')
-             desc = o.description[:25] if o.description else "-"
-             self.cell(w[1], 10, desc, 1, 0, 'C')
-             self.cell(w[2], 10, f"{o.weight or 0} кг", 1, 0, 'C')
-             self.cell(w[3], 10, f"{o.volume or 0} м3", 1, 0, 'C')
-             self.cell(w[4], 10, o.status, 1, 1, 'C')
-        
-        self.draw_signatures()
-        self.output(filepath)
+    def _delivered_row(self, o):
+        w = DELIVERED_WIDTHS
+        self.cell(w[0], 10, f"А{o.id:05d}", 1, 0, 'C')
+        desc = o.description[:25] if o.description else "-"
+        self.cell(w[1], 10, desc, 1, 0, 'C')
+        self.cell(w[2], 10, f"{o.weight or 0} кг", 1, 0, 'C')
+        self.cell(w[3], 10, f"{o.volume or 0} м3", 1, 0, 'C')
+        self.cell(w[4], 10, o.status, 1, 1, 'C')
+        self.running_count += 1
+        self.running_weight += o.weight or 0
+        self.running_volume += o.volume or 0
 
     # --- Приложение C: Загрузка транспорта ---
     def generate_transport_load_report(self, vehicles, filepath):
         self.draw_header_and_title("Отчёт «Загрузка транспорта»")
         
-        self.set_font("TimesNewRoman", size=11)
+        self.set_font(FONT, size=11)
         w = [35, 40, 30, 25, 30, 30]
         
         self.cell(w[0], 6, "Номер машины", "LTR", 0, 'C')
@@ -138,21 +202,17 @@ class PDFService(FPDF):
             self.cell(w[0], 10, f"{v.plate_number}", 1, 0, 'C')
             
             d_name = "Нет"
-            if v.driver:
-                surname = v.driver.surname or ""
-                name_chr = v.driver.name[0] + "." if v.driver.name else ""
+            if v.driver_surname is not None:
+                surname = v.driver_surname or ""
+                name_chr = v.driver_name[0] + "." if v.driver_name else ""
                 d_name = f"{surname} {name_chr}".strip()
                 
             self.cell(w[1], 10, d_name, 1, 0, 'C')
             self.cell(w[2], 10, v.status, 1, 0, 'C')
             
-            # РЕАЛЬНЫЕ ДАННЫЕ ИЗ БАЗЫ: считаем привязанные к машине заказы
-            real_trips = len(v.orders) if hasattr(v, 'orders') else 0
-            self.cell(w[3], 10, str(real_trips), 1, 0, 'C')
-            
-            # Динамический расчет пробега (в среднем 600км на 1 заказ)
-            mileage = real_trips * 600
-            self.cell(w[4], 10, f"{mileage:,} км".replace(',', ' '), 1, 0, 'C')
+            # Рейсы и пробег за период посчитаны в TransportController.get_fleet
+            self.cell(w[3], 10, str(v.trips), 1, 0, 'C')
+            self.cell(w[4], 10, f"{v.distance:,.0f} км".replace(',', ' '), 1, 0, 'C')
             
             perc = "100%" if v.status != "Свободен" else "0%"
             self.cell(w[5], 10, perc, 1, 1, 'C')
@@ -162,12 +222,17 @@ class PDFService(FPDF):
 
     # --- Приложение D: Маршрутный лист ---
     def generate_waybill(self, order, filepath):
+        self.add_waybill(order)
+        self.output(filepath)
+
+    def add_waybill(self, order):
+        """Маршрутный лист на новой странице (для пакета документов в одном файле)"""
         self.add_page()
-        self.set_font("TimesNewRoman", 'B', 14)
+        self.set_font(FONT, 'B', 14)
         self.cell(0, 10, f"Отчёт «Маршрутный лист» - Документация для водителя", ln=True, align="C")
         self.ln(5)
         
-        self.set_font("TimesNewRoman", size=14)
+        self.set_font(FONT, size=14)
         v_info = f"{order.vehicle.model} (госномер {order.vehicle.plate_number})" if order.vehicle else "Не назначен"
         d_info = f"{order.vehicle.driver.surname} {order.vehicle.driver.name}" if (order.vehicle and order.vehicle.driver) else "-"
 
@@ -175,7 +240,7 @@ class PDFService(FPDF):
         self.cell(0, 8, f"Водитель: {d_info}", ln=True)
         self.ln(5)
 
-        self.set_font("TimesNewRoman", size=12)
+        self.set_font(FONT, size=12)
         w = [35, 45, 40, 40, 30]
         
         self.cell(w[0], 10, "Этап маршрута", 1, 0, 'C')
@@ -205,23 +270,27 @@ class PDFService(FPDF):
         self.cell(w[4], 15, "________", 1, 1, 'C')
 
         self.draw_signatures()
-        self.output(filepath)
 
     # --- Приложение E: Квитанция ---
     def generate_receipt(self, order, filepath):
+        self.add_receipt(order)
+        self.output(filepath)
+
+    def add_receipt(self, order):
+        """Квитанция на новой странице"""
         self.add_page()
-        self.set_font("TimesNewRoman", size=14)
+        self.set_font(FONT, size=14)
         self.cell(0, 8, "ООО «ЛогистТранс».", ln=True, align="L")
         date_str = datetime.now().strftime('%d.%m.%Y')
         self.cell(0, 8, f"{date_str} Тепловодская Вероника Антоновна", ln=True, align="L")
         self.ln(10)
         
-        self.set_font("TimesNewRoman", 'B', 14)
+        self.set_font(FONT, 'B', 14)
         self.cell(0, 8, f"Отчёт «Квитанция для клиента»", ln=True, align="C")
         self.cell(0, 8, f"КВИТАНЦИЯ К ЗАКАЗУ № {order.id}", ln=True, align="C")
         self.ln(5)
         
-        self.set_font("TimesNewRoman", size=14)
+        self.set_font(FONT, size=14)
         self.cell(0, 8, f"Исполнитель: ООО «ЛогистТранс», ИНН 7700123456, г. Москва, ул. Промышленная 10.", ln=True)
         client_name = order.client.name if order.client else "Частное лицо"
         self.cell(0, 8, f"Заказчик: {client_name}", ln=True)
@@ -245,4 +314,3 @@ class PDFService(FPDF):
         self.cell(0, 8, "От клиента:       _________ / Смирнов А.П. /", ln=True)
         
         self.draw_signatures()
-        self.output(filepath)
\ No newline at end of file
@@ -0,0 +1,23 @@
+from database.connection import ensure_schema, warm_pool
+
+class StartupService:
+    """Подготовка БД, пока на экране окно входа. Выполняется в фоновом потоке."""
+
+    @staticmethod
+    def prepare():
+        """Проверяет версию схемы, открывает соединения пула и прогревает
+        запросы входа и главной панели. Возвращает True, если схема обновлялась."""
+        migrated = ensure_schema()
+        warm_pool()
+        StartupService.warm_queries()
+        return migrated
+
+    @staticmethod
+    def warm_queries():
+        # psycopg2 не готовит запросы на сервере, поэтому "подготовка" - это первое
+        # выполнение: SQLAlchemy кэширует скомпилированный SQL, а PostgreSQL
+        # загружает каталог и страницы индексов, нужные входу и панели
+        from controllers.auth_controller import AuthController
+        from controllers.dashboard_controller import DashboardController
+        AuthController().login("", "")
+        DashboardController()._query_stats(0, 'logist')
@@ -0,0 +1,46 @@
+import time
+
+from config import STARTUP_TIMING
+
+class StartupTiming:
+    """Замеры запуска: загрузка модулей, вход, первая отрисовка главного окна
+    и первые данные на экране. Включаются переменной LOGIST_STARTUP_TIMING=1,
+    отчет печатается в консоль, как только на экране появились первые данные."""
+    _start = time.perf_counter()
+    _marks = {}
+    _reported = False
+
+    @staticmethod
+    def mark(name):
+        """Запоминает момент первого наступления события name"""
+        if STARTUP_TIMING and name not in StartupTiming._marks:
+            StartupTiming._marks[name] = time.perf_counter() - StartupTiming._start
+
+    @staticmethod
+    def restart_session():
+        """Новый вход: замеры после входа начинаются заново"""
+        for name in ("login", "first_paint", "first_data"):
+            StartupTiming._marks.pop(name, None)
+        StartupTiming._reported = False
+        StartupTiming.mark("login")
+
+    @staticmethod
+    def finish():
+        """Первые данные на экране - печатаем отчет (один раз за вход)"""
+        StartupTiming.mark("first_data")
+        if STARTUP_TIMING and not StartupTiming._reported:
+            StartupTiming._reported = True
+            print(StartupTiming.report())
+
+    @staticmethod
+    def report():
+        m = StartupTiming._marks
+        lines = ["Замеры запуска (мс):"]
+        if "imports" in m:
+            lines.append(f"  загрузка модулей:           {m['imports'] * 1000:8.0f}")
+        if "login" in m:
+            login = m["login"]
+            for name, title in (("first_paint", "вход -> первая отрисовка:"), ("first_data", "вход -> первые данные:   ")):
+                if name in m:
+                    lines.append(f"  {title}   {(m[name] - login) * 1000:8.0f}")
+        return "\n".join(lines)
@@ -0,0 +1,37 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from database.notifications import ChangeFeed
+from services.cache_service import CacheService
+
+class ChangeListener(QThread):
+    """Слушает канал изменений БД в фоновом потоке и передает события
+    других клиентов в GUI-поток. При обрыве связи переподключается."""
+    changed = pyqtSignal(str, str, object)  # (таблица, операция, список id или None)
+
+    RECONNECT_DELAY_MS = 5000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.running = True
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+    def run(self):
+        feed = ChangeFeed()
+        while self.running:
+            try:
+                if feed.conn is None:
+                    feed.open()
+                for event in feed.wait(1.0):
+                    # Кэши процесса со счетчиками версий сразу перестают совпадать
+                    CacheService.invalidate(event["table"])
+                    self.changed.emit(event["table"], event["op"], event["ids"])
+            except Exception as e:
+                print(f"Канал изменений недоступен: {e}")
+                feed.close()
+                for _ in range(self.RECONNECT_DELAY_MS // 100):
+                    if not self.running:
+                        break
+                    self.msleep(100)
+        feed.close()
@@ -1,13 +1,19 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, 
-                             QPushButton, QHeaderView, QLineEdit, QDialog, QFormLayout, QMessageBox, QLabel)
-from PyQt6.QtCore import Qt
+                             QPushButton, QHeaderView, QLineEdit, QDialog, QFormLayout, QMessageBox, QLabel, QCheckBox)
+from PyQt6.QtCore import Qt, QTimer
 from controllers.clients_controller import ClientsController
+from services.local_cache import ReferenceCache
+from ui.task_executor import TaskExecutor
 
 class ClientsTab(QWidget):
     def __init__(self, user):
         super().__init__()
         self.user = user  
         self.controller = ClientsController()
+        self.references = ReferenceCache(user.role)
+        # Последний результат поиска из БД: (текст запроса, клиенты)
+        self.loaded_text = None
+        self.loaded_clients = []
         
         layout = QVBoxLayout()
         layout.setContentsMargins(30, 30, 30, 30)
@@ -21,7 +27,11 @@ class ClientsTab(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("🔍 Поиск клиента по названию или Email...")
         self.search_input.setFixedWidth(400)
-        self.search_input.textChanged.connect(self.load_data)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
         search_layout.addWidget(self.search_input)
         search_layout.addStretch()
         layout.addLayout(search_layout)
@@ -72,11 +82,50 @@ class ClientsTab(QWidget):
         if self.user.role != 'logist':
             self.btn_add.hide(); self.btn_edit.hide(); self.btn_del.hide()
 
+    def apply_changes(self, table, op, ids):
+        """Изменения от других клиентов: кэш клиентов дочитывает только измененные строки"""
+        if table == "clients":
+            self.load_data()
+
     def load_data(self):
-        clients = self.controller.get_all()
-        filter_txt = self.search_input.text().lower()
-        filtered = [c for c in clients if filter_txt in c.name.lower() or filter_txt in (c.email or "").lower()]
-        
+        self.search_timer.stop()
+        text = self.search_input.text().strip()
+        if text:
+            TaskExecutor.instance().submit(
+                f"clients:{id(self)}", self.controller.search, text,
+                on_result=lambda clients: self.show_results(text, clients)
+            )
+            return
+        # Полный список: сразу последняя версия с диска, затем сверка с БД в фоне
+        if self.loaded_text is None:
+            cached = self.references.cached("clients")
+            if cached is not None:
+                self.show_results("", cached)
+        TaskExecutor.instance().submit(
+            f"clients:{id(self)}", self.references.sync, "clients",
+            on_result=lambda clients: self.show_results("", clients)
+        )
+
+    def show_results(self, text, clients):
+        self.loaded_text = text
+        self.loaded_clients = clients
+        self.fill_table(self.filter_clients(clients, self.search_input.text().strip()))
+
+    def apply_search(self):
+        """Если новый текст уточняет предыдущий, отбираем из уже загруженных клиентов"""
+        text = self.search_input.text().strip()
+        if self.loaded_text is not None and self.loaded_text.casefold() in text.casefold():
+            TaskExecutor.instance().cancel(f"clients:{id(self)}")
+            self.fill_table(self.filter_clients(self.loaded_clients, text))
+        else:
+            self.load_data()
+
+    @staticmethod
+    def filter_clients(clients, text):
+        text = text.casefold()
+        return [c for c in clients if text in c.name.casefold() or text in (c.email or "").casefold()]
+
+    def fill_table(self, filtered):
         self.table.setRowCount(len(filtered))
         for i, c in enumerate(filtered):
             self.table.setItem(i, 0, QTableWidgetItem(str(c.id)))
@@ -93,28 +142,35 @@ class ClientsTab(QWidget):
         c_id = int(self.table.item(row, 0).text())
         client_name = self.table.item(row, 1).text()
         
-        orders = self.controller.get_client_orders(c_id)
-        
         d = QDialog(self)
         d.setWindowTitle(f"История заказов: {client_name}")
         d.resize(700, 450)
         l = QVBoxLayout(d)
+
+        # Архивные (старые закрытые) заказы загружаются только по запросу
+        archive_chk = QCheckBox("Показать архивные заказы")
+        l.addWidget(archive_chk)
         
-        t = QTableWidget(len(orders), 5)
+        t = QTableWidget(0, 5)
         t.setHorizontalHeaderLabels(["№", "Дата", "Маршрут", "Стоимость", "Статус"])
         t.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         t.verticalHeader().setVisible(False)
         t.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
         t.setAlternatingRowColors(True)
-        
-        for i, o in enumerate(orders):
-            t.setItem(i, 0, QTableWidgetItem(f"А{o.id:05d}"))
-            date_str = o.created_at.strftime('%d.%m.%Y') if o.created_at else "-"
-            t.setItem(i, 1, QTableWidgetItem(date_str))
-            t.setItem(i, 2, QTableWidgetItem(f"{o.route_start} - {o.route_end}"))
-            t.setItem(i, 3, QTableWidgetItem(f"{o.cost or 0} руб."))
-            t.setItem(i, 4, QTableWidgetItem(o.status))
-            
+
+        def fill(include_archive=False):
+            orders = self.controller.get_client_orders(c_id, include_archive)
+            t.setRowCount(len(orders))
+            for i, o in enumerate(orders):
+                t.setItem(i, 0, QTableWidgetItem(f"А{o.id:05d}"))
+                date_str = o.created_at.strftime('%d.%m.%Y') if o.created_at else "-"
+                t.setItem(i, 1, QTableWidgetItem(date_str))
+                t.setItem(i, 2, QTableWidgetItem(f"{o.route_start} - {o.route_end}"))
+                t.setItem(i, 3, QTableWidgetItem(f"{o.cost or 0} руб."))
+                t.setItem(i, 4, QTableWidgetItem(o.status))
+
+        fill()
+        archive_chk.toggled.connect(fill)
         l.addWidget(t)
         d.exec()
 
@@ -139,7 +195,7 @@ class ClientsTab(QWidget):
         row = self.table.currentRow()
         if row < 0: return QMessageBox.warning(self, "Внимание", "Выберите клиента")
         c_id = int(self.table.item(row, 0).text())
-        client = next((c for c in self.controller.get_all() if c.id == c_id), None)
+        client = self.controller.get_by_id(c_id)
         if not client: return
 
         d = QDialog(self); d.setWindowTitle("Редактирование"); f = QFormLayout(d)
@@ -158,5 +214,7 @@ class ClientsTab(QWidget):
         row = self.table.currentRow()
         if row >= 0:
             if QMessageBox.question(self, "Удаление", "Удалить клиента?") == QMessageBox.StandardButton.Yes:
-                self.controller.delete(int(self.table.item(row, 0).text()))
+                success, msg = self.controller.delete(int(self.table.item(row, 0).text()))
+                if not success:
+                    QMessageBox.warning(self, "Ошибка", msg)
                 self.load_data()
\ No newline at end of file
@@ -1,14 +1,43 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QGridLayout, QScrollArea)
-from PyQt6.QtCharts import QChart, QChartView, QPieSeries, QBarSeries, QBarSet, QBarCategoryAxis, QValueAxis
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QGridLayout, QScrollArea, QComboBox)
 from PyQt6.QtGui import QPainter, QColor, QFont
-from PyQt6.QtCore import Qt, QMargins
+from PyQt6.QtCore import Qt, QMargins, QTimer
 from controllers.dashboard_controller import DashboardController
+from ui.task_executor import TaskExecutor
+from services.startup_timing import StartupTiming
+from services.local_cache import LocalCache
+from ui.settings_tab import app_settings, DEFAULT_REFRESH_INTERVAL
+from datetime import date, timedelta
+
+# Варианты периода для графика доходов: (название, дней или месяцев, группировка)
+INCOME_RANGES = [
+    ("7 дней", 7, "day"),
+    ("30 дней", 30, "day"),
+    ("Квартал по неделям", 91, "week"),
+    ("Год по месяцам", 12, "month"),
+    ("Дни недели за 30 дней", 30, "weekday"),
+]
+
+PIE_SLICES = [("В пути", "#3B82F6"), ("Новые", "#10B981"), ("Доставлено", "#64748B")]
 
 class DashboardTab(QWidget):
+    """Главная панель. Виджеты и графики создаются один раз, обновление
+    меняет только значения подписей, долей диаграммы и столбцов"""
+
     def __init__(self, user):
         super().__init__()
         self.user = user
         self.controller = DashboardController()
+        self.income_range = 0
+        self.last_data = None
+        self.channel = f"dashboard:{id(self)}"
+        # Серия изменений от других клиентов дает одно обновление панели
+        self.changes_timer = QTimer(self)
+        self.changes_timer.setSingleShot(True)
+        self.changes_timer.setInterval(2000)
+        self.changes_timer.timeout.connect(self.load_data)
+        # Фоновое обновление, пока панель на экране (интервал из настроек)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.load_data)
         self.scroll = QScrollArea()
         self.scroll.setWidgetResizable(True)
         self.scroll.setFrameShape(QFrame.Shape.NoFrame)
@@ -17,23 +46,82 @@ class DashboardTab(QWidget):
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.addWidget(self.scroll)
-        self.load_data()
 
-    def load_data(self):
-        """защита от дублирования графиков и поломок"""
-        old_widget = self.scroll.takeWidget()
-        if old_widget:
-            old_widget.deleteLater()
+        # Последний снимок с диска показывается сразу, свежие данные придут следом
+        snapshot = LocalCache.instance().get_snapshot(self.user.role, self.snapshot_key())
+        if snapshot:
+            self.income_range = snapshot.get("income_range", 0)
 
         content_widget = QWidget()
         layout = QVBoxLayout(content_widget)
         layout.setContentsMargins(30, 30, 30, 30)
         layout.setSpacing(20)
-
         self.build_ui(layout)
-        
         self.scroll.setWidget(content_widget)
 
+        if snapshot:
+            self.show_data(snapshot)
+        self.load_data()
+
+    def snapshot_key(self):
+        # Показатели водителя зависят от его машины
+        return f"dashboard:{self.user.id}" if self.user.role == 'driver' else "dashboard"
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Интервал перечитывается при каждом показе - изменения в настройках применяются сразу
+        seconds = app_settings().value("dashboard/refresh_interval", DEFAULT_REFRESH_INTERVAL, type=int)
+        if seconds > 0:
+            self.refresh_timer.start(seconds * 1000)
+        else:
+            self.refresh_timer.stop()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+    def apply_changes(self, table, op, ids):
+        if table in ("orders", "vehicles", "warehouse_zones"):
+            self.changes_timer.start()
+
+    def load_data(self):
+        TaskExecutor.instance().submit(self.channel, self.fetch_data, self.income_range, on_result=self.show_data)
+
+    def fetch_data(self, income_range):
+        """Выполняется в фоновом потоке: только запросы, без работы с виджетами"""
+        data = {"stats": self.controller.get_stats(self.user.id, self.user.role), "income_range": income_range}
+        if self.user.role != 'driver':
+            data["events"] = self.controller.get_important_events()
+            data["logs"] = self.controller.get_operations_log()
+            data["income"] = [list(item) for item in self.controller.get_income(*self.income_period(income_range))]
+        LocalCache.instance().put_snapshot(self.user.role, self.snapshot_key(), data)
+        return data
+
+    def show_data(self, data):
+        """Переносит данные в уже созданные виджеты; неизменившиеся не трогаются"""
+        StartupTiming.finish()
+        last = self.last_data or {}
+        if data == last:
+            return
+        active_o, new_o, done_o, free_vehicles, wh_percent = data["stats"]
+        set_text(self.kpi_active, str(active_o))
+
+        if self.user.role != 'driver':
+            set_text(self.kpi_free, f"{free_vehicles} шт")
+            set_text(self.kpi_warehouse, f"{wh_percent}%")
+            # Если склад заполнен > 90%, делаем текст красным
+            set_style(self.kpi_warehouse, f"color: {'#DC2626' if wh_percent > 90 else '#3B82F6'};")
+
+            if data["stats"] != last.get("stats"):
+                self.fill_pie_chart(active_o, new_o, done_o)
+            if data["income_range"] == self.income_range and data["income"] != last.get("income"):
+                self.fill_bar_chart(data["income"])
+            if data["events"] != last.get("events"):
+                self.fill_events(data["events"])
+            if data["logs"] != last.get("logs"):
+                self.fill_logs(data["logs"])
+        self.last_data = data
+
     def build_ui(self, layout):
         role_map = {'logist': 'Логист', 'driver': 'Водитель', 'director': 'Руководитель'}
         role_ru = role_map.get(self.user.role, self.user.role)
@@ -42,20 +130,18 @@ class DashboardTab(QWidget):
         header.setStyleSheet("font-size: 22px; font-weight: bold; color: #0F172A; margin-bottom: 10px;")
         layout.addWidget(header)
 
-        active_o, new_o, done_o, free_vehicles, wh_percent = self.controller.get_stats(self.user.id, self.user.role)
-
         # --- КАРТОЧКИ KPI ---
         kpi_layout = QHBoxLayout()
         kpi_layout.setSpacing(20)
         
-        kpi_layout.addWidget(self.create_kpi_card("Активные заказы", str(active_o), "📦", "#3B82F6"))
+        card, self.kpi_active = self.create_kpi_card("Активные заказы", "📦", "#3B82F6")
+        kpi_layout.addWidget(card)
         
         if self.user.role != 'driver':
-            kpi_layout.addWidget(self.create_kpi_card("Свободный транспорт", f"{free_vehicles} шт", "🚛", "#10B981"))
-            
-            # Если склад заполнен > 90%, делаем текст красным
-            wh_color = "#DC2626" if wh_percent > 90 else "#3B82F6" 
-            kpi_layout.addWidget(self.create_kpi_card("Заполненность склада", f"{wh_percent}%", "🏭", wh_color))
+            card, self.kpi_free = self.create_kpi_card("Свободный транспорт", "🚛", "#10B981")
+            kpi_layout.addWidget(card)
+            card, self.kpi_warehouse = self.create_kpi_card("Заполненность склада", "🏭", "#3B82F6")
+            kpi_layout.addWidget(card)
         else:
             kpi_layout.addStretch()
             
@@ -75,7 +161,7 @@ class DashboardTab(QWidget):
             # Правая колонка
             right_layout = QVBoxLayout()
             right_layout.setSpacing(20)
-            right_layout.addWidget(self.create_pie_chart(active_o, new_o, done_o))
+            right_layout.addWidget(self.create_pie_chart())
             right_layout.addWidget(self.create_log_block())
 
             grid.addLayout(left_layout, 0, 0)
@@ -91,7 +177,8 @@ class DashboardTab(QWidget):
 
     # --- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ---
 
-    def create_kpi_card(self, title, value, icon, value_color):
+    def create_kpi_card(self, title, icon, value_color):
+        """Карточка KPI; возвращает (карточка, подпись значения)"""
         card = QFrame()
         card.setObjectName("Card")
         card.setFixedHeight(120)
@@ -102,7 +189,7 @@ class DashboardTab(QWidget):
         icon_lbl = QLabel(icon)
         icon_lbl.setStyleSheet("font-size: 28px; background: transparent;")
         
-        val_lbl = QLabel(value)
+        val_lbl = QLabel("—")
         val_lbl.setObjectName("CardValue")
         val_lbl.setStyleSheet(f"color: {value_color};") 
         
@@ -115,80 +202,102 @@ class DashboardTab(QWidget):
         
         layout.addLayout(top_row)
         layout.addWidget(title_lbl)
-        return card
+        return card, val_lbl
 
     def create_events_block(self):
         frame = QFrame()
         frame.setObjectName("InfoBlock")
         frame.setMinimumHeight(200)
-        layout = QVBoxLayout(frame)
-        layout.setContentsMargins(20, 20, 20, 20)
+        self.events_layout = QVBoxLayout(frame)
+        self.events_layout.setContentsMargins(20, 20, 20, 20)
         
         header = QLabel("Важные события")
         header.setObjectName("BlockHeader")
-        layout.addWidget(header)
-        
-        events = self.controller.get_important_events()
-        for e in events:
-            lbl = QLabel(f"• {e['text']}")
+        self.events_layout.addWidget(header)
+        self.events_layout.addStretch()
+        self.event_labels = []
+        return frame
+
+    def fill_events(self, events):
+        # Подписи переиспользуются, лишние скрываются
+        while len(self.event_labels) < len(events):
+            lbl = QLabel()
             lbl.setObjectName("EventItem")
             lbl.setWordWrap(True)
-            if e['type'] == 'danger':
-                lbl.setProperty("danger", True)
-            layout.addWidget(lbl)
-            
-        layout.addStretch()
-        return frame
+            self.events_layout.insertWidget(len(self.event_labels) + 1, lbl)
+            self.event_labels.append(lbl)
+
+        for i, lbl in enumerate(self.event_labels):
+            if i >= len(events):
+                lbl.hide()
+                continue
+            e = events[i]
+            set_text(lbl, f"• {e['text']}")
+            danger = e['type'] == 'danger'
+            if bool(lbl.property("danger")) != danger:
+                lbl.setProperty("danger", danger)
+                # Стиль по свойству пересчитывается только после repolish
+                lbl.style().unpolish(lbl)
+                lbl.style().polish(lbl)
+            lbl.show()
 
     def create_log_block(self):
         frame = QFrame()
         frame.setObjectName("InfoBlock")
         frame.setMinimumHeight(200)
-        layout = QVBoxLayout(frame)
-        layout.setContentsMargins(20, 20, 20, 20)
+        self.logs_layout = QVBoxLayout(frame)
+        self.logs_layout.setContentsMargins(20, 20, 20, 20)
         
         header = QLabel("Журнал операций")
         header.setObjectName("BlockHeader")
-        layout.addWidget(header)
-        
-        logs = self.controller.get_operations_log()
-        for log in logs:
-            row = QHBoxLayout()
-            time_lbl = QLabel(log['time'])
+        self.logs_layout.addWidget(header)
+        self.logs_layout.addStretch()
+        self.log_rows = []
+        return frame
+
+    def fill_logs(self, logs):
+        while len(self.log_rows) < len(logs):
+            row_widget = QWidget()
+            row = QHBoxLayout(row_widget)
+            row.setContentsMargins(0, 0, 0, 0)
+            time_lbl = QLabel()
             time_lbl.setStyleSheet("color: #3B82F6; font-weight: bold; background: transparent;")
             time_lbl.setFixedWidth(55)
             
-            text_lbl = QLabel(log['text'])
+            text_lbl = QLabel()
             text_lbl.setObjectName("EventItem")
             text_lbl.setWordWrap(True)
             
             row.addWidget(time_lbl)
             row.addWidget(text_lbl)
-            layout.addLayout(row)
-            
-        layout.addStretch()
-        return frame
+            self.logs_layout.insertWidget(len(self.log_rows) + 1, row_widget)
+            self.log_rows.append((row_widget, time_lbl, text_lbl))
 
-    def create_pie_chart(self, active_o, new_o, done_o):
-        """Создает круговую диаграмму на основе реальных данных из базы"""
-        series = QPieSeries()
-        
-        if active_o > 0: series.append("В пути", active_o).setBrush(QColor("#3B82F6"))   
-        if new_o > 0: series.append("Новые", new_o).setBrush(QColor("#10B981"))    
-        if done_o > 0: series.append("Доставлено", done_o).setBrush(QColor("#64748B")) 
-        
-        # Защита от пустой базы:
-        if active_o == 0 and new_o == 0 and done_o == 0:
-            series.append("Нет данных", 1).setBrush(QColor("#CBD5E1"))
+        for i, (row_widget, time_lbl, text_lbl) in enumerate(self.log_rows):
+            if i >= len(logs):
+                row_widget.hide()
+                continue
+            set_text(time_lbl, logs[i]['time'])
+            set_text(text_lbl, logs[i]['text'])
+            row_widget.show()
+
+    def create_pie_chart(self):
+        """Круговая диаграмма статусов; доли задаются в fill_pie_chart"""
+        # QtCharts грузится только при первом построении графика (водителю не нужен)
+        from PyQt6.QtCharts import QChart, QChartView, QPieSeries
+        self.pie_series = QPieSeries()
+        for label, color in PIE_SLICES + [("Нет данных", "#CBD5E1")]:
+            self.pie_series.append(label, 0).setBrush(QColor(color))
 
         chart = QChart()
-        chart.addSeries(series)
+        chart.addSeries(self.pie_series)
         chart.setTitle("Статусы заказов")
         chart.setTitleFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
         chart.setAnimationOptions(QChart.AnimationOption.SeriesAnimations)
         chart.legend().setAlignment(Qt.AlignmentFlag.AlignRight)
         chart.setBackgroundRoundness(0)
         chart.setMargins(QMargins(0, 0, 0, 0))
+        self.pie_chart = chart
         
         chart_view = QChartView(chart)
         chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
@@ -201,16 +310,25 @@ class DashboardTab(QWidget):
         layout.addWidget(chart_view)
         return card
 
+    def fill_pie_chart(self, active_o, new_o, done_o):
+        # Защита от пустой базы: единственная серая доля «Нет данных»
+        values = [active_o, new_o, done_o]
+        values.append(0 if any(values) else 1)
+        markers = self.pie_chart.legend().markers(self.pie_series)
+        for pie_slice, marker, value in zip(self.pie_series.slices(), markers, values):
+            if pie_slice.value() != value:
+                pie_slice.setValue(value)
+            # Пустые доли не показываются в легенде
+            marker.setVisible(value > 0)
+
     def create_bar_chart(self):
-        """Создает гистограмму на основе РЕАЛЬНЫХ расчетов доходов по дням"""
-        bar_set = QBarSet("Доходы")
-        
-        income_data = self.controller.get_income_by_days()
-        bar_set.append(income_data)
-        bar_set.setColor(QColor("#818CF8")) 
+        """Создает гистограмму доходов с выбором периода; суммы считаются в БД"""
+        from PyQt6.QtCharts import QChart, QChartView, QBarSeries, QBarSet, QBarCategoryAxis, QValueAxis
+        self.bar_set = QBarSet("Доходы")
+        self.bar_set.setColor(QColor("#818CF8")) 
 
         series = QBarSeries()
-        series.append(bar_set)
+        series.append(self.bar_set)
 
         chart = QChart()
         chart.addSeries(series)
@@ -220,28 +338,85 @@ class DashboardTab(QWidget):
         chart.setBackgroundRoundness(0)
         chart.setMargins(QMargins(0, 0, 0, 0))
 
-        categories = ["Пн", "Вт", "Ср", "Чт", "Пт"]
-        axis_x = QBarCategoryAxis()
-        axis_x.append(categories)
-        chart.addAxis(axis_x, Qt.AlignmentFlag.AlignBottom)
-        series.attachAxis(axis_x)
+        self.bar_axis_x = QBarCategoryAxis()
+        chart.addAxis(self.bar_axis_x, Qt.AlignmentFlag.AlignBottom)
+        series.attachAxis(self.bar_axis_x)
 
-        axis_y = QValueAxis()
-        
-        max_income = max(income_data) if income_data and max(income_data) > 0 else 100
-        axis_y.setMax(max_income + (max_income * 0.2))
-        
-        chart.addAxis(axis_y, Qt.AlignmentFlag.AlignLeft)
-        series.attachAxis(axis_y)
+        self.bar_axis_y = QValueAxis()
+        chart.addAxis(self.bar_axis_y, Qt.AlignmentFlag.AlignLeft)
+        series.attachAxis(self.bar_axis_y)
         chart.legend().setVisible(False)
 
         chart_view = QChartView(chart)
         chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
         chart_view.setStyleSheet("background: transparent;")
 
+        range_cb = QComboBox()
+        range_cb.addItems([title for title, _, _ in INCOME_RANGES])
+        range_cb.setCurrentIndex(self.income_range)
+        range_cb.currentIndexChanged.connect(self.change_income_range)
+
+        top_row = QHBoxLayout()
+        top_row.addStretch()
+        top_row.addWidget(QLabel("Период:"))
+        top_row.addWidget(range_cb)
+
         card = QFrame()
         card.setObjectName("Card")
         card.setMinimumHeight(350)
         layout = QVBoxLayout(card)
+        layout.addLayout(top_row)
         layout.addWidget(chart_view)
-        return card
\ No newline at end of file
+        return card
+
+    def change_income_range(self, idx):
+        self.income_range = idx
+        TaskExecutor.instance().submit(
+            f"{self.channel}:income", self.controller.get_income, *self.income_period(idx),
+            on_result=self.fill_bar_chart
+        )
+
+    @staticmethod
+    def income_period(idx):
+        """(date_from, date_to, granularity) для варианта из INCOME_RANGES"""
+        _, months_or_days, granularity = INCOME_RANGES[idx]
+        date_to = date.today()
+        if granularity == "month":
+            # Целые месяцы: с первого числа (N-1) месяцев назад
+            first = date_to.replace(day=1)
+            for _ in range(months_or_days - 1):
+                first = (first - timedelta(days=1)).replace(day=1)
+            date_from = first
+        else:
+            date_from = date_to - timedelta(days=months_or_days - 1)
+        return date_from, date_to, granularity
+
+    def fill_bar_chart(self, income_data):
+        labels = [label for label, _ in income_data]
+        values = [v for _, v in income_data]
+
+        if labels == self.bar_axis_x.categories():
+            # Тот же период: меняются только изменившиеся столбцы
+            for i, value in enumerate(values):
+                if self.bar_set.at(i) != value:
+                    self.bar_set.replace(i, value)
+        else:
+            self.bar_set.remove(0, self.bar_set.count())
+            self.bar_set.append(values)
+            self.bar_axis_x.clear()
+            self.bar_axis_x.append(labels)
+
+        max_income = max(values) if values and max(values) > 0 else 100
+        upper = max_income + (max_income * 0.2)
+        if self.bar_axis_y.max() != upper:
+            self.bar_axis_y.setRange(0, upper)
+
+
+def set_text(label, text):
+    """Меняет текст подписи, только если он другой (без лишней перерисовки)"""
+    if label.text() != text:
+        label.setText(text)
+
+def set_style(widget, style):
+    if widget.styleSheet() != style:
+        widget.setStyleSheet(style)
@@ -3,6 +3,8 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdi
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont, QCursor
 from controllers.auth_controller import AuthController
+from services.startup_service import StartupService
+from ui.task_executor import TaskExecutor
 
 class LoginWindow(QWidget):
     def __init__(self):
@@ -10,6 +12,7 @@ class LoginWindow(QWidget):
         self.setWindowTitle("ЛогистТранс - Вход")
         self.resize(1200, 800)
         self.controller = AuthController()
+        self.db_ready = False
         
     
         self.setStyleSheet("""
@@ -88,6 +91,8 @@ class LoginWindow(QWidget):
         self.card_layout.addWidget(self.stack)
         main_layout.addWidget(self.card)
 
+        self.check_connection()
+
     def create_login_page(self):
         page = QWidget()
         layout = QVBoxLayout(page)
@@ -127,11 +132,24 @@ class LoginWindow(QWidget):
         layout.addSpacing(20)
         
         # 3. Кнопка
-        btn_login = QPushButton("Войти")
-        btn_login.setObjectName("PrimaryButton")
-        btn_login.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
-        btn_login.clicked.connect(self.auth)
-        layout.addWidget(btn_login)
+        self.btn_login = QPushButton("Войти")
+        self.btn_login.setObjectName("PrimaryButton")
+        self.btn_login.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.btn_login.clicked.connect(self.auth)
+        layout.addWidget(self.btn_login)
+
+        # Индикатор подключения к БД
+        self.db_status = QLabel()
+        self.db_status.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.db_status.setWordWrap(True)
+        layout.addWidget(self.db_status)
+
+        self.btn_retry = QPushButton("Повторить подключение")
+        self.btn_retry.setObjectName("LinkButton")
+        self.btn_retry.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.btn_retry.clicked.connect(self.check_connection)
+        self.btn_retry.hide()
+        layout.addWidget(self.btn_retry, alignment=Qt.AlignmentFlag.AlignCenter)
         
         layout.addSpacing(10)
         
@@ -185,11 +203,11 @@ class LoginWindow(QWidget):
         
         layout.addSpacing(20)
         
-        btn_register = QPushButton("Создать аккаунт")
-        btn_register.setObjectName("PrimaryButton")
-        btn_register.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
-        btn_register.clicked.connect(self.process_registration)
-        layout.addWidget(btn_register)
+        self.btn_register = QPushButton("Создать аккаунт")
+        self.btn_register.setObjectName("PrimaryButton")
+        self.btn_register.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.btn_register.clicked.connect(self.process_registration)
+        layout.addWidget(self.btn_register)
         
         btn_back = QPushButton("← Вернуться ко входу")
         btn_back.setObjectName("LinkButton")
@@ -200,7 +218,34 @@ class LoginWindow(QWidget):
         layout.addStretch()
         return page
 
+    def check_connection(self):
+        """Проверка схемы и прогрев пула в фоне; до готовности БД вход недоступен"""
+        self.set_db_state(False, "● Подключение к базе данных...", "#6B7280")
+        self.btn_retry.hide()
+        TaskExecutor.instance().submit(
+            f"login:{id(self)}", StartupService.prepare,
+            on_result=self.connection_ready, on_error=self.connection_failed
+        )
+
+    def connection_ready(self, migrated):
+        text = "● База данных обновлена и готова" if migrated else "● База данных доступна"
+        self.set_db_state(True, text, "#16A34A")
+
+    def connection_failed(self, error):
+        self.set_db_state(False, "● Нет связи с базой данных", "#DC2626")
+        self.db_status.setToolTip(str(error))
+        self.btn_retry.show()
+
+    def set_db_state(self, ready, text, color):
+        self.db_ready = ready
+        self.btn_login.setEnabled(ready)
+        self.btn_register.setEnabled(ready)
+        self.db_status.setText(text)
+        self.db_status.setStyleSheet(f"color: {color}; font-size: 12px; background: transparent;")
+
     def auth(self):
+        if not self.db_ready:
+            return
         login = self.login_input.text().strip()
         password = self.pass_input.text().strip()
         
@@ -0,0 +1,176 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView, QPushButton,
+                             QHeaderView, QComboBox, QLabel, QDateEdit, QCheckBox, QMessageBox)
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QDate, pyqtSignal
+from controllers.logs_controller import LogsController, EVENT_TYPES
+from services.log_writer import LogWriter
+from ui.task_executor import TaskExecutor
+
+HEADERS = ["Время", "Тип", "Описание"]
+
+
+class LogsTableModel(QAbstractTableModel):
+    """Журнал операций, подгружается страницами по мере прокрутки (как реестр заказов)"""
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.rows = []
+        self.params = {}
+        self.next_cursor = None
+        self.exhausted = True
+        self.loading = False
+        self.channel = f"logs-model:{id(self)}"
+
+    def set_query(self, **params):
+        self.beginResetModel()
+        self.params = params
+        self.rows = []
+        self.next_cursor = None
+        self.exhausted = False
+        self.loading = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted or self.loading:
+            return
+        self.loading = True
+        TaskExecutor.instance().submit(
+            self.channel, self.controller.get_page,
+            on_result=self.append_page, on_error=self.page_failed,
+            cursor=self.next_cursor, **self.params
+        )
+
+    def page_failed(self, error):
+        self.loading = False
+        self.load_failed.emit(str(error))
+
+    def append_page(self, result):
+        rows, self.next_cursor = result
+        self.loading = False
+        self.exhausted = self.next_cursor is None
+        if rows:
+            start = len(self.rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        r = self.rows[index.row()]
+        col = index.column()
+        if col == 0: return r.created_at.strftime("%d.%m.%Y %H:%M:%S") if r.created_at else "-"
+        if col == 1: return EVENT_TYPES.get(r.event_type, r.event_type)
+        return r.description
+
+
+class LogsTab(QWidget):
+    def __init__(self, user):
+        super().__init__()
+        self.user = user
+        self.controller = LogsController()
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(30, 30, 30, 30)
+        layout.setSpacing(15)
+
+        header = QLabel("Журнал операций")
+        header.setStyleSheet("font-size: 24px; font-weight: bold; color: #1E293B;")
+        layout.addWidget(header)
+
+        filter_layout = QHBoxLayout()
+
+        self.type_filter = QComboBox()
+        self.type_filter.addItem("Все события", None)
+        for event_type, title in EVENT_TYPES.items():
+            self.type_filter.addItem(title, event_type)
+        self.type_filter.setFixedWidth(180)
+        self.type_filter.currentIndexChanged.connect(self.load_data)
+
+        self.period_chk = QCheckBox("За период:")
+        self.period_chk.toggled.connect(self.load_data)
+        self.date_from = QDateEdit(QDate.currentDate().addDays(-7))
+        self.date_from.setCalendarPopup(True)
+        self.date_to = QDateEdit(QDate.currentDate())
+        self.date_to.setCalendarPopup(True)
+        self.date_from.dateChanged.connect(self.period_changed)
+        self.date_to.dateChanged.connect(self.period_changed)
+
+        filter_layout.addWidget(self.type_filter)
+        filter_layout.addWidget(self.period_chk)
+        filter_layout.addWidget(self.date_from)
+        filter_layout.addWidget(QLabel("—"))
+        filter_layout.addWidget(self.date_to)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+
+        # Записи этого клиента, которые не удалось записать в БД
+        self.writer_status = QLabel()
+        self.writer_status.setStyleSheet("color: #DC2626;")
+        self.writer_status.setWordWrap(True)
+        self.writer_status.hide()
+        layout.addWidget(self.writer_status)
+
+        self.model = LogsTableModel(self.controller, self)
+        self.model.load_failed.connect(self.load_failed)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setShowGrid(False)
+        self.table.verticalHeader().setDefaultSectionSize(40)
+        layout.addWidget(self.table)
+
+        btn_layout = QHBoxLayout()
+        self.btn_refresh = QPushButton("🔄 Обновить")
+        self.btn_refresh.setObjectName("SecondaryButton")
+        self.btn_refresh.clicked.connect(self.load_data)
+        btn_layout.addWidget(self.btn_refresh)
+        btn_layout.addStretch()
+        layout.addLayout(btn_layout)
+
+        self.load_data()
+
+    def period_changed(self):
+        if self.period_chk.isChecked():
+            self.load_data()
+
+    def load_data(self):
+        date_from = date_to = None
+        if self.period_chk.isChecked():
+            date_from = self.date_from.date().toPyDate()
+            date_to = self.date_to.date().toPyDate()
+        self.show_writer_status()
+        self.model.set_query(event_type=self.type_filter.currentData(), date_from=date_from, date_to=date_to)
+
+    def load_failed(self, error):
+        self.show_writer_status()
+        QMessageBox.warning(self, "Ошибка", f"Ошибка загрузки журнала: {error}")
+
+    def show_writer_status(self):
+        status = LogWriter.last_error()
+        if status:
+            error, pending = status
+            self.writer_status.setText(f"{error}. Событий в очереди на запись: {pending}")
+        self.writer_status.setVisible(status is not None)
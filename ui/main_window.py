@@ -2,24 +2,35 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
                              QPushButton, QStackedWidget, QLabel, QMessageBox, QFrame)
 from PyQt6.QtCore import QFile, QTextStream, Qt
 from config import STYLES_PATH
+from services.log_writer import LogWriter
+from services.startup_timing import StartupTiming
+from ui.change_listener import ChangeListener
+from ui.settings_tab import notifications_enabled
+import importlib
 
-from ui.dashboard_tab import DashboardTab
-from ui.orders_tab import OrdersTab
-from ui.transport_tab import TransportTab
-from ui.warehouse_tab import WarehouseTab
-from ui.clients_tab import ClientsTab
-from ui.reports_tab import ReportsTab
-from ui.settings_tab import SettingsTab
+def create_tab(module_name, class_name, *args):
+    """Модуль вкладки импортируется только при первом открытии"""
+    return getattr(importlib.import_module(module_name), class_name)(*args)
 
 class MainWindow(QMainWindow):
     def __init__(self, user):
         super().__init__()
+        StartupTiming.restart_session()
         self.user = user
+        self.tab_factories = {}  # индекс в stack -> фабрика еще не созданной вкладки
         self.setWindowTitle(f"ЛогистТранс - {self.get_role_name()} | {user.surname} {user.name}")
         self.resize(1300, 850)
         self.load_styles()
         self.init_ui()
 
+        # Изменения других клиентов приходят через LISTEN/NOTIFY
+        self.change_listener = ChangeListener(self)
+        self.change_listener.changed.connect(self.apply_changes)
+        self.change_listener.start()
+
+        # Журнал пишется и очищается по расписанию в фоне с самого входа
+        LogWriter.start()
+
     def get_role_name(self):
         roles = {'logist': 'Логист', 'driver': 'Водитель', 'director': 'Руководитель'}
         return roles.get(self.user.role, self.user.role)
@@ -63,22 +74,25 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         self.nav_buttons = []
 
+        # Вкладки создаются при первом переходе на них, до этого в stack заглушка
         tabs_config = [
-            ("📊 Главная", DashboardTab(self.user), ['all']),
-            ("📦 Заказы", OrdersTab(self.user), ['logist', 'director']),
-            ("📍 Маршруты", OrdersTab(self.user), ['driver']), 
-            ("🚛 Транспорт", TransportTab(self.user), ['logist', 'director']),
-            ("🏭 Склад", WarehouseTab(self.user), ['logist', 'director']),
-            ("👥 Клиенты", ClientsTab(self.user), ['logist']),
-            ("📑 Отчеты", ReportsTab(self.user), ['logist', 'director']),
-            ("⚙ Настройки", SettingsTab(), ['all'])
+            ("📊 Главная", lambda: create_tab("ui.dashboard_tab", "DashboardTab", self.user), ['all']),
+            ("📦 Заказы", lambda: create_tab("ui.orders_tab", "OrdersTab", self.user), ['logist', 'director']),
+            ("📍 Маршруты", lambda: create_tab("ui.orders_tab", "OrdersTab", self.user), ['driver']), 
+            ("🚛 Транспорт", lambda: create_tab("ui.transport_tab", "TransportTab", self.user), ['logist', 'director']),
+            ("🏭 Склад", lambda: create_tab("ui.warehouse_tab", "WarehouseTab", self.user), ['logist', 'director']),
+            ("👥 Клиенты", lambda: create_tab("ui.clients_tab", "ClientsTab", self.user), ['logist']),
+            ("📑 Отчеты", lambda: create_tab("ui.reports_tab", "ReportsTab", self.user), ['logist', 'director']),
+            ("📜 Журнал", lambda: create_tab("ui.logs_tab", "LogsTab", self.user), ['logist', 'director']),
+            ("⚙ Настройки", lambda: create_tab("ui.settings_tab", "SettingsTab"), ['all'])
         ]
 
-        for title, widget, allowed_roles in tabs_config:
+        for title, factory, allowed_roles in tabs_config:
             if 'all' not in allowed_roles and self.user.role not in allowed_roles:
                 continue
             
-            index = self.stack.addWidget(widget)
+            index = self.stack.addWidget(QWidget())
+            self.tab_factories[index] = factory
             btn = QPushButton(title)
             btn.setObjectName("NavButton")
             btn.setCheckable(True)
@@ -118,15 +132,45 @@ class MainWindow(QMainWindow):
             self.switch_tab(0, self.nav_buttons[0])
 
     def switch_tab(self, idx, sender_btn):
+        factory = self.tab_factories.pop(idx, None)
+        if factory:
+            # Новая вкладка загружает данные сама в конструкторе
+            placeholder = self.stack.widget(idx)
+            self.stack.insertWidget(idx, factory())
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
         self.stack.setCurrentIndex(idx)
         for b in self.nav_buttons:
             b.setChecked(False)
         sender_btn.setChecked(True)
         
         current_widget = self.stack.currentWidget()
-        if hasattr(current_widget, 'load_data'):
+        if not factory and hasattr(current_widget, 'load_data'):
             current_widget.load_data()
 
+    def apply_changes(self, table, op, ids):
+        """Раздает изменение уже созданным вкладкам"""
+        for i in range(self.stack.count()):
+            widget = self.stack.widget(i)
+            if i not in self.tab_factories and hasattr(widget, 'apply_changes'):
+                widget.apply_changes(table, op, ids)
+
+        if table == "orders" and op == "insert" and self.user.role != 'driver' and notifications_enabled():
+            numbers = ", ".join(f"#{i}" for i in ids[:5]) if ids else ""
+            self.statusBar().showMessage(f"📦 Новый заказ {numbers}".strip(), 10000)
+
+    def closeEvent(self, event):
+        self.change_listener.stop()
+        for i in range(self.stack.count()):
+            widget = self.stack.widget(i)
+            if hasattr(widget, 'stop_background'):
+                widget.stop_background()
+        super().closeEvent(event)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        StartupTiming.mark("first_paint")
+
     def logout(self):
         reply = QMessageBox.question(self, 'Выход', 'Сменить пользователя?',
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
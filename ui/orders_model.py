@@ -0,0 +1,283 @@
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
+from PyQt6.QtCore import Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QRectF, QEvent, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QPen
+from ui.task_executor import TaskExecutor
+
+HEADERS = ["ID", "Клиент", "Маршрут", "Транспорт", "Статус", "Стоимость", "Действия"]
+STATUS_COLUMN = 4
+ACTION_COLUMN = 6
+
+# Цвета бейджей совпадают с QLabel[status=...] из styles.qss
+STATUS_COLORS = {
+    "Новый": ("#DBEAFE", "#1E40AF"),
+    "В пути": ("#FEF3C7", "#92400E"),
+    "Доставлен": ("#DCFCE7", "#166534"),
+    "Отменен": ("#FEE2E2", "#991B1B"),
+}
+
+
+class OrdersTableModel(QAbstractTableModel):
+    """Модель реестра заказов. Строки подгружаются страницами через
+    OrdersController.get_page по мере прокрутки (canFetchMore/fetchMore).
+    Страницы запрашиваются в фоне, новый запрос вытесняет незавершенный.
+    Если по тексту точных совпадений нет, показываются похожие заказы
+    из OrdersController.search (нечеткий поиск, например с опечаткой)."""
+    fuzzy_matched = pyqtSignal(int)  # число похожих заказов, показанных вместо пустого результата
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.orders = []
+        self.params = {}
+        self.next_cursor = None
+        self.exhausted = True
+        self.loading = False
+        self.fuzzy = False
+        self.channel = f"orders-model:{id(self)}"
+        self.pending_ids = set()  # измененные заказы, строки которых еще не перечитаны
+        self.inserted_ids = set()  # из них - новые заказы
+
+    def set_query(self, **params):
+        """Новые фильтры/сортировка: модель очищается, первая страница грузится сразу"""
+        self.beginResetModel()
+        self.params = params
+        self.orders = []
+        self.next_cursor = None
+        self.exhausted = False
+        self.loading = False
+        self.fuzzy = False
+        # Перечитывание измененных строк шло с прежними фильтрами: его результат уже не нужен
+        self.pending_ids.clear()
+        self.inserted_ids.clear()
+        TaskExecutor.instance().cancel(f"{self.channel}:changes")
+        self.endResetModel()
+        self.fetchMore()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.orders)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted or self.loading:
+            return
+        self.loading = True
+        TaskExecutor.instance().submit(
+            self.channel, self.controller.get_page,
+            on_result=self.append_page, on_error=self.page_failed,
+            cursor=self.next_cursor, **self.params
+        )
+
+    def page_failed(self, error):
+        self.loading = False
+        self.load_failed.emit(str(error))
+
+    def append_page(self, result):
+        orders, self.next_cursor = result
+        self.loading = False
+        self.exhausted = self.next_cursor is None
+        if not orders:
+            if not self.orders and self.params.get("text"):
+                self.search_similar()
+            return
+        start = len(self.orders)
+        self.beginInsertRows(QModelIndex(), start, start + len(orders) - 1)
+        self.orders.extend(orders)
+        self.endInsertRows()
+
+    def search_similar(self):
+        self.loading = True
+        TaskExecutor.instance().submit(
+            self.channel, self.controller.search, self.params["text"],
+            status=self.params.get("status"), driver_id=self.params.get("driver_id"),
+            on_result=self.show_similar, on_error=self.page_failed
+        )
+
+    def show_similar(self, orders):
+        self.loading = False
+        self.exhausted = True
+        self.fuzzy = True
+        if orders:
+            self.beginInsertRows(QModelIndex(), 0, len(orders) - 1)
+            self.orders = list(orders)
+            self.endInsertRows()
+        self.fuzzy_matched.emit(len(orders))
+
+    def apply_changes(self, op, ids):
+        """Изменения заказов от других клиентов: удаленные строки убираются,
+        измененные и новые перечитываются с текущими фильтрами"""
+        if op == "delete":
+            self.remove_ids(set(ids))
+            return
+        if self.fuzzy:
+            return
+        self.pending_ids.update(ids)
+        if op == "insert":
+            self.inserted_ids.update(ids)
+        requested = sorted(self.pending_ids)
+        # Новый запрос вытесняет предыдущий, поэтому в него входят все ожидающие id
+        TaskExecutor.instance().submit(
+            f"{self.channel}:changes", self.controller.get_rows, requested,
+            status=self.params.get("status"), driver_id=self.params.get("driver_id"), text=self.params.get("text"),
+            on_result=lambda rows: self.merge_rows(requested, rows)
+        )
+
+    def merge_rows(self, ids, rows):
+        self.pending_ids.difference_update(ids)
+        changed = set(ids)
+        inserted = self.inserted_ids & changed
+        self.inserted_ids -= changed
+        fresh = {r.id: r for r in rows}
+        gone = set()
+        for row, o in enumerate(self.orders):
+            if o.id in fresh:
+                self.orders[row] = fresh.pop(o.id)
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(HEADERS) - 1))
+            elif o.id in changed:
+                gone.add(o.id)  # больше не проходит фильтры
+        self.remove_ids(gone)
+        # Новые заказы встают в начало только при сортировке по убыванию номера,
+        # иначе (как и измененные, но еще не загруженные) появятся при следующей загрузке
+        new_rows = sorted((r for r in fresh.values() if r.id in inserted), key=lambda r: r.id, reverse=True)
+        if new_rows and self.params.get("sort", "id") == "id" and self.params.get("descending", True):
+            self.beginInsertRows(QModelIndex(), 0, len(new_rows) - 1)
+            self.orders[0:0] = new_rows
+            self.endInsertRows()
+
+    def remove_ids(self, ids):
+        for row in reversed(range(len(self.orders))):
+            if self.orders[row].id in ids:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.orders[row]
+                self.endRemoveRows()
+
+    def order_id(self, row):
+        return self.orders[row].id
+
+    def covers(self, text, status):
+        """True, если загружен весь результат запроса, который включает в себя
+        запрос с фильтрами text/status - тогда его можно уточнить в памяти"""
+        if not self.exhausted or self.loading or self.fuzzy:
+            return False
+        loaded_text = (self.params.get("text") or "").casefold()
+        loaded_status = self.params.get("status")
+        return loaded_text in (text or "").casefold() and loaded_status in (None, status)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        o = self.orders[index.row()]
+        col = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0: return f"#{o.id}"
+            if col == 1: return o.client_name or "-"
+            if col == 2: return f"{o.route_start} → {o.route_end}" if o.route_start else "-"
+            if col == 3: return o.vehicle_model or "Не назначен"
+            if col == 4: return o.status
+            if col == 5: return f"{o.cost or 0:,.0f} ₽"
+            return None
+        if role == Qt.ItemDataRole.ForegroundRole and col == 0:
+            return QColor(Qt.GlobalColor.blue)
+        if role == Qt.ItemDataRole.UserRole:
+            return o.id
+        return None
+
+
+class OrdersFilterProxy(QSortFilterProxyModel):
+    """Фильтр поверх OrdersTableModel: статус и текст применяются к уже
+    загруженным строкам мгновенно, без запроса к БД. Текст ищется как подстрока
+    в той же строке, что и search_doc в OrdersController.get_page: номер, клиент,
+    груз и маршрут через пробел, поэтому запрос может захватывать соседние поля.
+    Для результатов нечеткого поиска текстовый фильтр не применяется."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text = ""
+        self.status = None
+
+    def set_filters(self, text, status):
+        self.text = (text or "").casefold()
+        self.status = status
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        o = self.sourceModel().orders[source_row]
+        if self.status and o.status != self.status:
+            return False
+        if self.text and not self.sourceModel().fuzzy:
+            # Как concat_ws(' ', ...) в миграции 3: пустые поля пропускаются
+            fields = (str(o.id), o.client_name, o.description, o.route_start, o.route_end)
+            return self.text in " ".join(value for value in fields if value).casefold()
+        return True
+
+
+class StatusBadgeDelegate(QStyledItemDelegate):
+    """Рисует бейдж статуса вместо отдельного QLabel в каждой ячейке"""
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, QColor("#EFF6FF"))
+
+        text = index.data() or ""
+        bg, fg = STATUS_COLORS.get(text, STATUS_COLORS["Новый"])
+        rect = QRectF(option.rect.adjusted(10, 6, -10, -6))
+
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(bg))
+        painter.drawRoundedRect(rect, 8, 8)
+
+        font = QFont(option.font)
+        font.setBold(True)
+        font.setPixelSize(12)
+        painter.setFont(font)
+        painter.setPen(QColor(fg))
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+        painter.restore()
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """Рисует кнопку «Действия» и сообщает о клике по ней сигналом clicked(row)"""
+    clicked = pyqtSignal(int)
+
+    def button_rect(self, option):
+        return QRectF(option.rect.adjusted(4, 4, -4, -4))
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, QColor("#EFF6FF"))
+
+        rect = self.button_rect(option)
+        hover = bool(option.state & QStyle.StateFlag.State_MouseOver)
+
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor("#94A3B8" if hover else "#CBD5E1")))
+        painter.setBrush(QColor("#F8FAFC" if hover else "white"))
+        painter.drawRoundedRect(rect, 6, 6)
+
+        font = QFont(option.font)
+        font.setWeight(QFont.Weight.DemiBold)
+        painter.setFont(font)
+        painter.setPen(QColor("#475569"))
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "Действия")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton:
+            if self.button_rect(option).contains(event.position()):
+                self.clicked.emit(index.row())
+                return True
+        return super().editorEvent(event, model, option, index)
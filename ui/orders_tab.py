@@ -1,15 +1,61 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, 
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView, 
                              QPushButton, QHeaderView, QLineEdit, QComboBox, QDialog, QFormLayout, 
-                             QDoubleSpinBox, QMessageBox, QLabel, QFrame, QMenu)
-from PyQt6.QtCore import Qt
+                             QDoubleSpinBox, QMessageBox, QLabel, QFrame, QMenu, QCheckBox, QProgressDialog)
+from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
+from config import BATCH_DOCS_LIMIT, BATCH_DOCS_PDF_LIMIT
 from controllers.orders_controller import OrdersController
+from database.connection import unit_of_work
+from services.local_cache import ReferenceCache
+from ui.task_executor import TaskExecutor
+from ui.orders_model import OrdersTableModel, OrdersFilterProxy, StatusBadgeDelegate, ActionButtonDelegate, STATUS_COLUMN, ACTION_COLUMN
 import os
+import threading
+
+# Колонка таблицы -> ключ сортировки в OrdersController.get_page
+SORTABLE_COLUMNS = {0: "id", 1: "client", 4: "status", 5: "cost"}
+
+
+class BatchDocsThread(QThread):
+    """Пакет документов (services/batch_docs.py). Документы рисует пул процессов,
+    поток лишь ждет его и передает прогресс в GUI-поток"""
+    progress = pyqtSignal(int, int)      # (готово, всего)
+    result = pyqtSignal(object, object)  # (путь к файлу, исключение); при отмене оба None
+
+    def __init__(self, order_ids, filters, doc_types, merged, parent=None):
+        super().__init__(parent)
+        self.order_ids = order_ids
+        self.filters = filters
+        self.doc_types = doc_types
+        self.merged = merged
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        from services.batch_docs import generate_batch, BatchCancelled
+        try:
+            limit = BATCH_DOCS_PDF_LIMIT if self.merged else BATCH_DOCS_LIMIT
+            ids = self.order_ids or OrdersController().get_ids(limit=limit, **self.filters)
+            if not ids:
+                raise ValueError("Нет заказов по текущему фильтру")
+            path = generate_batch(ids, self.doc_types, merged=self.merged,
+                                  progress=self.progress.emit, cancel=self.cancel_event)
+        except BatchCancelled:
+            self.result.emit(None, None)
+        except Exception as e:
+            self.result.emit(None, e)
+        else:
+            self.result.emit(path, None)
+
 
 class OrdersTab(QWidget):
     def __init__(self, user):
         super().__init__()
         self.user = user
         self.controller = OrdersController()
+        self.sort_key = "id"
+        self.sort_desc = True
         self.init_ui()
 
     def init_ui(self):
@@ -26,28 +72,54 @@ class OrdersTab(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("🔍 Номер заказа, клиент, пункт...")
         self.search_input.setFixedWidth(300)
-        self.search_input.textChanged.connect(self.load_data)
+        # Запрос уходит, когда пользователь перестал печатать
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
 
         self.status_filter = QComboBox()
         self.status_filter.addItems(["Все статусы", "Новый", "В пути", "Доставлен", "Отменен"])
         self.status_filter.setFixedWidth(150)
-        self.status_filter.currentTextChanged.connect(self.load_data)
+        self.status_filter.currentTextChanged.connect(self.apply_filters)
 
         filter_layout.addWidget(self.search_input)
         filter_layout.addWidget(self.status_filter)
+
+        self.lbl_search_hint = QLabel()
+        self.lbl_search_hint.setStyleSheet("color: #64748B;")
+        self.lbl_search_hint.hide()
+        filter_layout.addWidget(self.lbl_search_hint)
         filter_layout.addStretch()
         
         layout.addLayout(filter_layout)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(["ID", "Клиент", "Маршрут", "Транспорт", "Статус", "Стоимость", "Действия"])
+        # Модель держит только загруженные страницы, представление рисует
+        # лишь видимые строки, а бейджи и кнопки - делегаты без виджетов
+        self.model = OrdersTableModel(self.controller, self)
+        self.proxy = OrdersFilterProxy(self)
+        self.proxy.setSourceModel(self.model)
+        self.model.fuzzy_matched.connect(self.show_search_hint)
+        self.model.load_failed.connect(lambda error: QMessageBox.warning(self, "Ошибка", f"Ошибка загрузки заказов: {error}"))
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.table.verticalHeader().setVisible(False)
         self.table.setShowGrid(False)
+        self.table.setMouseTracking(True)
         self.table.verticalHeader().setDefaultSectionSize(45) 
+        self.table.horizontalHeader().setSortIndicatorShown(True)
+        self.table.horizontalHeader().setSortIndicator(0, Qt.SortOrder.DescendingOrder)
+        self.table.horizontalHeader().sectionClicked.connect(self.change_sort)
+
+        self.status_delegate = StatusBadgeDelegate(self.table)
+        self.action_delegate = ActionButtonDelegate(self.table)
+        self.action_delegate.clicked.connect(lambda row: self.show_context_menu(row, self.order_id_at(row)))
+        self.table.setItemDelegateForColumn(STATUS_COLUMN, self.status_delegate)
+        self.table.setItemDelegateForColumn(ACTION_COLUMN, self.action_delegate)
         layout.addWidget(self.table)
 
         btn_layout = QHBoxLayout()
@@ -60,8 +132,14 @@ class OrdersTab(QWidget):
         self.btn_refresh.setObjectName("SecondaryButton")
         self.btn_refresh.clicked.connect(self.load_data)
 
+        self.btn_batch = QPushButton("📄 Пакет документов")
+        self.btn_batch.setObjectName("SecondaryButton")
+        self.btn_batch.clicked.connect(self.open_batch_dialog)
+        self.batch_thread = None
+
         btn_layout.addWidget(self.btn_add)
         btn_layout.addWidget(self.btn_refresh)
+        btn_layout.addWidget(self.btn_batch)
         btn_layout.addStretch()
 
         layout.addLayout(btn_layout)
@@ -74,71 +152,67 @@ class OrdersTab(QWidget):
         self.setLayout(layout)
         self.load_data()
 
-    def create_status_badge(self, text):
-        lbl = QLabel(text)
-        lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        lbl.setObjectName("StatusBadge")
-        
-        status_map = {
-            "Новый": "New",
-            "В пути": "Work",
-            "Доставлен": "Done",
-            "Отменен": "Error"
-        }
-        lbl.setProperty("status", status_map.get(text, "New")) 
-        
-        widget = QWidget()
-        l = QHBoxLayout(widget)
-        l.setContentsMargins(10, 2, 10, 2)
-        l.addWidget(lbl)
-        return widget
+    def current_filters(self):
+        search_txt = self.search_input.text().strip()
+        status_flt = self.status_filter.currentText()
+        return search_txt or None, status_flt if status_flt != "Все статусы" else None
+
+    def apply_changes(self, table, op, ids):
+        """Изменения заказов от других клиентов применяются к загруженным строкам"""
+        if table != "orders":
+            return
+        if ids is None:
+            self.load_data()
+        else:
+            self.model.apply_changes(op, ids)
 
     def load_data(self):
-        orders = self.controller.get_all()
-        search_txt = self.search_input.text().lower()
-        status_flt = self.status_filter.currentText()
-        
-        filtered = []
-        for o in orders:
-            if self.user.role == 'driver':
-                if not o.vehicle or o.vehicle.driver_id != self.user.id:
-                    continue
-            
-            full_text = f"{o.id} {o.client.name if o.client else ''} {o.description}".lower()
-            if search_txt and search_txt not in full_text:
-                continue
+        """Сбрасывает модель и загружает первую страницу с текущими фильтрами"""
+        self.search_timer.stop()
+        text, status = self.current_filters()
+        self.lbl_search_hint.hide()
+        self.proxy.set_filters(text, status)
+        self.model.set_query(
+            status=status,
+            driver_id=self.user.id if self.user.role == 'driver' else None,
+            text=text,
+            sort=self.sort_key,
+            descending=self.sort_desc
+        )
 
-            if status_flt != "Все статусы" and o.status != status_flt:
-                continue
-                
-            filtered.append(o)
+    def apply_filters(self):
+        """Фильтр сразу применяется к загруженным строкам. Если загружен полный
+        результат более широкого запроса (например, текст только дополнили),
+        этого достаточно, иначе данные перезапрашиваются"""
+        self.search_timer.stop()
+        text, status = self.current_filters()
+        if self.model.covers(text, status):
+            self.proxy.set_filters(text, status)
+        else:
+            self.load_data()
 
-        self.table.setRowCount(len(filtered))
-        for i, o in enumerate(filtered):
-            id_item = QTableWidgetItem(f"#{o.id}")
-            id_item.setForeground(Qt.GlobalColor.blue)
-            self.table.setItem(i, 0, id_item)
-            
-            self.table.setItem(i, 1, QTableWidgetItem(o.client.name if o.client else "-"))
-            route = f"{o.route_start} → {o.route_end}" if o.route_start else "-"
-            self.table.setItem(i, 2, QTableWidgetItem(route))
-            
-            veh = f"{o.vehicle.model}" if o.vehicle else "Не назначен"
-            self.table.setItem(i, 3, QTableWidgetItem(veh))
-            
-            self.table.setCellWidget(i, 4, self.create_status_badge(o.status))
-            
-            self.table.setItem(i, 5, QTableWidgetItem(f"{o.cost or 0:,.0f} ₽"))
-            
-            btn_action = QPushButton("Действия")
-            btn_action.setObjectName("SecondaryButton")
-            btn_action.clicked.connect(lambda _, row=i, oid=o.id: self.show_context_menu(row, oid))
-            
-            w = QWidget()
-            l = QHBoxLayout(w)
-            l.setContentsMargins(0,0,0,0)
-            l.addWidget(btn_action)
-            self.table.setCellWidget(i, 6, w)
+    def show_search_hint(self, count):
+        self.lbl_search_hint.setText(
+            f"Точных совпадений нет, показаны похожие заказы: {count}" if count else "Ничего не найдено"
+        )
+        self.lbl_search_hint.show()
+
+    def order_id_at(self, row):
+        return self.model.order_id(self.proxy.mapToSource(self.proxy.index(row, 0)).row())
+
+    def change_sort(self, column):
+        if column not in SORTABLE_COLUMNS:
+            # Индикатор остается на текущей колонке сортировки
+            current = next(c for c, k in SORTABLE_COLUMNS.items() if k == self.sort_key)
+            order = Qt.SortOrder.DescendingOrder if self.sort_desc else Qt.SortOrder.AscendingOrder
+            self.table.horizontalHeader().setSortIndicator(current, order)
+            return
+        key = SORTABLE_COLUMNS[column]
+        self.sort_desc = not self.sort_desc if key == self.sort_key else True
+        self.sort_key = key
+        order = Qt.SortOrder.DescendingOrder if self.sort_desc else Qt.SortOrder.AscendingOrder
+        self.table.horizontalHeader().setSortIndicator(column, order)
+        self.load_data()
 
     def show_context_menu(self, row, order_id):
         menu = QMenu()
@@ -163,7 +237,7 @@ class OrdersTab(QWidget):
             self.delete_order(order_id)
 
     def generate_doc(self, order_id, doc_type):
-        order = next((o for o in self.controller.get_all() if o.id == order_id), None)
+        order = self.controller.get_by_id(order_id)
         if not order: return
         
         filename = f"{doc_type}_{order.id}.pdf"
@@ -181,21 +255,112 @@ class OrdersTab(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка: {str(e)}")
 
+    def open_batch_dialog(self):
+        """Документы по выделенным заказам, а если ничего не выделено - по всем заказам фильтра"""
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+        order_ids = [self.order_id_at(row) for row in rows]
+        text, status = self.current_filters()
+        filters = {"status": status, "text": text,
+                   "driver_id": self.user.id if self.user.role == 'driver' else None}
+
+        d = QDialog(self)
+        d.setWindowTitle("Пакет документов")
+        d.setMinimumWidth(400)
+        layout = QFormLayout(d)
+
+        scope = f"выделено в реестре: {len(order_ids)}" if order_ids else \
+            f"все по текущему фильтру (не более {BATCH_DOCS_LIMIT}, в один PDF - {BATCH_DOCS_PDF_LIMIT})"
+        layout.addRow("Заказы:", QLabel(scope))
+
+        from services.batch_docs import DOC_TYPES
+        checks = {}
+        for doc_type, (title, _) in DOC_TYPES.items():
+            checks[doc_type] = QCheckBox(title)
+            checks[doc_type].setChecked(True)
+            layout.addRow(checks[doc_type])
+
+        cmb_format = QComboBox()
+        cmb_format.addItem("ZIP-архив, файл на каждый документ", False)
+        cmb_format.addItem("Один PDF для печати", True)
+        layout.addRow("Формат:", cmb_format)
+
+        btn_start = QPushButton("Сформировать")
+        btn_start.setObjectName("PrimaryButton")
+        btn_start.clicked.connect(d.accept)
+        layout.addRow(btn_start)
+
+        if d.exec() != QDialog.DialogCode.Accepted:
+            return
+        doc_types = [t for t, chk in checks.items() if chk.isChecked()]
+        if not doc_types:
+            QMessageBox.warning(self, "Пакет документов", "Не выбран ни один тип документов")
+            return
+        if cmb_format.currentData() and len(order_ids) > BATCH_DOCS_PDF_LIMIT:
+            QMessageBox.warning(self, "Пакет документов",
+                                f"В один PDF - не более {BATCH_DOCS_PDF_LIMIT} заказов. Выберите ZIP-архив")
+            return
+        self.start_batch(order_ids, filters, doc_types, cmb_format.currentData())
+
+    def start_batch(self, order_ids, filters, doc_types, merged):
+        self.btn_batch.setEnabled(False)
+        progress = QProgressDialog("Формирование документов...", "Отмена", 0, 0, self)
+        progress.setWindowTitle("Пакет документов")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setAutoClose(False)
+
+        thread = BatchDocsThread(order_ids, filters, doc_types, merged, self)
+        progress.canceled.connect(thread.cancel)
+        thread.progress.connect(lambda done, total: (progress.setMaximum(total), progress.setValue(done)))
+        thread.result.connect(lambda path, error: self.batch_finished(progress, path, error))
+        thread.finished.connect(thread.deleteLater)
+        self.batch_thread = thread
+        thread.start()
+
+    def batch_finished(self, progress, path, error):
+        progress.close()
+        self.batch_thread = None
+        self.btn_batch.setEnabled(True)
+        if error:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка: {str(error)}")
+        elif path:
+            QMessageBox.information(self, "Готово", f"Документы сохранены:\n{path}")
+
+    def stop_background(self):
+        """Вызывается при закрытии окна: пакет документов прерывается"""
+        if self.batch_thread is not None:
+            self.batch_thread.cancel()
+            self.batch_thread.wait()
+
     def open_add_dialog(self):
         self.open_edit_dialog(None)
 
     def open_edit_dialog(self, order_id=None):
+        # Заказ и справочники читаются в фоне, карточка открывается по готовности
+        TaskExecutor.instance().submit(
+            f"order-card:{id(self)}", self.load_card, order_id,
+            on_result=lambda data: self.show_edit_dialog(order_id, *data),
+            on_error=lambda e: QMessageBox.critical(self, "Ошибка", f"Не удалось открыть заказ: {e}")
+        )
+
+    def load_card(self, order_id):
+        """Выполняется в фоне: (заказ или None, зоны, клиенты, машины)"""
+        # Заказ и отметки изменений справочников читаются в одной сессии и транзакции.
+        # Справочники берутся из локального кэша: если таблица не менялась, с сервера
+        # читается только ее отметка
+        references = ReferenceCache(self.user.role)
+        with unit_of_work():
+            order = self.controller.get_by_id(order_id) if order_id else None
+            return (order, references.sync("warehouse_zones"),
+                    references.sync("clients"), references.sync("vehicles"))
+
+    def show_edit_dialog(self, order_id, order, zones, clients, vehicles):
         d = QDialog(self)
         d.setWindowTitle("Карточка заказа")
         d.setMinimumWidth(450)
         layout = QFormLayout(d)
-        
-        order = None
-        if order_id:
-            order = next((o for o in self.controller.get_all() if o.id == order_id), None)
 
         cmb_zone = QComboBox()
-        zones = self.controller.get_warehouse_zones()
         
         if not order:
             for z in zones:
@@ -226,7 +391,7 @@ class OrdersTab(QWidget):
         lbl_dist = QLabel(f"{order.distance} км" if order else "Авторасчет")
         
         cmb_client = QComboBox()
-        for c in self.controller.get_clients():
+        for c in clients:
             cmb_client.addItem(c.name, c.id)
         if order and order.client_id:
             idx = cmb_client.findData(order.client_id)
@@ -238,7 +403,7 @@ class OrdersTab(QWidget):
 
         cmb_vehicle = QComboBox()
         cmb_vehicle.addItem("Автоподбор", -1)
-        for v in self.controller.get_vehicles():
+        for v in vehicles:
             cmb_vehicle.addItem(f"{v.plate_number} ({v.model})", v.id)
         if order and order.vehicle_id:
             idx = cmb_vehicle.findData(order.vehicle_id)
@@ -303,7 +468,7 @@ class OrdersTab(QWidget):
         self.load_data()
 
     def delete_order(self, order_id):
-        order = next((o for o in self.controller.get_all() if o.id == order_id), None)
+        order = self.controller.get_by_id(order_id)
         if not order: 
             return
         if order.status in ["В пути", "Новый"]:
@@ -314,5 +479,7 @@ class OrdersTab(QWidget):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
                                      
         if reply == QMessageBox.StandardButton.Yes:
-            self.controller.delete(order_id)
+            success, msg = self.controller.delete(order_id)
+            if not success:
+                QMessageBox.warning(self, "Ошибка", msg)
             self.load_data()
\ No newline at end of file
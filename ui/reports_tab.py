@@ -1,20 +1,38 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QMessageBox, QFileDialog, 
                              QLabel, QGridLayout, QDateEdit, QFrame, QDialog, QHBoxLayout,
-                             QTableWidget, QTableWidgetItem, QHeaderView)
+                             QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox)
 from PyQt6.QtCore import QDate, Qt
 from PyQt6.QtGui import QFont
-from controllers.orders_controller import OrdersController
-from controllers.transport_controller import TransportController
-from services.pdf_service import PDFService
+from controllers.reports_controller import ReportsController
+from ui.task_executor import TaskExecutor
+from services.export_service import export_report, REPORT_COLUMNS, DATE, NUMBER
 import os
-import csv  # ИМПОРТ ДЛЯ EXCEL
+
+def preview_text(value, kind):
+    """Значение колонки отчета (services/export_service.py) для ячейки предпросмотра"""
+    if value is None:
+        return "-"
+    if kind == DATE:
+        return value.strftime('%d.%m.%Y')
+    if kind == NUMBER:
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return str(value)
+
 
 class PreviewDialog(QDialog):
-    def __init__(self, parent, r_type, title, data):
+    """Предпросмотр: первые строки отчета и итоги из SQL. Если в предпросмотр
+    попали все строки, PDF и выгрузка берут их же, иначе читают период потоком"""
+
+    def __init__(self, parent, r_type, title, data, summary, period):
         super().__init__(parent)
         self.r_type = r_type
         self.title = title
         self.data = data
+        self.summary = summary
+        self.period = period  # (с, по, включая архив)
+        # Отчет по транспорту приходит целиком, заказы - первые REPORT_PREVIEW_ROWS строк
+        self.complete = summary is None or summary["count"] <= len(data)
+        self.channel = f"report-pdf:{id(self)}"
         
         self.setWindowTitle("Предпросмотр отчета")
         self.resize(1000, 600)
@@ -27,6 +45,12 @@ class PreviewDialog(QDialog):
         lbl_title = QLabel(f"📄 Предпросмотр: {self.title}")
         lbl_title.setStyleSheet("font-size: 20px; font-weight: bold; color: #1E293B; margin-bottom: 10px;")
         layout.addWidget(lbl_title)
+
+        if self.summary and self.summary["count"] > len(self.data):
+            lbl_partial = QLabel(f"Показаны первые {len(self.data)} из {self.summary['count']} строк. "
+                                 f"В PDF и выгрузку попадут все строки.")
+            lbl_partial.setStyleSheet("color: #64748B;")
+            layout.addWidget(lbl_partial)
         
         self.table = QTableWidget()
         self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
@@ -37,109 +61,109 @@ class PreviewDialog(QDialog):
         
         self.fill_table()
         
-        # Кнопки (с CSV экспортом)
+        # Кнопки (с выгрузкой в Excel)
         btn_layout = QHBoxLayout()
         btn_cancel = QPushButton("Отмена")
         btn_cancel.setObjectName("SecondaryButton")
         btn_cancel.clicked.connect(self.reject)
         
-        btn_csv = QPushButton("💾 Выгрузить в Excel (CSV)")
-        btn_csv.setObjectName("SecondaryButton")
-        btn_csv.clicked.connect(self.export_csv)
+        self.btn_export = QPushButton("💾 Выгрузить в Excel")
+        self.btn_export.setObjectName("SecondaryButton")
+        self.btn_export.clicked.connect(self.export_file)
         
-        btn_print = QPushButton("🖨 Сохранить и Печать (PDF)")
-        btn_print.setObjectName("PrimaryButton")
-        btn_print.setFixedWidth(250)
-        btn_print.clicked.connect(self.generate_pdf)
+        self.btn_print = QPushButton("🖨 Сохранить и Печать (PDF)")
+        self.btn_print.setObjectName("PrimaryButton")
+        self.btn_print.setFixedWidth(250)
+        self.btn_print.clicked.connect(self.generate_pdf)
         
         btn_layout.addStretch()
         btn_layout.addWidget(btn_cancel)
-        btn_layout.addWidget(btn_csv)
-        btn_layout.addWidget(btn_print)
+        btn_layout.addWidget(self.btn_export)
+        btn_layout.addWidget(self.btn_print)
         layout.addLayout(btn_layout)
 
     def fill_table(self):
-        if self.r_type == 'income':
-            self.table.setColumnCount(5)
-            self.table.setHorizontalHeaderLabels(["Номер", "Дата", "Клиент", "Маршрут", "Стоимость"])
-            self.table.setRowCount(len(self.data))
-            total = 0
-            
-            for i, o in enumerate(self.data):
-                self.table.setItem(i, 0, QTableWidgetItem(f"А{o.id:05d}"))
-                date_val = o.created_at.strftime('%d.%m.%Y') if o.created_at else "-"
-                self.table.setItem(i, 1, QTableWidgetItem(date_val))
-                self.table.setItem(i, 2, QTableWidgetItem(o.client.name if o.client else "-"))
-                self.table.setItem(i, 3, QTableWidgetItem(f"{o.route_start}-{o.route_end}"))
-                cost = o.cost or 0
-                self.table.setItem(i, 4, QTableWidgetItem(f"{int(cost)}"))
-                total += cost
-            
+        # Те же колонки, что и в выгрузке
+        columns = REPORT_COLUMNS[self.r_type]
+        self.table.setColumnCount(len(columns))
+        self.table.setHorizontalHeaderLabels([title for title, _, _, _ in columns])
+        self.table.setRowCount(len(self.data))
+        for i, o in enumerate(self.data):
+            for col, (_, getter, kind, _) in enumerate(columns):
+                self.table.setItem(i, col, QTableWidgetItem(preview_text(getter(o), kind)))
+
+        if self.r_type in ('income', 'delivered'):
+            # Итог по всему периоду посчитан в SQL, а не по показанным строкам
+            if self.r_type == 'income':
+                text, col = f"ИТОГО: {int(self.summary['cost'])} руб.", 4
+            else:
+                text, col = f"ИТОГО: {self.summary['count']} заказов, {self.summary['weight']} кг", 2
             row = self.table.rowCount()
             self.table.insertRow(row)
-            item_total = QTableWidgetItem(f"ИТОГО: {int(total)} руб.")
+            item_total = QTableWidgetItem(text)
             item_total.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
-            self.table.setItem(row, 4, item_total)
-
-        elif self.r_type == 'delivered':
-            self.table.setColumnCount(5)
-            self.table.setHorizontalHeaderLabels(["Номер", "Тип груза", "Вес (кг)", "Объем (м3)", "Статус"])
-            self.table.setRowCount(len(self.data))
-            for i, o in enumerate(self.data):
-                self.table.setItem(i, 0, QTableWidgetItem(f"А{o.id:05d}"))
-                self.table.setItem(i, 1, QTableWidgetItem(o.description or "-"))
-                self.table.setItem(i, 2, QTableWidgetItem(f"{o.weight or 0}"))
-                self.table.setItem(i, 3, QTableWidgetItem(f"{o.volume or 0}"))
-                self.table.setItem(i, 4, QTableWidgetItem(o.status))
-
-        elif self.r_type == 'transport':
-            self.table.setColumnCount(6)
-            self.table.setHorizontalHeaderLabels(["Номер машины", "Водитель", "Состояние", "Рейсов", "Пробег (км)", "Загрузка"])
-            self.table.setRowCount(len(self.data))
-            for i, v in enumerate(self.data):
-                self.table.setItem(i, 0, QTableWidgetItem(v.plate_number))
-                d_name = "Нет"
-                if v.driver:
-                    d_name = f"{v.driver.surname} {v.driver.name[0]}." if v.driver.name else v.driver.surname
-                self.table.setItem(i, 1, QTableWidgetItem(d_name))
-                self.table.setItem(i, 2, QTableWidgetItem(v.status))
-                real_trips = len(v.orders) if hasattr(v, 'orders') else 0
-                self.table.setItem(i, 3, QTableWidgetItem(str(real_trips)))
-                self.table.setItem(i, 4, QTableWidgetItem(f"{real_trips * 600}"))
-                self.table.setItem(i, 5, QTableWidgetItem("100%" if v.status != "Свободен" else "0%"))
-
-    def export_csv(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Сохранить Excel", f"report_{self.r_type}.csv", "CSV Files (*.csv)")
+            self.table.setItem(row, col, item_total)
+
+    def export_file(self):
+        file_path, selected = QFileDialog.getSaveFileName(
+            self, "Сохранить Excel", f"report_{self.r_type}.xlsx", "Excel (*.xlsx);;CSV (*.csv)")
         if not file_path: return
-        
-        try:
-            with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f, delimiter=';')
-                headers = [self.table.horizontalHeaderItem(i).text() for i in range(self.table.columnCount())]
-                writer.writerow(headers)
-                
-                for row in range(self.table.rowCount()):
-                    row_data = [self.table.item(row, col).text() if self.table.item(row, col) else "" for col in range(self.table.columnCount())]
-                    writer.writerow(row_data)
-                    
-            QMessageBox.information(self, "Успех", "Отчет успешно сохранен в формате Excel (CSV)!")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка экспорта: {str(e)}")
+        fmt = "csv" if file_path.lower().endswith(".csv") or selected.startswith("CSV") else "xlsx"
+        # Строки идут из БД прямо в файл (services/export_service.py), в фоне
+        self.btn_export.setEnabled(False)
+        self.btn_print.setEnabled(False)
+        self.btn_export.setText("⏳ Выгрузка...")
+        TaskExecutor.instance().submit(
+            self.channel, export_report, self.r_type, fmt, file_path, *self.period,
+            rows=self.data if self.complete else None, on_result=self.export_ready, on_error=self.export_failed
+        )
+
+    def export_ready(self, count):
+        self.reset_buttons()
+        QMessageBox.information(self, "Успех", f"Отчет успешно выгружен, строк: {count}")
+
+    def export_failed(self, error):
+        self.reset_buttons()
+        QMessageBox.critical(self, "Ошибка", f"Ошибка экспорта: {str(error)}")
+
+    def reset_buttons(self):
+        self.btn_export.setEnabled(True)
+        self.btn_print.setEnabled(True)
+        self.btn_export.setText("💾 Выгрузить в Excel")
+        self.btn_print.setText("🖨 Сохранить и Печать (PDF)")
 
     def generate_pdf(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Сохранить PDF", f"report_{self.r_type}.pdf", "PDF (*.pdf)")
         if not file_path: return
+        # Отчет за большой период строится секунды: в фоне, окно не замирает
+        self.btn_print.setEnabled(False)
+        self.btn_export.setEnabled(False)
+        self.btn_print.setText("⏳ Формирование PDF...")
+        TaskExecutor.instance().submit(
+            self.channel, self.write_pdf, file_path,
+            on_result=self.pdf_ready, on_error=self.pdf_failed
+        )
+
+    def write_pdf(self, file_path):
+        from services.pdf_service import PDFService
+        pdf = PDFService()
+        rows = iter(self.data) if self.complete else ReportsController().iter_rows(self.r_type, *self.period)
+        if self.r_type == 'income': pdf.generate_income_report(rows, file_path)
+        elif self.r_type == 'delivered': pdf.generate_delivered_report(rows, file_path)
+        elif self.r_type == 'transport': pdf.generate_transport_load_report(list(rows), file_path)
+        return file_path
+
+    def pdf_ready(self, file_path):
+        QMessageBox.information(self, "Готово", "Отчет сохранен (PDF)!")
         try:
-            pdf = PDFService()
-            if self.r_type == 'income': pdf.generate_income_report(self.data, file_path)
-            elif self.r_type == 'delivered': pdf.generate_delivered_report(self.data, file_path)
-            elif self.r_type == 'transport': pdf.generate_transport_load_report(self.data, file_path)
-            
-            QMessageBox.information(self, "Готово", "Отчет сохранен (PDF)!")
-            os.startfile(file_path) 
-            self.accept()
+            os.startfile(file_path)
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка генерации PDF: {str(e)}")
+            QMessageBox.warning(self, "Ошибка", f"Не удалось открыть PDF: {e}")
+        self.accept()
+
+    def pdf_failed(self, error):
+        self.reset_buttons()
+        QMessageBox.critical(self, "Ошибка", f"Ошибка генерации PDF: {str(error)}")
 
 class ReportsTab(QWidget):
     def __init__(self, user):
@@ -172,30 +196,33 @@ class ReportsTab(QWidget):
         date_layout.addWidget(self.date_from, 0, 1)
         date_layout.addWidget(QLabel("по:"), 0, 2)
         date_layout.addWidget(self.date_to, 0, 3)
+        # Закрытые заказы старше срока хранения лежат в архиве (database/archive.py)
+        self.archive_chk = QCheckBox("Включая архивные заказы")
+        date_layout.addWidget(self.archive_chk, 0, 4)
         layout.addLayout(date_layout)
         layout.addSpacing(20)
 
         grid = QGridLayout()
         grid.setSpacing(15)
 
-        btn_income = QPushButton("📊 Доходы (Приложение А)")
-        btn_income.setObjectName("PrimaryButton")
-        btn_income.setFixedHeight(45)
-        btn_income.clicked.connect(lambda: self.show_preview('income', "Доходы за период"))
+        self.btn_income = QPushButton("📊 Доходы (Приложение А)")
+        self.btn_income.setObjectName("PrimaryButton")
+        self.btn_income.setFixedHeight(45)
+        self.btn_income.clicked.connect(lambda: self.show_preview('income', "Доходы за период"))
         
-        btn_delivered = QPushButton("📦 Доставленные (Приложение B)")
-        btn_delivered.setObjectName("PrimaryButton")
-        btn_delivered.setFixedHeight(45)
-        btn_delivered.clicked.connect(lambda: self.show_preview('delivered', "Доставленные грузы"))
+        self.btn_delivered = QPushButton("📦 Доставленные (Приложение B)")
+        self.btn_delivered.setObjectName("PrimaryButton")
+        self.btn_delivered.setFixedHeight(45)
+        self.btn_delivered.clicked.connect(lambda: self.show_preview('delivered', "Доставленные грузы"))
         
-        btn_trans = QPushButton("🚛 Транспорт (Приложение C)")
-        btn_trans.setObjectName("PrimaryButton")
-        btn_trans.setFixedHeight(45)
-        btn_trans.clicked.connect(lambda: self.show_preview('transport', "Загрузка транспорта"))
-
-        grid.addWidget(btn_income, 0, 0)
-        grid.addWidget(btn_delivered, 0, 1)
-        grid.addWidget(btn_trans, 0, 2)
+        self.btn_trans = QPushButton("🚛 Транспорт (Приложение C)")
+        self.btn_trans.setObjectName("PrimaryButton")
+        self.btn_trans.setFixedHeight(45)
+        self.btn_trans.clicked.connect(lambda: self.show_preview('transport', "Загрузка транспорта"))
+
+        grid.addWidget(self.btn_income, 0, 0)
+        grid.addWidget(self.btn_delivered, 0, 1)
+        grid.addWidget(self.btn_trans, 0, 2)
         layout.addLayout(grid)
         layout.addSpacing(30)
         
@@ -213,13 +240,27 @@ class ReportsTab(QWidget):
     def show_preview(self, r_type, title):
         start_date = self.date_from.date().toPyDate()
         end_date = self.date_to.date().toPyDate()
-        data = []
-        if r_type == 'income':
-            data = [o for o in OrdersController().get_all() if o.created_at and start_date <= o.created_at.date() <= end_date]
-        elif r_type == 'delivered':
-            data = [o for o in OrdersController().get_all() if o.created_at and start_date <= o.created_at.date() <= end_date and o.status == "Доставлен"]
-        elif r_type == 'transport':
-            data = TransportController().get_all()
-
-        dialog = PreviewDialog(self, r_type, title, data)
-        dialog.exec()
\ No newline at end of file
+        # Фильтры по периоду и статусу выполняются в SQL, повторный запрос того же периода - из кэша.
+        # Запрос идет в фоне, окно не замирает
+        include_archive = self.archive_chk.isChecked()
+        period = (start_date, end_date, include_archive)
+        self.set_buttons_enabled(False)
+        TaskExecutor.instance().submit(
+            f"reports:{id(self)}", ReportsController().get_report, r_type, *period,
+            on_result=lambda report: self.open_preview(r_type, title, report, period),
+            on_error=self.preview_failed
+        )
+
+    def open_preview(self, r_type, title, report, period):
+        self.set_buttons_enabled(True)
+        data, summary = report
+        dialog = PreviewDialog(self, r_type, title, data, summary, period)
+        dialog.exec()
+
+    def preview_failed(self, error):
+        self.set_buttons_enabled(True)
+        QMessageBox.critical(self, "Ошибка", f"Ошибка формирования отчета: {str(error)}")
+
+    def set_buttons_enabled(self, enabled):
+        for btn in (self.btn_income, self.btn_delivered, self.btn_trans):
+            btn.setEnabled(enabled)
\ No newline at end of file
@@ -1,4 +1,21 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QCheckBox, QPushButton, QComboBox, QFormLayout
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QCheckBox, QPushButton, QComboBox, QFormLayout, QMessageBox
+from PyQt6.QtCore import QSettings
+
+# Варианты автообновления главной панели: (название, секунд; 0 - выключено)
+REFRESH_INTERVALS = [
+    ("Выключено", 0),
+    ("30 секунд", 30),
+    ("1 минута", 60),
+    ("5 минут", 300),
+]
+DEFAULT_REFRESH_INTERVAL = 60
+
+def app_settings():
+    """Пользовательские настройки приложения (реестр Windows / ini-файл)"""
+    return QSettings("LogistTrans", "LogistTrans")
+
+def notifications_enabled():
+    return app_settings().value("notifications/new_orders", True, type=bool)
 
 class SettingsTab(QWidget):
     def __init__(self):
@@ -16,7 +33,13 @@ class SettingsTab(QWidget):
         self.theme_cb.addItems(["Светлая", "Темная (в разработке)"])
         
         self.notif_chk = QCheckBox("Включить уведомления о новых заказах")
-        self.notif_chk.setChecked(True)
+        self.notif_chk.setChecked(notifications_enabled())
+        
+        self.refresh_cb = QComboBox()
+        self.refresh_cb.addItems([title for title, _ in REFRESH_INTERVALS])
+        seconds = app_settings().value("dashboard/refresh_interval", DEFAULT_REFRESH_INTERVAL, type=int)
+        intervals = [s for _, s in REFRESH_INTERVALS]
+        self.refresh_cb.setCurrentIndex(intervals.index(seconds) if seconds in intervals else 0)
         
         self.sound_chk = QCheckBox("Звуковые оповещения")
         
@@ -24,6 +47,7 @@ class SettingsTab(QWidget):
         self.update_chk.setChecked(True)
 
         form.addRow("Тема оформления:", self.theme_cb)
+        form.addRow("Автообновление главной:", self.refresh_cb)
         form.addRow("", self.notif_chk)
         form.addRow("", self.sound_chk)
         form.addRow("", self.update_chk)
@@ -34,6 +58,13 @@ class SettingsTab(QWidget):
         btn_save = QPushButton("Сохранить настройки")
         btn_save.setObjectName("PrimaryButton")
         btn_save.setFixedWidth(200)
+        btn_save.clicked.connect(self.save_settings)
         layout.addWidget(btn_save)
 
-        self.setLayout(layout)
\ No newline at end of file
+        self.setLayout(layout)
+
+    def save_settings(self):
+        settings = app_settings()
+        settings.setValue("notifications/new_orders", self.notif_chk.isChecked())
+        settings.setValue("dashboard/refresh_interval", REFRESH_INTERVALS[self.refresh_cb.currentIndex()][1])
+        QMessageBox.information(self, "Настройки", "Настройки сохранены.")
@@ -0,0 +1,109 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtWidgets import QApplication, QMessageBox
+from services.cache_service import CacheService
+
+
+class _TaskSignals(QObject):
+    finished = pyqtSignal(object, object)  # (результат, исключение)
+
+
+class _Task(QRunnable):
+    def __init__(self, key, fn, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)  # ссылку держит TaskExecutor, пока задача в работе
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.subscribers = []  # (канал, поколение, on_result, on_error)
+        self.signals = _TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.finished.emit(None, e)
+        else:
+            self.signals.finished.emit(result, None)
+
+
+class TaskExecutor(QObject):
+    """Общий пул фоновых задач для запросов контроллеров.
+
+    Задача отправляется в именованный канал (обычно один канал на вкладку).
+    Новый запрос в канал вытесняет предыдущий: если старая задача еще не
+    началась, она снимается с очереди, иначе ее результат просто не доставляется.
+    Одинаковые запросы (та же функция и аргументы), которые уже выполняются,
+    не запускаются повторно - подписчик ждет результат уже идущей задачи.
+    Запрос после изменения данных к задаче, начатой до него, не присоединяется.
+    Результаты доставляются в GUI-поток через сигналы. Ошибка задачи без
+    on_error показывается в окне один раз, пока канал не загрузится успешно.
+    """
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = TaskExecutor()
+        return cls._instance
+
+    def __init__(self, max_threads=4):
+        super().__init__()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+        self._generations = {}  # канал -> номер последнего запроса
+        self._inflight = {}     # ключ задачи -> _Task
+        self._failed = set()    # каналы, об ошибке которых уже сообщено
+
+    def submit(self, channel, fn, *args, on_result=None, on_error=None, **kwargs):
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+        self._drop_superseded(channel)
+
+        # Счетчик изменений в ключе: задача, начатая до записи, вернула бы старые данные
+        key = (fn, args, tuple(sorted(kwargs.items())), CacheService.write_count())
+        try:
+            task = self._inflight.get(key)
+        except TypeError:
+            # Нехешируемые аргументы - без объединения запросов
+            key = object()
+            task = None
+
+        if task is None:
+            task = _Task(key, fn, args, kwargs)
+            task.signals.finished.connect(lambda result, error, t=task: self._on_finished(t, result, error))
+            self._inflight[key] = task
+            self.pool.start(task)
+        task.subscribers.append((channel, generation, on_result, on_error))
+
+    def cancel(self, channel):
+        """Отменяет ожидающие результаты канала"""
+        self._generations[channel] = self._generations.get(channel, 0) + 1
+        self._drop_superseded(channel)
+
+    def _is_current(self, channel, generation):
+        return self._generations.get(channel) == generation
+
+    def _drop_superseded(self, channel):
+        for key, task in list(self._inflight.items()):
+            task.subscribers = [s for s in task.subscribers if s[0] != channel or self._is_current(*s[:2])]
+            # Задача больше никому не нужна и еще не стартовала - убираем из очереди
+            if not task.subscribers and self.pool.tryTake(task):
+                del self._inflight[key]
+
+    def _on_finished(self, task, result, error):
+        if self._inflight.get(task.key) is task:
+            del self._inflight[task.key]
+        for channel, generation, on_result, on_error in task.subscribers:
+            if not self._is_current(channel, generation):
+                continue
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                elif channel not in self._failed:
+                    self._failed.add(channel)
+                    QMessageBox.warning(QApplication.activeWindow(), "Ошибка", f"Ошибка загрузки данных: {error}")
+            else:
+                self._failed.discard(channel)
+                if on_result:
+                    on_result(result)
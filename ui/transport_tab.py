@@ -3,6 +3,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableWidget, QTableWidgetIte
                              QMessageBox, QComboBox, QHBoxLayout, QLabel, QDoubleSpinBox)
 from PyQt6.QtCore import Qt
 from controllers.transport_controller import TransportController
+from ui.task_executor import TaskExecutor
 
 class TransportTab(QWidget):
     def __init__(self, user):
@@ -42,8 +43,8 @@ class TransportTab(QWidget):
 
         # Таблица
         self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(["ID", "Госномер", "Модель", "Тип ТС", "Тоннаж", "Статус", "Водитель"])
+        self.table.setColumnCount(8)
+        self.table.setHorizontalHeaderLabels(["ID", "Госномер", "Модель", "Тип ТС", "Тоннаж", "Статус", "Водитель", "Рейсов"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
         self.table.verticalHeader().setVisible(False)
@@ -95,8 +96,16 @@ class TransportTab(QWidget):
         l.addWidget(lbl)
         return widget
 
+    def apply_changes(self, table, op, ids):
+        """Изменения от других клиентов. Парк небольшой - список перечитывается одним запросом.
+        Рейсы, пробег и последний рейс считаются по заказам, поэтому важны и их изменения"""
+        if table in ("vehicles", "orders"):
+            self.load_data()
+
     def load_data(self):
-        vehicles = self.controller.get_all()
+        TaskExecutor.instance().submit(f"transport:{id(self)}", self.controller.get_fleet, on_result=self.fill_table)
+
+    def fill_table(self, vehicles):
         status_filter = self.status_filter.currentText()
         type_filter = self.type_filter.currentText()
         
@@ -120,8 +129,9 @@ class TransportTab(QWidget):
             
             self.table.setCellWidget(i, 5, self.create_status_badge(v.status))
             
-            d_name = f"{v.driver.surname} {v.driver.name}" if v.driver else "Не назначен"
+            d_name = f"{v.driver_surname} {v.driver_name}" if v.driver_surname is not None else "Не назначен"
             self.table.setItem(i, 6, QTableWidgetItem(d_name))
+            self.table.setItem(i, 7, QTableWidgetItem(str(v.trips)))
 
     def open_add_dialog(self):
         d = QDialog(self)
@@ -172,7 +182,7 @@ class TransportTab(QWidget):
         if row < 0: return QMessageBox.warning(self, "Внимание", "Выберите строку для редактирования")
             
         v_id = int(self.table.item(row, 0).text())
-        vehicle = next((v for v in self.controller.get_all() if v.id == v_id), None)
+        vehicle = self.controller.get_by_id(v_id)
         if not vehicle: return
 
         d = QDialog(self)
@@ -229,5 +239,7 @@ class TransportTab(QWidget):
         row = self.table.currentRow()
         if row >= 0:
             if QMessageBox.question(self, "Удаление", "Удалить транспорт?") == QMessageBox.StandardButton.Yes:
-                self.controller.delete(int(self.table.item(row, 0).text()))
+                success, msg = self.controller.delete(int(self.table.item(row, 0).text()))
+                if not success:
+                    QMessageBox.warning(self, "Ошибка", msg)
                 self.load_data()
\ No newline at end of file
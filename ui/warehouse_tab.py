@@ -3,12 +3,15 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableWidget, QTableWidgetIte
                              QDialog, QFormLayout, QLineEdit, QDoubleSpinBox, QMessageBox, QLabel)
 from PyQt6.QtCore import Qt
 from controllers.warehouse_controller import WarehouseController
+from services.local_cache import ReferenceCache
+from ui.task_executor import TaskExecutor
 
 class WarehouseTab(QWidget):
     def __init__(self, user):
         super().__init__()
         self.user = user
         self.controller = WarehouseController()
+        self.references = ReferenceCache(user.role)
         
         layout = QVBoxLayout()
         layout.setContentsMargins(30, 30, 30, 30)
@@ -60,8 +63,22 @@ class WarehouseTab(QWidget):
             self.btn_upd.hide()
             self.btn_del.hide()
 
+    def apply_changes(self, table, op, ids):
+        """Изменения от других клиентов: кэш зон дочитывает только измененные строки"""
+        if table == "warehouse_zones":
+            self.load_data()
+
     def load_data(self):
-        zones = self.controller.get_all()
+        # Сразу последняя версия с диска, затем сверка с БД в фоне
+        if self.table.rowCount() == 0:
+            cached = self.references.cached("warehouse_zones")
+            if cached:
+                self.fill_table(cached)
+        TaskExecutor.instance().submit(
+            f"warehouse:{id(self)}", self.references.sync, "warehouse_zones", on_result=self.fill_table
+        )
+
+    def fill_table(self, zones):
         self.table.setRowCount(len(zones))
         for i, z in enumerate(zones):
             self.table.setItem(i, 0, QTableWidgetItem(str(z.id)))
@@ -117,7 +134,7 @@ class WarehouseTab(QWidget):
         row = self.table.currentRow()
         if row < 0: return QMessageBox.warning(self, "Внимание", "Выберите зону для изменения")
         z_id = int(self.table.item(row, 0).text())
-        zone = next((z for z in self.controller.get_all() if z.id == z_id), None)
+        zone = self.controller.get_by_id(z_id)
         if not zone: return
 
         d = QDialog(self)
@@ -145,5 +162,7 @@ class WarehouseTab(QWidget):
         if row >= 0:
             msg = QMessageBox.question(self, "Удаление", "Удалить зону?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
             if msg == QMessageBox.StandardButton.Yes:
-                self.controller.delete(int(self.table.item(row, 0).text()))
+                success, msg = self.controller.delete(int(self.table.item(row, 0).text()))
+                if not success:
+                    QMessageBox.warning(self, "Ошибка", msg)
                 self.load_data()
\ No newline at end of file